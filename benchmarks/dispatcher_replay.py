@@ -0,0 +1,261 @@
+"""Replay updates through Dispatcher and get_handlers().
+
+    PYTHONPATH=. python benchmarks/dispatcher_replay.py [--jsonl PATH | --from-db]
+
+Updates come from a JSONL file, from the telegram_updates table of the
+configured STORAGE_BACKEND, or by default from generated order flows
+(/start, pizza, size, drink, confirm, finish). A JSONL line is either an
+update or a telegram_updates row with the update under "payload".
+
+Storage is StorageMemory and Messenger an in-process fake. Each call
+waits --storage-latency or --messenger-latency milliseconds, so with both at
+zero the numbers are the cost of the dispatch path itself: routing,
+handlers, JSON and logging. Updates go through DispatchWorkerPool, as in
+production. Latency and handler times are wall clock, so with
+--concurrency above 1 they include time spent waiting for the event loop;
+--concurrency 1 gives the bare cost of each step.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import statistics
+import time
+from contextlib import closing
+
+import asyncpg
+
+from bot.dispatcher import HANDLER_SECONDS, Dispatcher
+from bot.domain.messenger import Messenger
+from bot.domain.storage import Storage
+from bot.fake_bot_api import order_flow_updates
+from bot.handlers import get_handlers
+from bot.infrastructure.storage_decorator import StorageDecorator
+from bot.infrastructure.storage_memory import StorageMemory
+from bot.worker_pool import DispatchWorkerPool
+
+
+class FakeMessenger(Messenger):
+    def __init__(self, latency: float = 0.0) -> None:
+        self._latency = latency
+        self._message_ids = itertools.count(1)
+
+    async def _message(self, chat_id: int, text: str = "", **kwargs) -> dict:
+        await asyncio.sleep(self._latency)
+        return {
+            "message_id": next(self._message_ids),
+            "chat": {"id": chat_id, "type": "private"},
+            "date": int(time.time()),
+            "text": text,
+        }
+
+    async def sendMessage(self, chat_id: int, text: str, **kwargs) -> dict:
+        return await self._message(chat_id, text)
+
+    async def editMessageText(
+        self, chat_id: int, message_id: int, text: str, **kwargs
+    ) -> dict:
+        return await self._message(chat_id, text)
+
+    async def editMessageReplyMarkup(
+        self, chat_id: int, message_id: int, **kwargs
+    ) -> dict:
+        return await self._message(chat_id)
+
+    async def _ok(self, *args, **kwargs) -> bool:
+        await asyncio.sleep(self._latency)
+        return True
+
+    answerCallbackQuery = deleteMessage = setWebhook = _ok
+
+    async def getUpdates(self, **kwargs) -> list:
+        return []
+
+
+class DelayedStorage(StorageDecorator):
+    """Waits ``latency`` seconds before each call the dispatch path makes."""
+
+    def __init__(self, storage: Storage, latency: float) -> None:
+        super().__init__(storage)
+        self._latency = latency
+
+    async def get_user(self, telegram_id: int) -> dict | None:
+        await asyncio.sleep(self._latency)
+        return await super().get_user(telegram_id)
+
+    async def ensure_user_exists(self, telegram_id: int) -> None:
+        await asyncio.sleep(self._latency)
+        await super().ensure_user_exists(telegram_id)
+
+    async def update_user_state(self, telegram_id: int, state: str) -> None:
+        await asyncio.sleep(self._latency)
+        await super().update_user_state(telegram_id, state)
+
+    async def update_user_session(
+        self, telegram_id: int, state: str | None, order_json: dict | None
+    ) -> None:
+        await asyncio.sleep(self._latency)
+        await super().update_user_session(telegram_id, state, order_json)
+
+    async def clear_current_order(self, telegram_id: int) -> None:
+        await asyncio.sleep(self._latency)
+        await super().clear_current_order(telegram_id)
+
+    async def persist_update(self, update: dict) -> None:
+        await asyncio.sleep(self._latency)
+        await super().persist_update(update)
+
+    async def save_order_to_history(self, telegram_id: int, order_data: dict) -> None:
+        await asyncio.sleep(self._latency)
+        await super().save_order_to_history(telegram_id, order_data)
+
+    async def get_user_order_history(
+        self, telegram_id: int, limit: int = 20, before: tuple | None = None
+    ) -> list:
+        await asyncio.sleep(self._latency)
+        return await super().get_user_order_history(telegram_id, limit, before)
+
+
+class TimedDispatcher(Dispatcher):
+    def __init__(self, storage: Storage, messenger: Messenger) -> None:
+        super().__init__(storage, messenger)
+        self.latencies: list[float] = []
+
+    async def dispatch(self, update: dict) -> None:
+        start = time.perf_counter()
+        await super().dispatch(update)
+        self.latencies.append(time.perf_counter() - start)
+
+
+def load_jsonl(path: str, limit: int | None) -> list[dict]:
+    updates = []
+    with open(path, encoding="utf-8") as file:
+        for line in itertools.islice((line for line in file if line.strip()), limit):
+            update = json.loads(line)
+            if "payload" in update:
+                payload = update["payload"]
+                update = json.loads(payload) if isinstance(payload, str) else payload
+            updates.append(update)
+    return updates
+
+
+async def load_from_database(limit: int | None) -> list[dict]:
+    if os.getenv("STORAGE_BACKEND", "postgres") == "sqlite":
+        with closing(sqlite3.connect(os.environ["SQLITE_DATABASE_PATH"])) as connection:
+            rows = connection.execute(
+                "SELECT payload FROM telegram_updates ORDER BY update_id LIMIT ?",
+                (-1 if limit is None else limit,),
+            ).fetchall()
+    else:
+        connection = await asyncpg.connect(
+            host=os.environ["POSTGRES_HOST"],
+            port=os.environ["POSTGRES_PORT"],
+            user=os.environ["POSTGRES_USER"],
+            password=os.environ["POSTGRES_PASSWORD"],
+            database=os.environ["POSTGRES_DATABASE"],
+        )
+        try:
+            rows = await connection.fetch(
+                "SELECT payload FROM telegram_updates ORDER BY update_id LIMIT $1",
+                limit,
+            )
+        finally:
+            await connection.close()
+    return [json.loads(row[0]) for row in rows]
+
+
+def percentile(values: list[float], q: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else float("nan")
+    return statistics.quantiles(values, n=1000, method="inclusive")[int(q * 1000) - 1]
+
+
+async def replay(
+    updates: list[dict],
+    concurrency: int,
+    storage_latency: float,
+    messenger_latency: float,
+) -> None:
+    storage = StorageMemory()
+    if storage_latency:
+        storage = DelayedStorage(storage, storage_latency)
+    dispatcher = TimedDispatcher(storage, FakeMessenger(messenger_latency))
+    handlers = get_handlers()
+    dispatcher.add_handlers(*handlers)
+    names = [type(handler).__name__ for handler in handlers]
+    handler_before = {
+        name: (HANDLER_SECONDS.count(handler=name), HANDLER_SECONDS.total(handler=name))
+        for name in names
+    }
+
+    pool = DispatchWorkerPool(dispatcher, concurrency=concurrency)
+    start = time.perf_counter()
+    for update in updates:
+        await pool.submit(update)
+    await pool.close()
+    elapsed = time.perf_counter() - start
+
+    latencies = dispatcher.latencies
+    print(
+        f"{len(updates)} updates in {elapsed:.3f}s: "
+        f"{len(updates) / elapsed:,.0f} updates/s (concurrency {concurrency})"
+    )
+    print(
+        f"dispatch latency: p50 {percentile(latencies, 0.5) * 1000:.3f}ms, "
+        f"p99 {percentile(latencies, 0.99) * 1000:.3f}ms, "
+        f"max {max(latencies, default=0) * 1000:.3f}ms"
+    )
+    print(f"{'handler':>26} {'runs':>8} {'total ms':>10} {'avg us':>8}")
+    for name in names:
+        count_before, total_before = handler_before[name]
+        runs = HANDLER_SECONDS.count(handler=name) - count_before
+        total = HANDLER_SECONDS.total(handler=name) - total_before
+        if runs:
+            print(
+                f"{name:>26} {runs:8d} {total * 1000:10.2f} {total / runs * 1e6:8.1f}"
+            )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--jsonl", help="file with one update per line")
+    source.add_argument(
+        "--from-db", action="store_true", help="read telegram_updates payloads"
+    )
+    parser.add_argument("--limit", type=int, help="replay at most this many updates")
+    parser.add_argument(
+        "--users", type=int, default=2000, help="generated customers (default 2000)"
+    )
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--storage-latency", type=float, default=0.0, help="ms")
+    parser.add_argument("--messenger-latency", type=float, default=0.0, help="ms")
+    parser.add_argument(
+        "--log", action="store_true", help="keep INFO logging, as in production"
+    )
+    args = parser.parse_args()
+
+    if not args.log:
+        logging.disable(logging.INFO)
+
+    if args.jsonl:
+        updates = load_jsonl(args.jsonl, args.limit)
+    elif args.from_db:
+        updates = await load_from_database(args.limit)
+    else:
+        updates = order_flow_updates(args.users)[: args.limit]
+
+    await replay(
+        updates,
+        args.concurrency,
+        args.storage_latency / 1000,
+        args.messenger_latency / 1000,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
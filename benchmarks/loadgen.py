@@ -0,0 +1,267 @@
+"""Simulate concurrent customers ordering pizza through the whole bot.
+
+    PYTHONPATH=. python benchmarks/loadgen.py [--customers N] [--duration S]
+
+Each virtual customer sends /start and then walks the real order flow:
+pizza, size, drink, confirm, then order_more or finish_order. Every step
+waits for the bot's reply and presses a button from the keyboard in that
+reply, after an exponentially distributed think time. Customers keep
+ordering until --duration runs out, then finish.
+
+Customers talk to FakeBotAPI. By default the bot runs in this process:
+long polling, DispatchWorkerPool, the handlers, RateLimitedMessenger and
+a fresh StorageMemory. --recreate-database runs it on the storage chosen
+by STORAGE_BACKEND instead and DROPS every bot table in that database
+first, so only point it at a throwaway one. With --external, only the
+fake API is served, on FAKE_API_HOST:FAKE_API_PORT, and a bot started
+separately with TELEGRAM_BASE_URI pointing at it is measured instead,
+which keeps the load generator's own CPU out of the bot's numbers. Raise
+TELEGRAM_GLOBAL_RATE for many customers: the default 30 messages/s is
+Telegram's limit, not the bot's.
+"""
+
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import random
+import statistics
+import time
+from collections import defaultdict
+
+from bot import menu
+from bot.dispatcher import Dispatcher
+from bot.domain.storage import Storage
+from bot.fake_bot_api import (
+    FakeBotAPI,
+    FakeBotAPIConfig,
+    callback_update,
+    message_update,
+)
+from bot.handlers import get_handlers
+from bot.infrastructure.messenger_rate_limited import RateLimitedMessenger
+from bot.infrastructure.messenger_telegram import MessengerTelegram
+from bot.infrastructure.storage_backend import create_backend_storage
+from bot.infrastructure.storage_buffered import BufferedUpdateStorage
+from bot.infrastructure.storage_cached import CachedStorage
+from bot.infrastructure.storage_memory import StorageMemory
+from bot.infrastructure.telegram_transport import TelegramTransportConfig
+from bot.long_polling import start_long_polling
+
+
+class Customer:
+    def __init__(
+        self,
+        telegram_id: int,
+        api: FakeBotAPI,
+        update_ids: itertools.count,
+        report: "Report",
+        think_time: float,
+        reply_timeout: float,
+    ) -> None:
+        self._telegram_id = telegram_id
+        self._api = api
+        self._update_ids = update_ids
+        self._report = report
+        self._think_time = think_time
+        self._reply_timeout = reply_timeout
+        self._replies = api.subscribe(telegram_id)
+
+    async def _think(self) -> None:
+        if self._think_time > 0:
+            await asyncio.sleep(random.expovariate(1 / self._think_time))
+
+    async def _step(self, step: str, update: dict, keyboard: bool = True) -> dict:
+        """Send the update and wait for the reply that ends the step.
+
+        With ``keyboard`` that is the next reply carrying an inline
+        keyboard, otherwise the next reply of any kind.
+        """
+        start = time.perf_counter()
+        self._api.push_update(update)
+        async with asyncio.timeout(self._reply_timeout):
+            while True:
+                reply = await self._replies.get()
+                result = reply["result"]
+                if not keyboard or (
+                    isinstance(result, dict) and "reply_markup" in result
+                ):
+                    break
+        self._report.step_latencies[step].append(time.perf_counter() - start)
+        return result
+
+    def _press(self, message: dict, choices: dict[str, str]) -> dict:
+        buttons = [
+            button["callback_data"]
+            for row in message["reply_markup"]["inline_keyboard"]
+            for button in row
+            if button["callback_data"] in choices
+        ]
+        if not buttons:
+            raise ValueError(f"No expected button in {message.get('text')!r}")
+        return callback_update(
+            next(self._update_ids),
+            self._telegram_id,
+            random.choice(buttons),
+            message_id=message["message_id"],
+        )
+
+    async def run(self, deadline: float) -> None:
+        try:
+            message = await self._step(
+                "start",
+                message_update(next(self._update_ids), self._telegram_id, "/start"),
+            )
+            while True:
+                for step, choices in (
+                    ("pizza", menu.PIZZA_NAMES),
+                    ("size", menu.PIZZA_SIZES),
+                    ("drink", menu.DRINK_NAMES),
+                ):
+                    await self._think()
+                    message = await self._step(step, self._press(message, choices))
+
+                await self._think()
+                message = await self._step(
+                    "confirm", self._press(message, {"confirm_yes": "yes"})
+                )
+                self._report.completed_orders += 1
+
+                await self._think()
+                if time.monotonic() >= deadline:
+                    await self._step(
+                        "finish",
+                        self._press(message, {"finish_order": "finish_order"}),
+                        keyboard=False,
+                    )
+                    return
+                message = await self._step(
+                    "order_more", self._press(message, {"order_more": "order_more"})
+                )
+        except TimeoutError:
+            self._report.timeouts += 1
+        finally:
+            self._api.unsubscribe(self._telegram_id)
+
+
+class Report:
+    def __init__(self) -> None:
+        self.completed_orders = 0
+        self.timeouts = 0
+        self.step_latencies: dict[str, list[float]] = defaultdict(list)
+
+    def print(self, elapsed: float, customers: int) -> None:
+        print(
+            f"{customers} customers, {elapsed:.1f}s: {self.completed_orders} orders, "
+            f"{self.completed_orders / elapsed:.1f} orders/s, "
+            f"{self.timeouts} timed out"
+        )
+        print(f"{'step':>10} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for step in ("start", "pizza", "size", "drink", "confirm", "order_more"):
+            latencies = sorted(self.step_latencies.get(step, ()))
+            if len(latencies) < 2:
+                continue
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+            print(
+                f"{step:>10} {len(latencies):7d} {cuts[49] * 1000:9.1f} "
+                f"{cuts[98] * 1000:9.1f} {latencies[-1] * 1000:9.1f}"
+            )
+
+
+async def run_bot(base_uri: str, backend: Storage | None = None) -> None:
+    """The bot as __main__ wires it, polling the fake API.
+
+    Without ``backend`` it runs on a fresh StorageMemory. A given backend
+    is recreated first, which drops all of its data.
+    """
+    storage = CachedStorage(BufferedUpdateStorage(backend or StorageMemory()))
+    messenger = RateLimitedMessenger(
+        MessengerTelegram(
+            token="loadgen",
+            transport=TelegramTransportConfig(base_uri=base_uri),
+        ),
+        global_rate=float(os.getenv("TELEGRAM_GLOBAL_RATE", "30")),
+        chat_rate=float(os.getenv("TELEGRAM_CHAT_RATE", "1")),
+        chat_burst=int(os.getenv("TELEGRAM_CHAT_BURST", "3")),
+        max_retries=int(os.getenv("TELEGRAM_MAX_RETRIES", "3")),
+    )
+    try:
+        if backend is not None:
+            await storage.recreate_database()
+        dispatcher = Dispatcher(storage, messenger)
+        dispatcher.add_handlers(*get_handlers())
+        await start_long_polling(dispatcher, messenger)
+    finally:
+        await messenger.close()
+        await storage.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument(
+        "--think", type=float, default=1.0, help="mean think time, seconds"
+    )
+    parser.add_argument("--ramp-up", type=float, default=5, help="seconds")
+    parser.add_argument("--reply-timeout", type=float, default=30, help="seconds")
+    parser.add_argument(
+        "--external", action="store_true", help="measure a separately started bot"
+    )
+    parser.add_argument(
+        "--recreate-database",
+        action="store_true",
+        help="run the bot on STORAGE_BACKEND, dropping its tables first",
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    os.environ.setdefault("POLLING_TIMEOUT", "1")
+
+    api = FakeBotAPI(FakeBotAPIConfig.from_env())
+    if args.external:
+        runner, base_uri = await api.start(
+            os.getenv("FAKE_API_HOST", "127.0.0.1"),
+            int(os.getenv("FAKE_API_PORT", "8081")),
+        )
+        print(f"Waiting for a bot with TELEGRAM_BASE_URI={base_uri}")
+        bot = None
+    else:
+        runner, base_uri = await api.start()
+        backend = create_backend_storage() if args.recreate_database else None
+        bot = asyncio.create_task(run_bot(base_uri, backend))
+
+    report = Report()
+    update_ids = itertools.count(1)
+    start = time.monotonic()
+    deadline = start + args.duration
+    customers = []
+    try:
+        for telegram_id in range(1, args.customers + 1):
+            customer = Customer(
+                telegram_id,
+                api,
+                update_ids,
+                report,
+                think_time=args.think,
+                reply_timeout=args.reply_timeout,
+            )
+            customers.append(asyncio.create_task(customer.run(deadline)))
+            await asyncio.sleep(args.ramp_up / args.customers)
+        await asyncio.gather(*customers)
+    finally:
+        elapsed = time.monotonic() - start
+        if bot is not None:
+            bot.cancel()
+            await asyncio.gather(bot, return_exceptions=True)
+        await runner.cleanup()
+
+    print()
+    report.print(elapsed, args.customers)
+    stats = api.stats()
+    print(f"bot API calls: {stats['calls']}, injected errors: {stats['injected']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""Compare Bot API transports against a local stub server.
+
+    PYTHONPATH=. python benchmarks/telegram_transport.py [requests] [concurrency]
+
+The stub answers every method with a canned sendMessage result, so the
+numbers measure the client side: connection reuse, JSON encoding and
+decoding, and request bookkeeping. Each transport runs several rounds,
+interleaved, and the best round is reported.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+from bot.infrastructure.messenger_telegram import MessengerTelegram
+from bot.infrastructure.telegram_transport import TelegramTransportConfig
+
+STUB_RESULT = {
+    "message_id": 1,
+    "from": {"id": 1, "is_bot": True, "first_name": "Pizza bot"},
+    "chat": {"id": 1, "type": "private"},
+    "date": 1640995200,
+    "text": "Great! Pepperoni - Large (35cm)\n\nNow choose a drink:",
+}
+REPLY_MARKUP = json.dumps(
+    {
+        "inline_keyboard": [
+            [{"text": f"🥤 Drink {i}", "callback_data": f"drink_{i}"}] for i in range(6)
+        ]
+    }
+)
+
+
+async def start_stub_server() -> tuple[web.AppRunner, str]:
+    body = json.dumps({"ok": True, "result": STUB_RESULT}).encode()
+
+    async def handle(request: web.Request) -> web.Response:
+        await request.read()
+        return web.Response(body=body, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_post("/{token}/{method}", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+class LegacyMessenger:
+    """The transport MessengerTelegram used before it became configurable."""
+
+    def __init__(self, base_uri: str) -> None:
+        self._base_uri = base_uri
+        self._session = aiohttp.ClientSession()
+
+    async def sendMessage(self, chat_id: int, text: str, **kwargs) -> dict:
+        url = f"{self._base_uri}/bot{os.getenv('TOKEN')}/sendMessage"
+        async with self._session.post(
+            url,
+            json={"chat_id": chat_id, "text": text, **kwargs},
+            headers={"Content-Type": "application/json"},
+        ) as response:
+            response_json = await response.json()
+            assert response_json["ok"]
+            return response_json["result"]
+
+    async def close(self) -> None:
+        await self._session.close()
+
+
+async def measure(messenger, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(i: int) -> None:
+        async with semaphore:
+            await messenger.sendMessage(
+                chat_id=i, text="Now choose a drink:", reply_markup=REPLY_MARKUP
+            )
+
+    await send(0)  # open the first connection outside the measurement
+    start = time.perf_counter()
+    await asyncio.gather(*(send(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await messenger.close()
+    return elapsed
+
+
+async def main(requests: int, concurrency: int, rounds: int = 3) -> None:
+    runner, base_uri = await start_stub_server()
+    candidates = {
+        "legacy": lambda: LegacyMessenger(base_uri),
+        "std json": lambda: MessengerTelegram(
+            token="benchmark",
+            transport=TelegramTransportConfig(base_uri=base_uri, fast_json=False),
+        ),
+        "tuned": lambda: MessengerTelegram(
+            token="benchmark", transport=TelegramTransportConfig(base_uri=base_uri)
+        ),
+    }
+    best = dict.fromkeys(candidates, float("inf"))
+    try:
+        for _ in range(rounds):
+            for name, create in candidates.items():
+                elapsed = await measure(create(), requests, concurrency)
+                best[name] = min(best[name], elapsed)
+    finally:
+        await runner.cleanup()
+
+    for name, elapsed in best.items():
+        print(
+            f"{name:>10}: {requests / elapsed:8.0f} req/s, "
+            f"{elapsed / requests * 1e6:7.1f} us/req"
+        )
+
+
+if __name__ == "__main__":
+    import logging
+
+    logging.disable(logging.INFO)
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(main(requests, concurrency))
@@ -1,13 +1,22 @@
 import asyncio
 import logging
+import os
 
 import bot.long_polling
+import bot.multiprocess
+import bot.update_queue
+import bot.webhook
+from bot import metrics
+from bot.app import (
+    create_deduplicator,
+    create_messenger,
+    create_storage,
+    session_cache_enabled,
+)
 from bot.dispatcher import Dispatcher
 from bot.domain.messenger import Messenger
-from bot.domain.storage import Storage
 from bot.handlers import get_handlers
-from bot.infrastructure.messenger_telegram import MessengerTelegram
-from bot.infrastructure.storage_postgres import StoragePostgres
+from bot.infrastructure.storage_cached import CachedStorage
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,16 +26,38 @@ logging.basicConfig(
 
 
 async def main() -> None:
-    storage: Storage = StoragePostgres()
-    messenger: Messenger = MessengerTelegram()
+    processes = int(os.getenv("DISPATCH_PROCESSES", "1"))
+    if processes > 1:
+        await bot.multiprocess.start_multiprocess(processes)
+        return
+    if os.getenv("BOT_MODE", "polling") == "queue":
+        await bot.update_queue.start_update_queue()
+        return
+
+    storage = create_storage(session_cache=session_cache_enabled())
+    messenger: Messenger = create_messenger()
+    metrics_runner = None
 
     try:
+        metrics_runner = await metrics.start_metrics_server()
+        if isinstance(storage, CachedStorage):
+            await storage.warm(int(os.getenv("SESSION_CACHE_WARM", "1000")))
         dispatcher = Dispatcher(storage, messenger)
         dispatcher.add_handlers(*get_handlers())
-        await bot.long_polling.start_long_polling(dispatcher, messenger)
+        deduplicator = create_deduplicator(storage)
+        if os.getenv("BOT_MODE", "polling") == "webhook":
+            await bot.webhook.start_webhook(
+                dispatcher, messenger, deduplicator=deduplicator
+            )
+        else:
+            await bot.long_polling.start_long_polling(
+                dispatcher, messenger, deduplicator=deduplicator
+            )
     except KeyboardInterrupt:
         print("\nBye!")
     finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
         if hasattr(messenger, "close"):
             await messenger.close()
         if hasattr(storage, "close"):
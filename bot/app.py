@@ -0,0 +1,80 @@
+import os
+
+from bot import metrics
+from bot.deduplication import UpdateDeduplicator
+from bot.domain.storage import Storage
+from bot.infrastructure.messenger_rate_limited import RateLimitedMessenger
+from bot.infrastructure.messenger_telegram import MessengerTelegram
+from bot.infrastructure.storage_backend import create_backend_storage
+from bot.infrastructure.storage_buffered import BufferedUpdateStorage
+from bot.infrastructure.storage_cached import CachedStorage
+
+
+def register_storage_gauges(
+    update_buffer: BufferedUpdateStorage, session_cache: CachedStorage
+) -> None:
+    metrics.gauge(
+        "bot_update_buffer_depth", "Updates waiting to be written to storage"
+    ).set_function(lambda: update_buffer.buffer_depth)
+    cache_gauge = metrics.gauge(
+        "bot_session_cache", "Session cache size and counters", ["stat"]
+    )
+    for stat in ("size", "hits", "misses", "evictions"):
+        cache_gauge.set_function(
+            lambda stat=stat: session_cache.stats()[stat], stat=stat
+        )
+
+
+def session_cache_enabled() -> bool:
+    """SESSION_CACHE, on by default only when one process polls Telegram.
+
+    Webhook replicas behind a load balancer can get one user's updates on
+    different replicas, where a cached session would be stale. Turn it on
+    there only with sticky routing by telegram_id.
+    """
+    default = "0" if os.getenv("BOT_MODE", "polling") == "webhook" else "1"
+    return os.getenv("SESSION_CACHE", default) == "1"
+
+
+def create_storage(
+    backend: Storage | None = None, session_cache: bool = True
+) -> Storage:
+    """The STORAGE_BACKEND behind the update buffer and the session cache.
+
+    Leave out the session cache when updates of one user may be handled
+    by different processes.
+    """
+    update_buffer = BufferedUpdateStorage(
+        backend or create_backend_storage(),
+        max_batch_size=int(os.getenv("UPDATE_BUFFER_BATCH_SIZE", "500")),
+        flush_interval=float(os.getenv("UPDATE_BUFFER_FLUSH_INTERVAL", "1")),
+    )
+    if not session_cache:
+        return update_buffer
+    storage = CachedStorage(
+        update_buffer,
+        max_size=int(os.getenv("SESSION_CACHE_SIZE", "10000")),
+        ttl=float(os.getenv("SESSION_CACHE_TTL", "300")),
+    )
+    register_storage_gauges(update_buffer, storage)
+    return storage
+
+
+def create_messenger(share: float = 1.0) -> RateLimitedMessenger:
+    """MessengerTelegram behind the rate limiter.
+
+    ``share`` scales the global rate for processes that split one token.
+    """
+    return RateLimitedMessenger(
+        MessengerTelegram(),
+        global_rate=float(os.getenv("TELEGRAM_GLOBAL_RATE", "30")) * share,
+        chat_rate=float(os.getenv("TELEGRAM_CHAT_RATE", "1")),
+        chat_burst=int(os.getenv("TELEGRAM_CHAT_BURST", "3")),
+        max_retries=int(os.getenv("TELEGRAM_MAX_RETRIES", "3")),
+    )
+
+
+def create_deduplicator(storage: Storage) -> UpdateDeduplicator:
+    return UpdateDeduplicator(
+        storage, size=int(os.getenv("UPDATE_DEDUP_RING_SIZE", "10000"))
+    )
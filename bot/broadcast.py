@@ -0,0 +1,151 @@
+"""Send one announcement to every user.
+
+    python -m bot.broadcast "2-for-1 Tuesday!"
+    python -m bot.broadcast --resume <broadcast id>
+
+Recipients are read a page at a time in telegram_id order, so memory stays
+bounded by the page size however many users there are. After each page the
+last telegram_id is saved as the broadcast's checkpoint, and ``--resume``
+continues from there. A crash in the middle of a page means that page is
+sent again on resume, so a few users may get the message twice.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+
+from bot import metrics
+from bot.domain.messenger import Messenger
+from bot.domain.storage import Storage
+from bot.infrastructure.messenger_rate_limited import RateLimitedMessenger
+from bot.infrastructure.messenger_telegram import (
+    TELEGRAM_EXCEPTIONS,
+    MessengerTelegram,
+)
+from bot.infrastructure.storage_backend import create_backend_storage
+
+logger = logging.getLogger("BROADCAST")
+
+BROADCAST_MESSAGES = metrics.counter(
+    "bot_broadcast_messages_total", "Broadcast messages by outcome", ["result"]
+)
+
+
+class Broadcast:
+    def __init__(
+        self,
+        storage: Storage,
+        messenger: Messenger,
+        page_size: int = 500,
+        concurrency: int = 50,
+    ) -> None:
+        self._storage = storage
+        self._messenger = messenger
+        self._page_size = page_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def start(self, text: str) -> dict:
+        broadcast_id = await self._storage.create_broadcast(text)
+        logger.info(f"Broadcast {broadcast_id} created")
+        return await self.resume(broadcast_id)
+
+    async def resume(self, broadcast_id: int) -> dict:
+        broadcast = await self._storage.get_broadcast(broadcast_id)
+        if broadcast is None:
+            raise ValueError(f"Unknown broadcast: {broadcast_id}")
+        if broadcast["finished_at"] is not None:
+            logger.info(f"Broadcast {broadcast_id} has already finished")
+            return broadcast
+
+        text = broadcast["text"]
+        checkpoint = broadcast["checkpoint"]
+        sent, failed = broadcast["sent"], broadcast["failed"]
+        while True:
+            telegram_ids = await self._storage.get_user_ids(checkpoint, self._page_size)
+            if not telegram_ids:
+                break
+
+            results = await asyncio.gather(
+                *(self._send(telegram_id, text) for telegram_id in telegram_ids)
+            )
+            failures = [
+                (telegram_id, error)
+                for telegram_id, error in zip(telegram_ids, results, strict=True)
+                if error is not None
+            ]
+            await self._storage.save_broadcast_failures(broadcast_id, failures)
+
+            checkpoint = telegram_ids[-1]
+            sent += len(telegram_ids) - len(failures)
+            failed += len(failures)
+            await self._storage.update_broadcast_progress(
+                broadcast_id, checkpoint, sent, failed
+            )
+            logger.info(
+                f"Broadcast {broadcast_id}: {sent} sent, {failed} failed, "
+                f"up to {checkpoint}"
+            )
+
+        await self._storage.update_broadcast_progress(
+            broadcast_id, checkpoint, sent, failed, finished=True
+        )
+        logger.info(
+            f"✓ Broadcast {broadcast_id} finished: {sent} sent, {failed} failed"
+        )
+        return await self._storage.get_broadcast(broadcast_id)
+
+    async def _send(self, telegram_id: int, text: str) -> str | None:
+        """Send to one recipient; the error text on failure, else None."""
+        async with self._semaphore:
+            try:
+                await self._messenger.sendMessage(chat_id=telegram_id, text=text)
+            except TELEGRAM_EXCEPTIONS as e:
+                BROADCAST_MESSAGES.inc(result="failed")
+                return str(e) or type(e).__name__
+        BROADCAST_MESSAGES.inc(result="sent")
+        return None
+
+
+async def main(argv: list[str]) -> None:
+    if len(argv) == 2 and argv[0] == "--resume":
+        resume_id, text = int(argv[1]), None
+    elif len(argv) == 1 and argv[0] != "--resume":
+        resume_id, text = None, argv[0]
+    else:
+        print(__doc__)
+        sys.exit(2)
+
+    storage = create_backend_storage()
+    # The live bot shares the token's ~30 messages/s, so stay below it.
+    messenger = RateLimitedMessenger(
+        MessengerTelegram(),
+        global_rate=float(os.getenv("BROADCAST_RATE", "20")),
+        chat_rate=float(os.getenv("TELEGRAM_CHAT_RATE", "1")),
+        chat_burst=int(os.getenv("TELEGRAM_CHAT_BURST", "3")),
+        max_retries=int(os.getenv("TELEGRAM_MAX_RETRIES", "3")),
+    )
+    broadcast = Broadcast(
+        storage,
+        messenger,
+        page_size=int(os.getenv("BROADCAST_PAGE_SIZE", "500")),
+        concurrency=int(os.getenv("BROADCAST_CONCURRENCY", "50")),
+    )
+    try:
+        if resume_id is not None:
+            result = await broadcast.resume(resume_id)
+        else:
+            result = await broadcast.start(text)
+    finally:
+        await messenger.close()
+        await storage.close()
+    print(f"Broadcast {result['id']}: {result['sent']} sent, {result['failed']} failed")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(asctime)s] [%(name)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,82 @@
+import logging
+
+from bot import metrics
+from bot.domain.storage import Storage
+from bot.infrastructure.storage_errors import STORAGE_EXCEPTIONS
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_UPDATES = metrics.counter(
+    "bot_duplicate_updates_total", "Updates skipped because they were handled before"
+)
+
+
+class UpdateDeduplicator:
+    """Let each update_id through once, and keep the polling offset.
+
+    The last ``size`` ids are remembered in memory, so a repeated delivery
+    is usually dropped without a storage call. New ids are claimed in
+    storage, where a unique key on update_id decides between pollers and
+    across restarts. An update is claimed before it is dispatched: a crash
+    in between loses it rather than answering it twice.
+    """
+
+    def __init__(self, storage: Storage, size: int = 10_000) -> None:
+        if size < 1:
+            raise ValueError("size must be at least 1")
+
+        self._storage = storage
+        self._size = size
+        self._recent: dict[int, None] = {}
+
+    def _remember(self, update_ids: list[int]) -> None:
+        for update_id in update_ids:
+            self._recent[update_id] = None
+        while len(self._recent) > self._size:
+            del self._recent[next(iter(self._recent))]
+
+    async def filter_new(self, updates: list[dict]) -> list[dict]:
+        """The updates that were not handled before, in their original order."""
+        fresh: dict[int, dict] = {}
+        for update in updates:
+            update_id = update["update_id"]
+            if update_id not in self._recent and update_id not in fresh:
+                fresh[update_id] = update
+        if not fresh:
+            new = []
+        else:
+            try:
+                claimed = await self._storage.claim_update_ids(list(fresh))
+            except STORAGE_EXCEPTIONS as e:
+                # Answering twice beats not answering at all.
+                logger.error(f"[DEDUP] ✗ claiming update ids failed: {e}")
+                claimed = list(fresh)
+            self._remember(list(fresh))
+            claimed = set(claimed)
+            new = [
+                update for update_id, update in fresh.items() if update_id in claimed
+            ]
+
+        duplicates = len(updates) - len(new)
+        if duplicates:
+            DUPLICATE_UPDATES.inc(duplicates)
+            logger.warning(f"[DEDUP] skipped {duplicates} already handled updates")
+        return new
+
+    async def release(self, update_ids: list[int]) -> None:
+        """Let update ids that were claimed but not dispatched through again."""
+        for update_id in update_ids:
+            self._recent.pop(update_id, None)
+        try:
+            await self._storage.release_update_ids(update_ids)
+        except STORAGE_EXCEPTIONS as e:
+            logger.error(f"[DEDUP] ✗ releasing update ids {update_ids} failed: {e}")
+
+    async def get_offset(self) -> int:
+        return await self._storage.get_polling_offset()
+
+    async def save_offset(self, offset: int) -> None:
+        try:
+            await self._storage.save_polling_offset(offset)
+        except STORAGE_EXCEPTIONS as e:
+            logger.error(f"[DEDUP] ✗ saving polling offset {offset} failed: {e}")
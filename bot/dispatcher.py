@@ -1,12 +1,25 @@
 import json
 import logging
-import time
 
+from bot import metrics
 from bot.domain.messenger import Messenger
 from bot.domain.storage import Storage
 from bot.handlers.handler import Handler, HandlerStatus
 
 logger = logging.getLogger(__name__)
+
+DISPATCH_SECONDS = metrics.histogram(
+    "bot_dispatch_seconds", "Time to dispatch one update in seconds"
+)
+DISPATCH_ERRORS = metrics.counter(
+    "bot_dispatch_errors_total", "Updates whose dispatch raised"
+)
+HANDLER_SECONDS = metrics.histogram(
+    "bot_handler_seconds", "Handler run duration in seconds", ["handler"]
+)
+HANDLER_ERRORS = metrics.counter(
+    "bot_handler_errors_total", "Handler runs that raised", ["handler"]
+)
 logging.basicConfig(
     level=logging.INFO,
     format="[%(asctime)s.%(msecs)03d] %(message)s",
@@ -14,28 +27,94 @@ logging.basicConfig(
 )
 
 
+def get_telegram_id_from_update(update: dict) -> int | None:
+    if "message" in update:
+        return update["message"]["from"]["id"]
+    elif "callback_query" in update:
+        return update["callback_query"]["from"]["id"]
+    return None
+
+
+def get_update_kind(update: dict) -> str | None:
+    if "message" in update:
+        return "message"
+    elif "callback_query" in update:
+        return "callback_query"
+    return next((key for key in update if key != "update_id"), None)
+
+
+def get_callback_prefix(callback_data: str) -> str:
+    head, separator, _ = callback_data.partition("_")
+    return head + separator
+
+
 class Dispatcher:
     def __init__(self, storage: Storage, messenger: Messenger) -> None:
         self._handlers: list[Handler] = []
         self._storage: Storage = storage
         self._messenger: Messenger = messenger
+        self._routes: dict[tuple, list[Handler]] = {}
+        self._callback_prefixes: set[str] = set()
 
     def add_handlers(self, *handlers: Handler) -> None:
         for handler in handlers:
             self._handlers.append(handler)
+            self._callback_prefixes.update(
+                getattr(handler, "callback_prefixes", None) or ()
+            )
+        self._routes.clear()
+
+    def _get_route(self, update: dict, state: str | None) -> list[Handler]:
+        """Handlers that may accept the update, in registration order."""
+        kind = get_update_kind(update)
+        prefix = None
+        if kind == "callback_query":
+            prefix = get_callback_prefix(update["callback_query"].get("data", ""))
+            if prefix not in self._callback_prefixes:
+                # Keeps the route table bounded whatever callback data we get.
+                prefix = None
+
+        key = (kind, state, prefix)
+        route = self._routes.get(key)
+        if route is None:
+            route = [
+                handler
+                for handler in self._handlers
+                if self._accepts(handler, kind, state, prefix)
+            ]
+            self._routes[key] = route
+        return route
 
-    def _get_telegram_id_from_update(self, update: dict) -> int | None:
-        if "message" in update:
-            return update["message"]["from"]["id"]
-        elif "callback_query" in update:
-            return update["callback_query"]["from"]["id"]
-        return None
+    @staticmethod
+    def _accepts(
+        handler: Handler, kind: str | None, state: str | None, prefix: str | None
+    ) -> bool:
+        update_kind = getattr(handler, "update_kind", None)
+        states = getattr(handler, "states", None)
+        callback_prefixes = getattr(handler, "callback_prefixes", None)
+        return (
+            (update_kind is None or update_kind == kind)
+            and (states is None or state in states)
+            and (callback_prefixes is None or prefix in callback_prefixes)
+        )
 
     async def dispatch(self, update: dict) -> None:
         update_id = update["update_id"]
-        start_time = time.time()
+        timer = metrics.timed(DISPATCH_SECONDS, DISPATCH_ERRORS)
         try:
-            telegram_id = self._get_telegram_id_from_update(update)
+            with timer:
+                await self._dispatch(update)
+            logger.info(
+                f"[DISPATCH {update_id}] ← dispatch finished - {timer.elapsed * 1000:.2f}ms\n"
+            )
+        except Exception as e:
+            logger.error(
+                f"[DISPATCH {update_id}] ✗ dispatch failed - {timer.elapsed * 1000:.2f}ms - Error: {e}\n"
+            )
+
+    async def _dispatch(self, update: dict) -> None:
+        try:
+            telegram_id = get_telegram_id_from_update(update)
             user = await self._storage.get_user(telegram_id) if telegram_id else None
 
             user_state = user.get("state") if user else None
@@ -45,14 +124,16 @@ class Dispatcher:
         except json.JSONDecodeError:
             order_json = {}
 
-        try:
-            for handler in self._handlers:
-                if await handler.can_handle(
-                    update,
-                    user_state,
-                    order_json,
-                    self._storage,
-                    self._messenger,
+        for handler in self._get_route(update, user_state):
+            if await handler.can_handle(
+                update,
+                user_state,
+                order_json,
+                self._storage,
+                self._messenger,
+            ):
+                with metrics.timed(
+                    HANDLER_SECONDS, HANDLER_ERRORS, handler=type(handler).__name__
                 ):
                     status = await handler.handle(
                         update,
@@ -61,15 +142,5 @@ class Dispatcher:
                         self._storage,
                         self._messenger,
                     )
-                    if status == HandlerStatus.STOP:
-                        break
-
-            duration_ms = (time.time() - start_time) * 1000
-            logger.info(
-                f"[DISPATCH {update_id}] ← dispatch finished - {duration_ms:.2f}ms\n"
-            )
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            logger.error(
-                f"[DISPATCH {update_id}] ✗ dispatch failed - {duration_ms:.2f}ms - Error: {e}\n"
-            )
+                if status == HandlerStatus.STOP:
+                    break
@@ -13,3 +13,16 @@ class Messenger(ABC):
 
     @abstractmethod
     def deleteMessage(self, chat_id: int, message_id: int) -> dict: ...
+
+    @abstractmethod
+    def editMessageText(
+        self, chat_id: int, message_id: int, text: str, **kwargs
+    ) -> dict: ...
+
+    @abstractmethod
+    def editMessageReplyMarkup(
+        self, chat_id: int, message_id: int, **kwargs
+    ) -> dict: ...
+
+    @abstractmethod
+    def setWebhook(self, url: str, **kwargs) -> dict: ...
@@ -8,16 +8,94 @@ class Storage(ABC):
     @abstractmethod
     def clear_user_order_json(self, telegram_id: int) -> None: ...
 
+    @abstractmethod
+    def clear_user_state_and_order(self, telegram_id: int) -> None: ...
+
+    @abstractmethod
+    def clear_current_order(self, telegram_id: int) -> None: ...
+
     @abstractmethod
     def update_user_state(self, telegram_id: int, state: str) -> None: ...
+
+    @abstractmethod
+    def update_user_session(
+        self, telegram_id: int, state: str | None, order_json: dict | None
+    ) -> None: ...
+
     @abstractmethod
     def persist_update(self, update: dict) -> None: ...
 
+    @abstractmethod
+    def persist_updates(self, updates: list[dict]) -> None: ...
+
     @abstractmethod
     def update_user_order_json(self, telegram_id: int, order_json: dict) -> None: ...
 
+    @abstractmethod
+    def save_order_to_history(self, telegram_id: int, order_data: dict) -> None: ...
+
+    @abstractmethod
+    def get_user_order_history(
+        self,
+        telegram_id: int,
+        limit: int = 20,
+        before: tuple | None = None,
+    ) -> list:
+        """Newest orders first, at most ``limit`` of them.
+
+        Pass ``history_cursor(last_entry)`` as ``before`` to get the next page.
+        """
+
     @abstractmethod
     def recreate_database(self) -> None: ...
 
     @abstractmethod
     def get_user(self, telegram_id: int) -> dict: ...
+
+    @abstractmethod
+    def get_recent_users(self, limit: int) -> list[dict]: ...
+
+    @abstractmethod
+    def get_user_ids(self, after: int | None, limit: int) -> list[int]:
+        """Telegram ids in ascending order, starting after ``after``."""
+
+    @abstractmethod
+    def create_broadcast(self, text: str) -> int: ...
+
+    @abstractmethod
+    def get_broadcast(self, broadcast_id: int) -> dict | None: ...
+
+    @abstractmethod
+    def update_broadcast_progress(
+        self,
+        broadcast_id: int,
+        checkpoint: int | None,
+        sent: int,
+        failed: int,
+        finished: bool = False,
+    ) -> None: ...
+
+    @abstractmethod
+    def save_broadcast_failures(
+        self, broadcast_id: int, failures: list[tuple[int, str]]
+    ) -> None: ...
+
+    @abstractmethod
+    def get_polling_offset(self) -> int:
+        """The getUpdates offset saved last, 0 if there is none."""
+
+    @abstractmethod
+    def save_polling_offset(self, offset: int) -> None: ...
+
+    @abstractmethod
+    def claim_update_ids(self, update_ids: list[int]) -> list[int]:
+        """Record update ids as processed and return the ones that were not."""
+
+    @abstractmethod
+    def release_update_ids(self, update_ids: list[int]) -> None:
+        """Forget claimed update ids whose updates were not dispatched."""
+
+
+def history_cursor(entry: dict) -> tuple:
+    """Keyset position of an order history entry, for paging with ``before``."""
+    return (entry["created_at"], entry["id"])
@@ -0,0 +1,360 @@
+"""A local stand-in for the Telegram Bot API, for offline load tests.
+
+    python -m bot.fake_bot_api [--users N | --jsonl PATH] [--rate R]
+
+Point the bot at it with TELEGRAM_BASE_URI=http://<host>:<port>. The bot's
+getUpdates long poll is served from a stream of updates: generated order
+flows, a JSONL file of updates, or whatever ``push_update`` is given
+in-process. sendMessage, editMessageText, editMessageReplyMarkup,
+deleteMessage, answerCallbackQuery and setWebhook are accepted and
+answered like Telegram does.
+
+Every call except getUpdates waits FAKE_API_LATENCY_MS plus up to
+FAKE_API_JITTER_MS, and a FAKE_API_ERROR_RATE share of them fail with 500
+and a FAKE_API_RETRY_AFTER_RATE share with 429 and ``retry_after``.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+
+from aiohttp import web
+
+from bot import menu
+
+MESSAGE_METHODS = frozenset(
+    {"sendMessage", "editMessageText", "editMessageReplyMarkup"}
+)
+TRUE_METHODS = frozenset({"answerCallbackQuery", "deleteMessage", "setWebhook"})
+
+
+def message_update(update_id: int, telegram_id: int, text: str) -> dict:
+    user = {"id": telegram_id, "is_bot": False, "first_name": "Customer"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "from": user,
+            "chat": {"id": telegram_id, "type": "private"},
+            "date": int(time.time()),
+            "text": text,
+        },
+    }
+
+
+def callback_update(
+    update_id: int, telegram_id: int, data: str, message_id: int = 1
+) -> dict:
+    user = {"id": telegram_id, "is_bot": False, "first_name": "Customer"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": f"cb{update_id}",
+            "from": user,
+            "message": {
+                "message_id": message_id,
+                "chat": {"id": telegram_id, "type": "private"},
+                "date": int(time.time()),
+            },
+            "data": data,
+        },
+    }
+
+
+def order_flow_updates(customers: int) -> list[dict]:
+    """One full order per customer, interleaved across customers."""
+    flows = []
+    for telegram_id in range(1, customers + 1):
+        steps = (
+            menu.PIZZAS[telegram_id % len(menu.PIZZAS)],
+            menu.SIZES[telegram_id % len(menu.SIZES)],
+            menu.DRINKS[telegram_id % len(menu.DRINKS)],
+            menu.CONFIRMATIONS[0],
+            menu.NEXT_STEPS[1],
+        )
+        flows.append(["/start"] + [item.callback_data for item in steps])
+
+    updates = []
+    update_ids = itertools.count(1)
+    for step in range(len(flows[0]) if flows else 0):
+        for telegram_id, flow in enumerate(flows, start=1):
+            if step == 0:
+                updates.append(message_update(next(update_ids), telegram_id, flow[0]))
+            else:
+                updates.append(
+                    callback_update(next(update_ids), telegram_id, flow[step])
+                )
+    return updates
+
+
+def _get_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+@dataclass(frozen=True)
+class FakeBotAPIConfig:
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    retry_after_rate: float = 0.0
+    retry_after: int = 1
+
+    @classmethod
+    def from_env(cls) -> "FakeBotAPIConfig":
+        return cls(
+            latency=_get_float("FAKE_API_LATENCY_MS", 0) / 1000,
+            jitter=_get_float("FAKE_API_JITTER_MS", 0) / 1000,
+            error_rate=_get_float("FAKE_API_ERROR_RATE", cls.error_rate),
+            retry_after_rate=_get_float(
+                "FAKE_API_RETRY_AFTER_RATE", cls.retry_after_rate
+            ),
+            retry_after=int(os.getenv("FAKE_API_RETRY_AFTER") or cls.retry_after),
+        )
+
+
+class FakeBotAPI:
+    """In-process Bot API: an update stream in, bot calls recorded out.
+
+    ``subscribe(chat_id)`` returns a queue that receives every successful
+    call the bot makes for that chat, so a simulated customer can read the
+    reply and pick its next button. Reply latency is the time from
+    ``push_update`` to the bot's next call for the same chat; it is
+    meaningful when a chat has one update in flight at a time.
+    """
+
+    def __init__(
+        self, config: FakeBotAPIConfig | None = None, seed: int | None = None
+    ) -> None:
+        self._config = config or FakeBotAPIConfig()
+        self._random = random.Random(seed)
+        self._updates: deque[dict] = deque()
+        self._has_updates = asyncio.Event()
+        self._message_ids = itertools.count(1)
+        self._subscribers: dict[int, asyncio.Queue] = {}
+        self._pushed_at: dict[int, deque[float]] = defaultdict(deque)
+        self.reply_latencies: list[float] = []
+        self.calls: dict[str, int] = defaultdict(int)
+        self.injected: dict[str, int] = defaultdict(int)
+        self.updates_pushed = 0
+        self.updates_confirmed = 0
+
+    def push_update(self, update: dict) -> None:
+        self._updates.append(update)
+        self.updates_pushed += 1
+        chat_id = _chat_id(update)
+        if chat_id is not None:
+            self._pushed_at[chat_id].append(time.perf_counter())
+        self._has_updates.set()
+
+    def subscribe(self, chat_id: int) -> asyncio.Queue:
+        return self._subscribers.setdefault(chat_id, asyncio.Queue())
+
+    def unsubscribe(self, chat_id: int) -> None:
+        self._subscribers.pop(chat_id, None)
+
+    def stats(self) -> dict:
+        latencies = sorted(self.reply_latencies)
+        stats = {
+            "updates_pushed": self.updates_pushed,
+            "updates_confirmed": self.updates_confirmed,
+            "updates_pending": len(self._updates),
+            "calls": dict(self.calls),
+            "injected": dict(self.injected),
+            "replies": len(latencies),
+        }
+        if len(latencies) >= 2:
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+            stats["reply_p50_ms"] = cuts[49] * 1000
+            stats["reply_p99_ms"] = cuts[98] * 1000
+            stats["reply_max_ms"] = latencies[-1] * 1000
+        return stats
+
+    async def _get_updates(self, params: dict) -> list[dict]:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+
+        while self._updates and self._updates[0]["update_id"] < offset:
+            self._updates.popleft()
+            self.updates_confirmed += 1
+        if not self._updates:
+            self._has_updates.clear()
+            if timeout > 0:
+                try:
+                    async with asyncio.timeout(timeout):
+                        await self._has_updates.wait()
+                except TimeoutError:
+                    pass
+
+        return list(itertools.islice(self._updates, limit))
+
+    def _answer(self, method: str, params: dict) -> object:
+        chat_id = params.get("chat_id")
+        if chat_id is not None:
+            chat_id = int(chat_id)
+            pushed_at = self._pushed_at.get(chat_id)
+            if pushed_at:
+                self.reply_latencies.append(time.perf_counter() - pushed_at.popleft())
+
+        if method in TRUE_METHODS:
+            result = True
+        else:
+            reply_markup = params.get("reply_markup")
+            if isinstance(reply_markup, str):
+                reply_markup = json.loads(reply_markup)
+            result = {
+                "message_id": int(params.get("message_id") or next(self._message_ids)),
+                "from": {"id": 1, "is_bot": True, "first_name": "Pizza bot"},
+                "chat": {"id": chat_id, "type": "private"},
+                "date": int(time.time()),
+            }
+            if "text" in params:
+                result["text"] = params["text"]
+            if reply_markup and "inline_keyboard" in reply_markup:
+                result["reply_markup"] = reply_markup
+
+        subscriber = self._subscribers.get(chat_id)
+        if subscriber is not None:
+            subscriber.put_nowait(
+                {"method": method, "params": params, "result": result}
+            )
+        return result
+
+    def _injected_error(self, method: str) -> web.Response | None:
+        config = self._config
+        roll = self._random.random()
+        if roll < config.retry_after_rate:
+            self.injected["retry_after"] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": (
+                        f"Too Many Requests: retry after {config.retry_after}"
+                    ),
+                    "parameters": {"retry_after": config.retry_after},
+                },
+                status=429,
+            )
+        if roll < config.retry_after_rate + config.error_rate:
+            self.injected["error"] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 500,
+                    "description": "Internal Server Error",
+                },
+                status=500,
+            )
+        return None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(request.query)
+        if request.can_read_body:
+            body = await request.read()
+            if body:
+                params.update(json.loads(body))
+        self.calls[method] += 1
+
+        if method == "getUpdates":
+            updates = await self._get_updates(params)
+            return web.json_response({"ok": True, "result": updates})
+        if method not in MESSAGE_METHODS and method not in TRUE_METHODS:
+            return web.json_response(
+                {"ok": False, "error_code": 404, "description": "Not Found"},
+                status=404,
+            )
+
+        config = self._config
+        delay = config.latency + self._random.uniform(0, config.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        error = self._injected_error(method)
+        if error is not None:
+            return error
+        return web.json_response({"ok": True, "result": self._answer(method, params)})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 0
+    ) -> tuple[web.AppRunner, str]:
+        """Serve on host:port (0 picks a free port); returns the base URI."""
+        runner = web.AppRunner(self.create_app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return runner, f"http://{host}:{port}"
+
+
+def _chat_id(update: dict) -> int | None:
+    if "message" in update:
+        return update["message"]["chat"]["id"]
+    if "callback_query" in update:
+        return update["callback_query"]["message"]["chat"]["id"]
+    return None
+
+
+def load_jsonl(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+async def feed(api: FakeBotAPI, updates: list[dict], rate: float) -> None:
+    start = time.monotonic()
+    for i, update in enumerate(updates):
+        if rate > 0:
+            await asyncio.sleep(max(0.0, start + i / rate - time.monotonic()))
+        api.push_update(update)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--jsonl", help="file with one update per line")
+    source.add_argument(
+        "--users", type=int, default=1000, help="generated customers (default 1000)"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=0, help="updates/s, 0 pushes all at once"
+    )
+    args = parser.parse_args()
+
+    api = FakeBotAPI(FakeBotAPIConfig.from_env())
+    runner, base_uri = await api.start(
+        os.getenv("FAKE_API_HOST", "127.0.0.1"),
+        int(os.getenv("FAKE_API_PORT", "8081")),
+    )
+    print(f"Fake Bot API at {base_uri} (stats at {base_uri}/stats)")
+    updates = load_jsonl(args.jsonl) if args.jsonl else order_flow_updates(args.users)
+    try:
+        await feed(api, updates, args.rate)
+        while True:
+            await asyncio.sleep(5)
+            print(json.dumps(api.stats()))
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -1,11 +1,16 @@
-import json
-import asyncio
 from bot.handlers.handler import Handler, HandlerStatus
 from bot.domain.storage import Storage
 from bot.domain.messenger import Messenger
+from bot import menu
+
+HISTORY_PREVIEW_SIZE = 3
 
 
 class ContinueOrderHandler(Handler):
+    update_kind = "callback_query"
+    states = frozenset({"ORDER_COMPLETED"})
+    callback_prefixes = frozenset({"order_", "finish_"})
+
     async def can_handle(
         self,
         update: dict,
@@ -21,7 +26,7 @@ class ContinueOrderHandler(Handler):
             return False
 
         callback_data = update["callback_query"]["data"]
-        return callback_data in ["order_more", "finish_order"]
+        return callback_data in menu.NEXT_STEP_CHOICES
 
     async def handle(
         self,
@@ -34,88 +39,42 @@ class ContinueOrderHandler(Handler):
         telegram_id = update["callback_query"]["from"]["id"]
         callback_data = update["callback_query"]["data"]
 
-        await asyncio.gather(
-            messenger.answerCallbackQuery(
-                callback_query_id=update["callback_query"]["id"]
-            ),
-            messenger.deleteMessage(
-                chat_id=update["callback_query"]["message"]["chat"]["id"],
-                message_id=update["callback_query"]["message"]["message_id"],
-            ),
+        chat_id = update["callback_query"]["message"]["chat"]["id"]
+        message_id = update["callback_query"]["message"]["message_id"]
+
+        await messenger.answerCallbackQuery(
+            callback_query_id=update["callback_query"]["id"]
         )
 
         if callback_data == "order_more":
-            await storage.clear_current_order(telegram_id)
-            await storage.update_user_state(telegram_id, "WAIT_FOR_PIZZA_NAME")
-
-            await asyncio.gather(
-                messenger.sendMessage(
-                    chat_id=update["callback_query"]["message"]["chat"]["id"],
-                    text="🔄 Starting new order!",
-                    reply_markup=json.dumps({"remove_keyboard": True}),
-                ),
-                messenger.sendMessage(
-                    chat_id=update["callback_query"]["message"]["chat"]["id"],
-                    text="Please choose pizza type",
-                    reply_markup=json.dumps(
-                        {
-                            "inline_keyboard": [
-                                [
-                                    {
-                                        "text": "Margherita",
-                                        "callback_data": "pizza_margherita",
-                                    },
-                                    {
-                                        "text": "Pepperoni",
-                                        "callback_data": "pizza_pepperoni",
-                                    },
-                                ],
-                                [
-                                    {
-                                        "text": "Quattro Stagioni",
-                                        "callback_data": "pizza_quattro_stagioni",
-                                    },
-                                    {
-                                        "text": "Capricciosa",
-                                        "callback_data": "pizza_capricciosa",
-                                    },
-                                ],
-                                [
-                                    {
-                                        "text": "Diavola",
-                                        "callback_data": "pizza_diavola",
-                                    },
-                                    {
-                                        "text": "Prosciutto",
-                                        "callback_data": "pizza_prosciutto",
-                                    },
-                                ],
-                            ],
-                        }
-                    ),
-                ),
+            await storage.update_user_session(telegram_id, "WAIT_FOR_PIZZA_NAME", None)
+
+            await messenger.editMessageText(
+                chat_id=chat_id,
+                message_id=message_id,
+                text="🔄 Starting new order!\n\nPlease choose pizza type",
+                reply_markup=menu.PIZZA_KEYBOARD,
             )
         else:
             await storage.clear_current_order(telegram_id)
 
-            history = await storage.get_user_order_history(telegram_id)
+            history = await storage.get_user_order_history(
+                telegram_id, limit=HISTORY_PREVIEW_SIZE
+            )
             if history:
                 history_text = self._format_history(history)
-                await messenger.sendMessage(
-                    chat_id=update["callback_query"]["message"]["chat"]["id"],
-                    text=f"✅ Thank you for your orders! 👋\n\nYour order history:\n{history_text}\n\nType /start anytime to order again.",
-                )
+                text = f"✅ Thank you for your orders! 👋\n\nYour order history:\n{history_text}\n\nType /start anytime to order again."
             else:
-                await messenger.sendMessage(
-                    chat_id=update["callback_query"]["message"]["chat"]["id"],
-                    text="✅ Thank you for your order! See you soon! 👋\n\nType /start anytime to order again.",
-                )
+                text = "✅ Thank you for your order! See you soon! 👋\n\nType /start anytime to order again."
+            await messenger.editMessageText(
+                chat_id=chat_id, message_id=message_id, text=text
+            )
 
         return HandlerStatus.STOP
 
     def _format_history(self, history):
         history_text = []
-        for i, order in enumerate(history[-3:], 1):
+        for i, order in enumerate(history, 1):
             order_data = order["order_data"]
             items = []
             if order_data.get("pizza_name"):
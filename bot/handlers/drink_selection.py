@@ -1,11 +1,15 @@
-import json
 import asyncio
 from bot.handlers.handler import Handler, HandlerStatus
 from bot.domain.storage import Storage
 from bot.domain.messenger import Messenger
+from bot import menu
 
 
 class DrinkSelectionHandler(Handler):
+    update_kind = "callback_query"
+    states = frozenset({"WAIT_FOR_DRINKS"})
+    callback_prefixes = frozenset({"drink_"})
+
     async def can_handle(
         self,
         update: dict,
@@ -21,7 +25,7 @@ class DrinkSelectionHandler(Handler):
             return False
 
         callback_data = update["callback_query"]["data"]
-        return callback_data.startswith("drink_")
+        return callback_data in menu.DRINK_NAMES
 
     async def handle(
         self,
@@ -34,58 +38,23 @@ class DrinkSelectionHandler(Handler):
         telegram_id = update["callback_query"]["from"]["id"]
         callback_data = update["callback_query"]["data"]
 
-        drink_mapping = {
-            "drink_coke": "Coca-Cola",
-            "drink_pepsi": "Pepsi",
-            "drink_fanta": "Fanta",
-            "drink_sprite": "Sprite",
-            "drink_water": "Water",
-            "drink_none": "No drink",
-        }
-
-        drink = drink_mapping.get(callback_data)
+        drink = menu.DRINK_NAMES[callback_data]
         order_json["drink"] = drink
 
         await asyncio.gather(
-            storage.update_user_order_json(telegram_id, order_json),
-            storage.update_user_state(telegram_id, "WAIT_FOR_CONFIRMATION"),
+            storage.update_user_session(
+                telegram_id, "WAIT_FOR_CONFIRMATION", order_json
+            ),
             messenger.answerCallbackQuery(
                 callback_query_id=update["callback_query"]["id"]
             ),
         )
 
-        await asyncio.gather(
-            messenger.deleteMessage(
-                chat_id=update["callback_query"]["message"]["chat"]["id"],
-                message_id=update["callback_query"]["message"]["message_id"],
-            ),
-            messenger.sendMessage(
-                chat_id=update["callback_query"]["message"]["chat"]["id"],
-                text=f"📋 Your order:\n{self._format_order_summary(order_json)}\n\nPlease confirm your order:",
-                reply_markup=json.dumps(
-                    {
-                        "inline_keyboard": [
-                            [
-                                {
-                                    "text": "✅ Confirm Order",
-                                    "callback_data": "confirm_yes",
-                                },
-                                {"text": "❌ Cancel", "callback_data": "confirm_no"},
-                            ]
-                        ],
-                    }
-                ),
-            ),
+        await messenger.editMessageText(
+            chat_id=update["callback_query"]["message"]["chat"]["id"],
+            message_id=update["callback_query"]["message"]["message_id"],
+            text=f"📋 Your order:\n{menu.format_order_summary(order_json)}\n\nPlease confirm your order:",
+            reply_markup=menu.CONFIRM_KEYBOARD,
         )
 
         return HandlerStatus.STOP
-
-    def _format_order_summary(self, order_json):
-        summary = []
-        if order_json.get("pizza_name"):
-            summary.append(f"🍕 Pizza: {order_json['pizza_name']}")
-        if order_json.get("pizza_size"):
-            summary.append(f"📏 Size: {order_json['pizza_size']}")
-        if order_json.get("drink"):
-            summary.append(f"🥤 Drink: {order_json['drink']}")
-        return "\n".join(summary)
@@ -1,5 +1,4 @@
 import logging
-import time
 from bot.domain.storage import Storage
 from bot.domain.messenger import Messenger
 from bot.handlers.handler import Handler, HandlerStatus
@@ -8,6 +7,8 @@ logger = logging.getLogger(__name__)
 
 
 class EnsureUsersExists(Handler):
+    update_kind = "message"
+
     async def can_handle(
         self,
         update: dict,
@@ -26,14 +27,12 @@ class EnsureUsersExists(Handler):
         storage: Storage,
         messenger: Messenger,
     ) -> HandlerStatus:
-        start_time = time.time()
         telegram_id = update["message"]["from"]["id"]
 
         logger.info(f"[USER] → Ensuring user exists: {telegram_id}")
 
         await storage.ensure_user_exists(telegram_id)
 
-        duration_ms = (time.time() - start_time) * 1000
-        logger.info(f"[USER] ← User ensured - {duration_ms:.2f}ms")
+        logger.info(f"[USER] ← User ensured: {telegram_id}")
 
         return HandlerStatus.CONTINUE
@@ -10,6 +10,13 @@ class HandlerStatus(Enum):
 
 
 class Handler(ABC):
+    # Routing hints used by the Dispatcher to skip handlers that cannot
+    # match; None means "any". Callback data prefixes run up to and
+    # including the first underscore, e.g. "pizza_" for "pizza_diavola".
+    update_kind: str | None = None
+    states: frozenset[str | None] | None = None
+    callback_prefixes: frozenset[str] | None = None
+
     @abstractmethod
     async def can_handle(
         self,
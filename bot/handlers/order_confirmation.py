@@ -1,11 +1,15 @@
-import json
 import asyncio
 from bot.handlers.handler import Handler, HandlerStatus
 from bot.domain.storage import Storage
 from bot.domain.messenger import Messenger
+from bot import menu
 
 
 class OrderConfirmationHandler(Handler):
+    update_kind = "callback_query"
+    states = frozenset({"WAIT_FOR_CONFIRMATION"})
+    callback_prefixes = frozenset({"confirm_"})
+
     async def can_handle(
         self,
         update: dict,
@@ -21,7 +25,7 @@ class OrderConfirmationHandler(Handler):
             return False
 
         callback_data = update["callback_query"]["data"]
-        return callback_data.startswith("confirm_")
+        return callback_data in menu.CONFIRMATION_CHOICES
 
     async def handle(
         self,
@@ -34,63 +38,40 @@ class OrderConfirmationHandler(Handler):
         telegram_id = update["callback_query"]["from"]["id"]
         callback_data = update["callback_query"]["data"]
 
-        await asyncio.gather(
-            messenger.answerCallbackQuery(
-                callback_query_id=update["callback_query"]["id"]
-            ),
-            messenger.deleteMessage(
-                chat_id=update["callback_query"]["message"]["chat"]["id"],
-                message_id=update["callback_query"]["message"]["message_id"],
-            ),
+        chat_id = update["callback_query"]["message"]["chat"]["id"]
+        message_id = update["callback_query"]["message"]["message_id"]
+
+        await messenger.answerCallbackQuery(
+            callback_query_id=update["callback_query"]["id"]
         )
 
-        if callback_data == "confirm_yes":
+        if menu.CONFIRMATION_CHOICES[callback_data] == "yes":
             await storage.save_order_to_history(telegram_id, order_json)
 
-            order_summary = self._format_order_summary(order_json)
+            order_summary = menu.format_order_summary(order_json)
 
             await asyncio.gather(
-                messenger.sendMessage(
-                    chat_id=update["callback_query"]["message"]["chat"]["id"],
+                messenger.editMessageText(
+                    chat_id=chat_id,
+                    message_id=message_id,
                     text=f"✅ Order confirmed!\n\n{order_summary}\n\nThank you for your order! 🎉",
                 ),
                 storage.update_user_state(telegram_id, "ORDER_COMPLETED"),
             )
 
             await messenger.sendMessage(
-                chat_id=update["callback_query"]["message"]["chat"]["id"],
+                chat_id=chat_id,
                 text="What would you like to do next?",
-                reply_markup=json.dumps(
-                    {
-                        "inline_keyboard": [
-                            [
-                                {
-                                    "text": "🔄 Order More",
-                                    "callback_data": "order_more",
-                                },
-                                {"text": "✅ Finish", "callback_data": "finish_order"},
-                            ]
-                        ],
-                    }
-                ),
+                reply_markup=menu.NEXT_STEP_KEYBOARD,
             )
         else:
             await asyncio.gather(
-                messenger.sendMessage(
-                    chat_id=update["callback_query"]["message"]["chat"]["id"],
+                messenger.editMessageText(
+                    chat_id=chat_id,
+                    message_id=message_id,
                     text="❌ Order cancelled.\nType /start to begin again.",
                 ),
                 storage.clear_current_order(telegram_id),
             )
 
         return HandlerStatus.STOP
-
-    def _format_order_summary(self, order_json):
-        summary = []
-        if order_json.get("pizza_name"):
-            summary.append(f"🍕 Pizza: {order_json['pizza_name']}")
-        if order_json.get("pizza_size"):
-            summary.append(f"📏 Size: {order_json['pizza_size']}")
-        if order_json.get("drink"):
-            summary.append(f"🥤 Drink: {order_json['drink']}")
-        return "\n".join(summary)
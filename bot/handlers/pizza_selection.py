@@ -1,11 +1,15 @@
-import json
 import asyncio
 from bot.handlers.handler import Handler, HandlerStatus
 from bot.domain.storage import Storage
 from bot.domain.messenger import Messenger
+from bot import menu
 
 
 class PizzaSelectionHandler(Handler):
+    update_kind = "callback_query"
+    states = frozenset({"WAIT_FOR_PIZZA_NAME"})
+    callback_prefixes = frozenset({"pizza_"})
+
     async def can_handle(
         self,
         update: dict,
@@ -21,7 +25,7 @@ class PizzaSelectionHandler(Handler):
             return False
 
         callback_data = update["callback_query"]["data"]
-        return callback_data.startswith("pizza_")
+        return callback_data in menu.PIZZA_NAMES
 
     async def handle(
         self,
@@ -34,47 +38,22 @@ class PizzaSelectionHandler(Handler):
         telegram_id = update["callback_query"]["from"]["id"]
         callback_data = update["callback_query"]["data"]
 
-        pizza_name = callback_data.replace("pizza_", "").replace("_", " ").title()
+        pizza_name = menu.PIZZA_NAMES[callback_data]
 
         order_json["pizza_name"] = pizza_name
 
         await asyncio.gather(
-            storage.update_user_order_json(telegram_id, order_json),
-            storage.update_user_state(telegram_id, "WAIT_FOR_PIZZA_SIZE"),
+            storage.update_user_session(telegram_id, "WAIT_FOR_PIZZA_SIZE", order_json),
             messenger.answerCallbackQuery(
                 callback_query_id=update["callback_query"]["id"]
             ),
         )
 
-        await asyncio.gather(
-            messenger.deleteMessage(
-                chat_id=update["callback_query"]["message"]["chat"]["id"],
-                message_id=update["callback_query"]["message"]["message_id"],
-            ),
-            messenger.sendMessage(
-                chat_id=update["callback_query"]["message"]["chat"]["id"],
-                text="Please select pizza size",
-                reply_markup=json.dumps(
-                    {
-                        "inline_keyboard": [
-                            [
-                                {"text": "Small (25cm)", "callback_data": "size_small"},
-                                {
-                                    "text": "Medium (30cm)",
-                                    "callback_data": "size_medium",
-                                },
-                            ],
-                            [
-                                {"text": "Large (35cm)", "callback_data": "size_large"},
-                                {
-                                    "text": "Extra Large (40cm)",
-                                    "callback_data": "size_xl",
-                                },
-                            ],
-                        ],
-                    }
-                ),
-            ),
+        await messenger.editMessageText(
+            chat_id=update["callback_query"]["message"]["chat"]["id"],
+            message_id=update["callback_query"]["message"]["message_id"],
+            text="Please select pizza size",
+            reply_markup=menu.SIZE_KEYBOARD,
         )
 
         return HandlerStatus.STOP
@@ -1,11 +1,15 @@
-import json
 import asyncio
 from bot.handlers.handler import Handler, HandlerStatus
 from bot.domain.storage import Storage
 from bot.domain.messenger import Messenger
+from bot import menu
 
 
 class PizzaSizeHandler(Handler):
+    update_kind = "callback_query"
+    states = frozenset({"WAIT_FOR_PIZZA_SIZE"})
+    callback_prefixes = frozenset({"size_"})
+
     async def can_handle(
         self,
         update: dict,
@@ -21,7 +25,7 @@ class PizzaSizeHandler(Handler):
             return False
 
         callback_data = update["callback_query"]["data"]
-        return callback_data.startswith("size_")
+        return callback_data in menu.PIZZA_SIZES
 
     async def handle(
         self,
@@ -34,51 +38,21 @@ class PizzaSizeHandler(Handler):
         telegram_id = update["callback_query"]["from"]["id"]
         callback_data = update["callback_query"]["data"]
 
-        size_mapping = {
-            "size_small": "Small (25cm)",
-            "size_medium": "Medium (30cm)",
-            "size_large": "Large (35cm)",
-            "size_xl": "XL (40cm)",
-        }
-
-        pizza_size = size_mapping.get(callback_data)
+        pizza_size = menu.PIZZA_SIZES[callback_data]
         order_json["pizza_size"] = pizza_size
 
         await asyncio.gather(
-            storage.update_user_order_json(telegram_id, order_json),
-            storage.update_user_state(telegram_id, "WAIT_FOR_DRINKS"),
+            storage.update_user_session(telegram_id, "WAIT_FOR_DRINKS", order_json),
             messenger.answerCallbackQuery(
                 callback_query_id=update["callback_query"]["id"]
             ),
         )
 
-        await asyncio.gather(
-            messenger.deleteMessage(
-                chat_id=update["callback_query"]["message"]["chat"]["id"],
-                message_id=update["callback_query"]["message"]["message_id"],
-            ),
-            messenger.sendMessage(
-                chat_id=update["callback_query"]["message"]["chat"]["id"],
-                text=f"Great! {order_json.get('pizza_name')} - {pizza_size}\n\nNow choose a drink:",
-                reply_markup=json.dumps(
-                    {
-                        "inline_keyboard": [
-                            [
-                                {"text": "🥤 Coca-Cola", "callback_data": "drink_coke"},
-                                {"text": "🥤 Pepsi", "callback_data": "drink_pepsi"},
-                            ],
-                            [
-                                {"text": "🥤 Fanta", "callback_data": "drink_fanta"},
-                                {"text": "🥤 Sprite", "callback_data": "drink_sprite"},
-                            ],
-                            [
-                                {"text": "💧 Water", "callback_data": "drink_water"},
-                                {"text": "🚫 No drink", "callback_data": "drink_none"},
-                            ],
-                        ],
-                    }
-                ),
-            ),
+        await messenger.editMessageText(
+            chat_id=update["callback_query"]["message"]["chat"]["id"],
+            message_id=update["callback_query"]["message"]["message_id"],
+            text=f"Great! {order_json.get('pizza_name')} - {pizza_size}\n\nNow choose a drink:",
+            reply_markup=menu.DRINK_KEYBOARD,
         )
 
         return HandlerStatus.STOP
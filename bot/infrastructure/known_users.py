@@ -0,0 +1,30 @@
+import os
+from collections import OrderedDict
+
+
+class KnownUsers:
+    """Bounded LRU set of telegram_ids that already have a users row."""
+
+    def __init__(self, max_size: int | None = None) -> None:
+        if max_size is None:
+            max_size = int(os.getenv("KNOWN_USERS_CACHE_SIZE", "100000"))
+        self._max_size = max_size
+        self._ids: OrderedDict[int, None] = OrderedDict()
+
+    def __contains__(self, telegram_id: int) -> bool:
+        if telegram_id in self._ids:
+            self._ids.move_to_end(telegram_id)
+            return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, telegram_id: int) -> None:
+        self._ids[telegram_id] = None
+        self._ids.move_to_end(telegram_id)
+        if len(self._ids) > self._max_size:
+            self._ids.popitem(last=False)
+
+    def clear(self) -> None:
+        self._ids.clear()
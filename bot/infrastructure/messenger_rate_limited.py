@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from bot import metrics
+from bot.domain.messenger import Messenger
+from bot.infrastructure.messenger_telegram import TelegramRetryAfter
+
+http_logger = logging.getLogger("HTTP")
+
+OUTBOUND_QUEUE_DEPTH = metrics.gauge(
+    "bot_outbound_queue_depth", "Bot API requests waiting for a send slot"
+)
+OUTBOUND_CHATS = metrics.gauge(
+    "bot_outbound_chats", "Chats with queued outbound requests"
+)
+RETRY_AFTER_TOTAL = metrics.counter(
+    "bot_telegram_retry_after_total", "Requests throttled by the Bot API", ["method"]
+)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available, 0 when one is available now."""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self._rate
+
+    def take(self) -> None:
+        self._tokens -= 1
+
+    def block(self, seconds: float) -> None:
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        # One request may go out as soon as the pause ends.
+        self._tokens = 1
+        self._updated = self._blocked_until
+
+
+class RateLimitedMessenger(Messenger):
+    """Send Bot API requests through global and per-chat token buckets.
+
+    Requests addressed to a chat go through that chat's FIFO queue, so they
+    reach Telegram in the order they were made, even when a handler starts
+    several of them with ``asyncio.gather``. A request is queued before the
+    call first yields. When the Bot API answers 429, the chat is paused
+    for ``retry_after`` seconds and the request is retried, up to
+    ``max_retries`` times.
+    """
+
+    def __init__(
+        self,
+        messenger: Messenger,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: int = 3,
+        max_retries: int = 3,
+    ) -> None:
+        self._messenger = messenger
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._max_retries = max_retries
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self._queues: dict[int, deque] = {}
+        self._tasks: set[asyncio.Task] = set()
+        OUTBOUND_QUEUE_DEPTH.set_function(lambda: self.queue_depth)
+        OUTBOUND_CHATS.set_function(lambda: len(self._queues))
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _enqueue(self, chat_id: int, method: str, /, **kwargs) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(chat_id)
+        if queue is not None:
+            queue.append((method, kwargs, future))
+            return future
+
+        self._queues[chat_id] = deque([(method, kwargs, future)])
+        task = asyncio.create_task(self._drain(chat_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return future
+
+    async def _acquire(self, chat_bucket: TokenBucket) -> None:
+        while True:
+            now = time.monotonic()
+            delay = max(chat_bucket.delay(now), self._global_bucket.delay(now))
+            if delay <= 0:
+                chat_bucket.take()
+                self._global_bucket.take()
+                return
+            await asyncio.sleep(delay)
+
+    async def _drain(self, chat_id: int) -> None:
+        queue = self._queues[chat_id]
+        chat_bucket = self._chat_buckets.pop(chat_id, None)
+        if chat_bucket is None:
+            chat_bucket = TokenBucket(self._chat_rate, self._chat_burst)
+        try:
+            while queue:
+                method, kwargs, future = queue[0]
+                attempts = 0
+                while not future.done():
+                    await self._acquire(chat_bucket)
+                    try:
+                        result = await getattr(self._messenger, method)(**kwargs)
+                    except TelegramRetryAfter as e:
+                        RETRY_AFTER_TOTAL.inc(method=method)
+                        attempts += 1
+                        chat_bucket.block(e.retry_after)
+                        http_logger.warning(
+                            f"✗ {method} throttled for chat {chat_id}, "
+                            f"retry after {e.retry_after}s"
+                        )
+                        if attempts > self._max_retries and not future.done():
+                            future.set_exception(e)
+                    except Exception as e:  # noqa: BLE001
+                        # Whatever the call raised belongs to its caller,
+                        # who is waiting on the future.
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                queue.popleft()
+        finally:
+            del self._queues[chat_id]
+            self._keep_bucket(chat_id, chat_bucket)
+
+    def _keep_bucket(self, chat_id: int, chat_bucket: TokenBucket) -> None:
+        """Remember a chat's bucket only while it still limits the next send."""
+        now = time.monotonic()
+        if chat_bucket.delay(now) > 0:
+            self._chat_buckets[chat_id] = chat_bucket
+        if len(self._chat_buckets) > 1024:
+            self._chat_buckets = {
+                chat_id: bucket
+                for chat_id, bucket in self._chat_buckets.items()
+                if bucket.delay(now) > 0
+            }
+
+    async def close(self) -> None:
+        """Wait for queued requests, then close the wrapped messenger."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if hasattr(self._messenger, "close"):
+            await self._messenger.close()
+
+    async def sendMessage(self, chat_id: int, text: str, **kwargs) -> dict:
+        return await self._enqueue(
+            chat_id, "sendMessage", chat_id=chat_id, text=text, **kwargs
+        )
+
+    async def deleteMessage(self, chat_id: int, message_id: int) -> dict:
+        return await self._enqueue(
+            chat_id, "deleteMessage", chat_id=chat_id, message_id=message_id
+        )
+
+    async def editMessageText(
+        self, chat_id: int, message_id: int, text: str, **kwargs
+    ) -> dict:
+        return await self._enqueue(
+            chat_id,
+            "editMessageText",
+            chat_id=chat_id,
+            message_id=message_id,
+            text=text,
+            **kwargs,
+        )
+
+    async def editMessageReplyMarkup(
+        self, chat_id: int, message_id: int, **kwargs
+    ) -> dict:
+        return await self._enqueue(
+            chat_id,
+            "editMessageReplyMarkup",
+            chat_id=chat_id,
+            message_id=message_id,
+            **kwargs,
+        )
+
+    async def answerCallbackQuery(self, callback_query_id: str, **kwargs) -> dict:
+        # Not addressed to a chat and not counted against send limits.
+        return await self._messenger.answerCallbackQuery(callback_query_id, **kwargs)
+
+    async def getUpdates(self, **kwargs) -> dict:
+        return await self._messenger.getUpdates(**kwargs)
+
+    async def setWebhook(self, url: str, **kwargs) -> dict:
+        return await self._messenger.setWebhook(url, **kwargs)
@@ -1,55 +1,125 @@
 import logging
 import os
-import time
 
 import aiohttp
 from dotenv import load_dotenv
 
+from bot import metrics
 from bot.domain.messenger import Messenger
+from bot.infrastructure.telegram_transport import (
+    TelegramTransportConfig,
+    dumps_json,
+    loads_json,
+)
 
 load_dotenv()
 
 http_logger = logging.getLogger("HTTP")
 
+REQUEST_SECONDS = metrics.histogram(
+    "bot_telegram_request_seconds",
+    "Telegram Bot API call duration in seconds",
+    ["method"],
+)
+REQUEST_ERRORS = metrics.counter(
+    "bot_telegram_request_errors_total",
+    "Telegram Bot API calls that failed",
+    ["method"],
+)
+
+
+class TelegramAPIError(Exception):
+    def __init__(self, method: str, error_code: int | None, description: str) -> None:
+        super().__init__(f"{method} failed: {error_code} {description}")
+        self.method = method
+        self.error_code = error_code
+        self.description = description
+
+
+class TelegramRetryAfter(TelegramAPIError):
+    """The Bot API asked us to wait ``retry_after`` seconds (HTTP 429)."""
+
+    def __init__(
+        self, method: str, error_code: int | None, description: str, retry_after: float
+    ) -> None:
+        super().__init__(method, error_code, description)
+        self.retry_after = retry_after
+
+
+# What a Bot API call raises when Telegram or the network fails, as opposed
+# to a bug in the caller. ValueError covers a response that is not JSON.
+TELEGRAM_EXCEPTIONS: tuple[type[BaseException], ...] = (
+    TelegramAPIError,
+    aiohttp.ClientError,
+    TimeoutError,
+    ValueError,
+)
+
+
+def raise_for_response(method: str, response_json: dict) -> None:
+    if response_json.get("ok"):
+        return
+    error_code = response_json.get("error_code")
+    description = response_json.get("description", "")
+    retry_after = (response_json.get("parameters") or {}).get("retry_after")
+    if retry_after is not None:
+        raise TelegramRetryAfter(method, error_code, description, float(retry_after))
+    raise TelegramAPIError(method, error_code, description)
+
 
 class MessengerTelegram(Messenger):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        token: str | None = None,
+        transport: TelegramTransportConfig | None = None,
+    ) -> None:
         self._session: aiohttp.ClientSession | None = None
+        self._token = token or os.getenv("TOKEN")
+        self._transport = transport or TelegramTransportConfig.from_env()
+        self._endpoints: dict[str, str] = {}
 
     def _get_telegram_base_uri(self) -> str:
-        return f"https://api.telegram.org/bot{os.getenv('TOKEN')}"
+        return f"{self._transport.base_uri.rstrip('/')}/bot{self._token}"
 
     def _get_telegram_file_uri(self) -> str:
-        return f"https://api.telegram.org/file/bot{os.getenv('TOKEN')}"
+        return f"{self._transport.base_uri.rstrip('/')}/file/bot{self._token}"
+
+    def _get_endpoint(self, method: str) -> str:
+        endpoint = self._endpoints.get(method)
+        if endpoint is None:
+            endpoint = self._endpoints[method] = (
+                f"{self._get_telegram_base_uri()}/{method}"
+            )
+        return endpoint
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
+            self._session = self._transport.create_session()
         return self._session
 
     async def _make_request(self, method: str, **kwargs) -> dict:
-        url = f"{self._get_telegram_base_uri()}/{method}"
-        start_time = time.time()
+        fast_json = self._transport.fast_json
+        timer = metrics.timed(REQUEST_SECONDS, REQUEST_ERRORS, method=method)
 
         http_logger.info(f"+ POST {method}")
 
         try:
-            session = await self._get_session()
-            async with session.post(
-                url,
-                json=kwargs,
-                headers={"Content-Type": "application/json"},
-            ) as response:
-                response_json = await response.json()
-                assert response_json["ok"]
-
-                duration_ms = (time.time() - start_time) * 1000
-                http_logger.info(f"- POST {method} - {duration_ms:.2f}ms")
-
-                return response_json["result"]
+            with timer:
+                session = await self._get_session()
+                async with session.post(
+                    self._get_endpoint(method),
+                    data=dumps_json(kwargs, fast_json),
+                    timeout=self._transport.timeout_for(method, kwargs),
+                ) as response:
+                    response_json = loads_json(await response.read(), fast_json)
+                    raise_for_response(method, response_json)
+
+            http_logger.info(f"- POST {method} - {timer.elapsed * 1000:.2f}ms")
+            return response_json["result"]
         except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            http_logger.error(f"✗ POST {method} - {duration_ms:.2f}ms - Error: {e}")
+            http_logger.error(
+                f"✗ POST {method} - {timer.elapsed * 1000:.2f}ms - Error: {e}"
+            )
             raise
 
     async def close(self) -> None:
@@ -78,3 +148,27 @@ class MessengerTelegram(Messenger):
             chat_id=chat_id,
             message_id=message_id,
         )
+
+    async def editMessageText(
+        self, chat_id: int, message_id: int, text: str, **kwargs
+    ) -> dict:
+        return await self._make_request(
+            "editMessageText",
+            chat_id=chat_id,
+            message_id=message_id,
+            text=text,
+            **kwargs,
+        )
+
+    async def editMessageReplyMarkup(
+        self, chat_id: int, message_id: int, **kwargs
+    ) -> dict:
+        return await self._make_request(
+            "editMessageReplyMarkup",
+            chat_id=chat_id,
+            message_id=message_id,
+            **kwargs,
+        )
+
+    async def setWebhook(self, url: str, **kwargs) -> dict:
+        return await self._make_request("setWebhook", url=url, **kwargs)
@@ -0,0 +1,169 @@
+import logging
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_TABLES = [
+    """
+    CREATE TABLE broadcasts
+    (
+        id SERIAL PRIMARY KEY,
+        text TEXT NOT NULL,
+        checkpoint BIGINT DEFAULT NULL,
+        sent INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        finished_at TIMESTAMPTZ DEFAULT NULL
+    )
+    """,
+    """
+    CREATE TABLE broadcast_failures
+    (
+        broadcast_id INTEGER NOT NULL REFERENCES broadcasts (id),
+        telegram_id BIGINT NOT NULL,
+        error TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (broadcast_id, telegram_id)
+    )
+    """,
+]
+
+UPDATE_QUEUE_TABLES = [
+    """
+    CREATE TABLE update_queue
+    (
+        update_id BIGINT PRIMARY KEY,
+        telegram_id BIGINT,
+        payload JSONB NOT NULL,
+        enqueued_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        claimed_by TEXT DEFAULT NULL,
+        claimed_until TIMESTAMPTZ DEFAULT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX update_queue_telegram_id_idx ON update_queue (telegram_id, update_id)",
+    """
+    CREATE TABLE bot_state
+    (
+        key TEXT PRIMARY KEY,
+        value BIGINT NOT NULL
+    )
+    """,
+]
+
+PROCESSED_UPDATES_TABLES = [
+    """
+    CREATE TABLE processed_updates
+    (
+        update_id BIGINT PRIMARY KEY,
+        processed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    "CREATE INDEX processed_updates_processed_at_idx ON processed_updates (processed_at)",
+]
+
+# Append-only: (version, name, statements). A freshly recreated database
+# already has the latest schema and is marked as fully migrated.
+MIGRATIONS: list[tuple[int, str, list[str]]] = [
+    (
+        1,
+        "telegram_updates_jsonb_partitioned",
+        [
+            "ALTER TABLE telegram_updates RENAME TO telegram_updates_legacy",
+            """
+            CREATE TABLE telegram_updates
+            (
+                id BIGSERIAL,
+                update_id BIGINT NOT NULL,
+                received_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                payload JSONB NOT NULL,
+                PRIMARY KEY (id, received_at)
+            ) PARTITION BY RANGE (received_at)
+            """,
+            "CREATE TABLE telegram_updates_default PARTITION OF telegram_updates DEFAULT",
+            "CREATE INDEX telegram_updates_update_id_idx ON telegram_updates (update_id)",
+            # Older rows may hold a one-element list instead of the update.
+            """
+            INSERT INTO telegram_updates (update_id, payload)
+            SELECT (u.payload ->> 'update_id')::BIGINT, u.payload
+            FROM telegram_updates_legacy AS l
+            CROSS JOIN LATERAL (
+                SELECT CASE jsonb_typeof(l.payload::JSONB)
+                    WHEN 'array' THEN l.payload::JSONB -> 0
+                    ELSE l.payload::JSONB
+                END AS payload
+            ) AS u
+            ORDER BY l.id
+            """,
+            "DROP TABLE telegram_updates_legacy",
+        ],
+    ),
+    (
+        2,
+        "users_updated_at",
+        [
+            "ALTER TABLE users ADD COLUMN updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+        ],
+    ),
+    (
+        3,
+        "order_history_bigint_keyset_index",
+        [
+            "ALTER TABLE order_history ALTER COLUMN telegram_id TYPE BIGINT",
+            "UPDATE order_history SET created_at = now() WHERE created_at IS NULL",
+            "ALTER TABLE order_history ALTER COLUMN created_at SET NOT NULL",
+            """
+            CREATE INDEX order_history_telegram_id_created_at_idx
+            ON order_history (telegram_id, created_at DESC, id DESC)
+            """,
+        ],
+    ),
+    (4, "broadcasts", BROADCAST_TABLES),
+    (5, "update_queue", UPDATE_QUEUE_TABLES),
+    (6, "processed_updates", PROCESSED_UPDATES_TABLES),
+]
+
+
+async def create_migrations_table(conn: asyncpg.Connection) -> None:
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations
+        (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """)
+
+
+async def mark_all_applied(conn: asyncpg.Connection) -> None:
+    await create_migrations_table(conn)
+    await conn.executemany(
+        "INSERT INTO schema_migrations (version, name) VALUES ($1, $2) "
+        "ON CONFLICT (version) DO NOTHING",
+        [(version, name) for version, name, _ in MIGRATIONS],
+    )
+
+
+async def migrate(conn: asyncpg.Connection) -> list[int]:
+    await create_migrations_table(conn)
+    applied = {
+        row["version"]
+        for row in await conn.fetch("SELECT version FROM schema_migrations")
+    }
+
+    newly_applied = []
+    for version, name, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        async with conn.transaction():
+            for statement in statements:
+                await conn.execute(statement)
+            await conn.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                version,
+                name,
+            )
+        logger.info(f"[MIGRATE] applied {version} {name}")
+        newly_applied.append(version)
+    return newly_applied
@@ -0,0 +1,136 @@
+import os
+from dataclasses import dataclass
+
+import asyncpg
+
+# Hot-path statements. They are sent as the same text every time, so
+# asyncpg's per-connection statement cache (statement_cache_size) prepares
+# each one once, re-prepares it after a schema change, and skips preparing
+# altogether when the cache is disabled for pgbouncer.
+QUERIES: dict[str, str] = {
+    "get_user": "SELECT id, telegram_id, created_at, state, order_json FROM users WHERE telegram_id = $1",
+    "ensure_user_exists": "INSERT INTO users (telegram_id) VALUES ($1) ON CONFLICT (telegram_id) DO NOTHING",
+    "update_user_state": "UPDATE users SET state = $1, updated_at = now() WHERE telegram_id = $2",
+    "update_user_order_json": "UPDATE users SET order_json = $1, updated_at = now() WHERE telegram_id = $2",
+    "update_user_session": "UPDATE users SET state = $1, order_json = $2, updated_at = now() WHERE telegram_id = $3",
+    "clear_user_state_and_order": "UPDATE users SET state = NULL, order_json = NULL, updated_at = now() WHERE telegram_id = $1",
+    "clear_user_order_json": "UPDATE users SET order_json = NULL, updated_at = now() WHERE telegram_id = $1",
+    "persist_updates": (
+        "INSERT INTO telegram_updates (update_id, payload) "
+        "SELECT update_id, payload::JSONB FROM unnest($1::BIGINT[], $2::TEXT[]) "
+        "AS batch (update_id, payload)"
+    ),
+    "save_order_to_history": "INSERT INTO order_history (telegram_id, order_data) VALUES ($1, $2)",
+    "get_user_order_history": (
+        "SELECT id, order_data, created_at FROM order_history "
+        "WHERE telegram_id = $1 "
+        "ORDER BY created_at DESC, id DESC LIMIT $2"
+    ),
+    "get_user_order_history_before": (
+        "SELECT id, order_data, created_at FROM order_history "
+        "WHERE telegram_id = $1 AND (created_at, id) < ($2, $3) "
+        "ORDER BY created_at DESC, id DESC LIMIT $4"
+    ),
+    "get_user_ids": (
+        "SELECT telegram_id FROM users WHERE telegram_id > $1 "
+        "ORDER BY telegram_id LIMIT $2"
+    ),
+    "save_broadcast_failures": (
+        "INSERT INTO broadcast_failures (broadcast_id, telegram_id, error) "
+        "SELECT $1, telegram_id, error FROM unnest($2::BIGINT[], $3::TEXT[]) "
+        "AS failure (telegram_id, error) "
+        "ON CONFLICT (broadcast_id, telegram_id) "
+        "DO UPDATE SET error = EXCLUDED.error, created_at = now()"
+    ),
+    "enqueue_updates": (
+        "WITH queued AS ("
+        "INSERT INTO update_queue (update_id, telegram_id, payload) "
+        "SELECT update_id, telegram_id, payload::JSONB "
+        "FROM unnest($1::BIGINT[], $2::BIGINT[], $3::TEXT[]) "
+        "AS batch (update_id, telegram_id, payload) "
+        "ON CONFLICT (update_id) DO NOTHING) "
+        "INSERT INTO bot_state (key, value) VALUES ('update_queue_offset', $4) "
+        "ON CONFLICT (key) DO UPDATE SET value = GREATEST(bot_state.value, EXCLUDED.value)"
+    ),
+    # Only the oldest queued update of each user can be claimed, so a user's
+    # next update waits until the one before it is acknowledged.
+    "claim_updates": (
+        "UPDATE update_queue AS queue "
+        "SET claimed_by = $1, claimed_until = now() + make_interval(secs => $3), "
+        "attempts = queue.attempts + 1 "
+        "FROM ("
+        "SELECT head.update_id FROM update_queue AS head "
+        "WHERE (head.claimed_until IS NULL OR head.claimed_until < now()) "
+        "AND NOT EXISTS ("
+        "SELECT 1 FROM update_queue AS earlier "
+        "WHERE earlier.telegram_id = head.telegram_id "
+        "AND earlier.update_id < head.update_id) "
+        "ORDER BY head.update_id LIMIT $2 "
+        "FOR UPDATE SKIP LOCKED) AS claimable "
+        "WHERE queue.update_id = claimable.update_id "
+        "RETURNING queue.update_id, queue.payload, queue.attempts, queue.enqueued_at"
+    ),
+    "renew_update_claims": (
+        "UPDATE update_queue SET claimed_until = now() + make_interval(secs => $3) "
+        "WHERE update_id = ANY($1::BIGINT[]) AND claimed_by = $2"
+    ),
+    "save_polling_offset": (
+        "INSERT INTO bot_state (key, value) VALUES ('polling_offset', $1) "
+        "ON CONFLICT (key) DO UPDATE SET value = GREATEST(bot_state.value, EXCLUDED.value)"
+    ),
+    "claim_update_ids": (
+        "INSERT INTO processed_updates (update_id) SELECT unnest($1::BIGINT[]) "
+        "ON CONFLICT (update_id) DO NOTHING RETURNING update_id"
+    ),
+    "ack_updates": (
+        "DELETE FROM update_queue WHERE update_id = ANY($1::BIGINT[]) AND claimed_by = $2"
+    ),
+}
+
+
+def _get_optional_float(name: str, default: float | None) -> float | None:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return float(value)
+
+
+@dataclass(frozen=True)
+class PostgresPoolConfig:
+    min_size: int = 10
+    max_size: int = 10
+    max_inactive_connection_lifetime: float = 300.0
+    command_timeout: float | None = None
+    statement_cache_size: int = 100
+
+    @classmethod
+    def from_env(cls) -> "PostgresPoolConfig":
+        return cls(
+            min_size=int(os.getenv("POSTGRES_POOL_MIN_SIZE") or cls.min_size),
+            max_size=int(os.getenv("POSTGRES_POOL_MAX_SIZE") or cls.max_size),
+            max_inactive_connection_lifetime=_get_optional_float(
+                "POSTGRES_POOL_MAX_INACTIVE_LIFETIME",
+                cls.max_inactive_connection_lifetime,
+            ),
+            command_timeout=_get_optional_float(
+                "POSTGRES_COMMAND_TIMEOUT", cls.command_timeout
+            ),
+            statement_cache_size=int(
+                os.getenv("POSTGRES_STATEMENT_CACHE_SIZE") or cls.statement_cache_size
+            ),
+        )
+
+    async def create_pool(self, **connect_kwargs) -> asyncpg.Pool:
+        if self.min_size > self.max_size:
+            raise ValueError(
+                "POSTGRES_POOL_MIN_SIZE is greater than POSTGRES_POOL_MAX_SIZE"
+            )
+
+        return await asyncpg.create_pool(
+            min_size=self.min_size,
+            max_size=self.max_size,
+            max_inactive_connection_lifetime=self.max_inactive_connection_lifetime,
+            command_timeout=self.command_timeout,
+            statement_cache_size=self.statement_cache_size,
+            **connect_kwargs,
+        )
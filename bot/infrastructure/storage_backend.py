@@ -0,0 +1,17 @@
+import os
+
+from bot.domain.storage import Storage
+from bot.infrastructure.storage_memory import StorageMemory
+from bot.infrastructure.storage_postgres import StoragePostgres
+from bot.infrastructure.storage_sqlite import StorageSqlite
+
+
+def create_backend_storage() -> Storage:
+    backend = os.getenv("STORAGE_BACKEND", "postgres")
+    if backend == "postgres":
+        return StoragePostgres()
+    if backend == "sqlite":
+        return StorageSqlite()
+    if backend == "memory":
+        return StorageMemory.from_env()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+
+from bot.domain.storage import Storage
+from bot.infrastructure.storage_decorator import StorageDecorator
+from bot.infrastructure.storage_errors import STORAGE_EXCEPTIONS
+
+db_logger = logging.getLogger("DB")
+
+
+class BufferedUpdateStorage(StorageDecorator):
+    """Buffer raw updates in memory and write them in batches.
+
+    ``persist_update`` only appends to the buffer. A background task writes
+    the buffer with one ``persist_updates`` call when it reaches
+    ``max_batch_size`` updates or ``flush_interval`` seconds have passed.
+    ``close`` writes whatever is left. If the buffer holds more than
+    ``max_buffer_size`` updates because the database is down, the oldest are
+    dropped.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        max_batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_buffer_size: int = 10000,
+    ) -> None:
+        super().__init__(storage)
+        self._max_batch_size = max_batch_size
+        self._flush_interval = flush_interval
+        self._max_buffer_size = max_buffer_size
+        self._buffer: list[dict] = []
+        self._batch_ready = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+
+    @property
+    def buffer_depth(self) -> int:
+        return len(self._buffer)
+
+    async def persist_update(self, update: dict) -> None:
+        self._buffer.append(update)
+
+        if len(self._buffer) > self._max_buffer_size:
+            dropped = len(self._buffer) - self._max_buffer_size
+            del self._buffer[:dropped]
+            db_logger.error(f"✗ update buffer full - dropped {dropped} updates")
+
+        if len(self._buffer) >= self._max_batch_size:
+            self._batch_ready.set()
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_periodically())
+            self._flusher.add_done_callback(self._flusher_done)
+
+    @staticmethod
+    def _flusher_done(flusher: asyncio.Task) -> None:
+        if not flusher.cancelled() and flusher.exception() is not None:
+            # The next persist_update starts a new flusher.
+            db_logger.error(
+                f"✗ update flusher stopped - Error: {flusher.exception()!r}"
+            )
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            try:
+                async with asyncio.timeout(self._flush_interval):
+                    await self._batch_ready.wait()
+            except TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self._buffer:
+            batch = self._buffer[: self._max_batch_size]
+            del self._buffer[: len(batch)]
+            try:
+                await self._storage.persist_updates(batch)
+            except STORAGE_EXCEPTIONS as e:
+                # Keep the batch for the next attempt.
+                self._buffer[:0] = batch
+                db_logger.error(
+                    f"✗ flush updates - {len(batch)} updates, "
+                    f"{len(self._buffer)} buffered - Error: {e}"
+                )
+                return
+            except BaseException:
+                # Cancelled, or a bug: the batch stays buffered either way.
+                self._buffer[:0] = batch
+                raise
+
+    async def close(self) -> None:
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        self._flusher = None
+
+        await self.flush()
+        if self._buffer:
+            db_logger.error(f"✗ close - {len(self._buffer)} updates not saved")
+        await super().close()
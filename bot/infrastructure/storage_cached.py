@@ -0,0 +1,147 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+
+from bot.domain.storage import Storage
+from bot.infrastructure.storage_decorator import StorageDecorator
+
+db_logger = logging.getLogger("DB")
+
+
+class CachedStorage(StorageDecorator):
+    """Keep recently seen users in memory in front of another storage.
+
+    ``get_user`` is served from an LRU cache whose entries expire after
+    ``ttl`` seconds. Changes to state and order are written to the wrapped
+    storage first and then applied to the cached entry, so the cache never
+    holds data the database has not accepted. The TTL bounds how stale an
+    entry can get when another process changes the same user.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        max_size: int = 10000,
+        ttl: float = 300.0,
+    ) -> None:
+        super().__init__(storage)
+        self._max_size = max_size
+        self._ttl = ttl
+        self._users: OrderedDict[int, tuple[float, dict | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _put(self, telegram_id: int, user: dict | None) -> None:
+        self._users[telegram_id] = (time.monotonic() + self._ttl, user)
+        self._users.move_to_end(telegram_id)
+        while len(self._users) > self._max_size:
+            self._users.popitem(last=False)
+            self.evictions += 1
+
+    def _update(self, telegram_id: int, **fields) -> None:
+        entry = self._users.get(telegram_id)
+        if entry is None:
+            return
+        if entry[1] is None:
+            # The user row did not exist when cached; reload it next time.
+            del self._users[telegram_id]
+            return
+        entry[1].update(fields)
+
+    async def warm(self, limit: int) -> int:
+        users = await self._storage.get_recent_users(limit)
+        for user in reversed(users):
+            self._put(user["telegram_id"], user)
+        db_logger.info(f"- session cache warmed with {len(users)} users")
+        return len(users)
+
+    async def get_user(self, telegram_id: int) -> dict:
+        entry = self._users.get(telegram_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            self._users.move_to_end(telegram_id)
+            return dict(entry[1]) if entry[1] is not None else None
+
+        self.misses += 1
+        user = await self._storage.get_user(telegram_id)
+        self._put(telegram_id, user)
+        return dict(user) if user is not None else None
+
+    async def _write_through(self, telegram_id: int, write, **fields) -> None:
+        try:
+            await write
+        except BaseException:
+            self._users.pop(telegram_id, None)
+            raise
+        self._update(telegram_id, **fields)
+
+    async def ensure_user_exists(self, telegram_id: int) -> None:
+        await self._storage.ensure_user_exists(telegram_id)
+        entry = self._users.get(telegram_id)
+        if entry is not None and entry[1] is None:
+            del self._users[telegram_id]
+
+    async def update_user_state(self, telegram_id: int, state: str) -> None:
+        await self._write_through(
+            telegram_id,
+            self._storage.update_user_state(telegram_id, state),
+            state=state,
+        )
+
+    async def update_user_order_json(self, telegram_id: int, order_json: dict) -> None:
+        await self._write_through(
+            telegram_id,
+            self._storage.update_user_order_json(telegram_id, order_json),
+            order_json=json.dumps(order_json, ensure_ascii=False),
+        )
+
+    async def update_user_session(
+        self, telegram_id: int, state: str | None, order_json: dict | None
+    ) -> None:
+        await self._write_through(
+            telegram_id,
+            self._storage.update_user_session(telegram_id, state, order_json),
+            state=state,
+            order_json=(
+                json.dumps(order_json, ensure_ascii=False)
+                if order_json is not None
+                else None
+            ),
+        )
+
+    async def clear_user_order_json(self, telegram_id: int) -> None:
+        await self._write_through(
+            telegram_id,
+            self._storage.clear_user_order_json(telegram_id),
+            order_json=None,
+        )
+
+    async def clear_user_state_and_order(self, telegram_id: int) -> None:
+        await self._write_through(
+            telegram_id,
+            self._storage.clear_user_state_and_order(telegram_id),
+            state=None,
+            order_json=None,
+        )
+
+    async def clear_current_order(self, telegram_id: int) -> None:
+        await self._write_through(
+            telegram_id,
+            self._storage.clear_current_order(telegram_id),
+            state=None,
+            order_json=None,
+        )
+
+    async def recreate_database(self) -> None:
+        self._users.clear()
+        await self._storage.recreate_database()
@@ -0,0 +1,99 @@
+from bot.domain.storage import Storage
+
+
+class StorageDecorator(Storage):
+    """Storage that forwards every call to a wrapped storage.
+
+    Subclasses override only the methods they change.
+    """
+
+    def __init__(self, storage: Storage) -> None:
+        self._storage: Storage = storage
+
+    async def close(self) -> None:
+        if hasattr(self._storage, "close"):
+            await self._storage.close()
+
+    async def ensure_user_exists(self, telegram_id: int) -> None:
+        await self._storage.ensure_user_exists(telegram_id)
+
+    async def clear_user_order_json(self, telegram_id: int) -> None:
+        await self._storage.clear_user_order_json(telegram_id)
+
+    async def clear_user_state_and_order(self, telegram_id: int) -> None:
+        await self._storage.clear_user_state_and_order(telegram_id)
+
+    async def clear_current_order(self, telegram_id: int) -> None:
+        await self._storage.clear_current_order(telegram_id)
+
+    async def update_user_state(self, telegram_id: int, state: str) -> None:
+        await self._storage.update_user_state(telegram_id, state)
+
+    async def update_user_session(
+        self, telegram_id: int, state: str | None, order_json: dict | None
+    ) -> None:
+        await self._storage.update_user_session(telegram_id, state, order_json)
+
+    async def persist_update(self, update: dict) -> None:
+        await self._storage.persist_update(update)
+
+    async def persist_updates(self, updates: list[dict]) -> None:
+        await self._storage.persist_updates(updates)
+
+    async def update_user_order_json(self, telegram_id: int, order_json: dict) -> None:
+        await self._storage.update_user_order_json(telegram_id, order_json)
+
+    async def save_order_to_history(self, telegram_id: int, order_data: dict) -> None:
+        await self._storage.save_order_to_history(telegram_id, order_data)
+
+    async def get_user_order_history(
+        self, telegram_id: int, limit: int = 20, before: tuple | None = None
+    ) -> list:
+        return await self._storage.get_user_order_history(telegram_id, limit, before)
+
+    async def recreate_database(self) -> None:
+        await self._storage.recreate_database()
+
+    async def get_user(self, telegram_id: int) -> dict:
+        return await self._storage.get_user(telegram_id)
+
+    async def get_recent_users(self, limit: int) -> list[dict]:
+        return await self._storage.get_recent_users(limit)
+
+    async def get_user_ids(self, after: int | None, limit: int) -> list[int]:
+        return await self._storage.get_user_ids(after, limit)
+
+    async def create_broadcast(self, text: str) -> int:
+        return await self._storage.create_broadcast(text)
+
+    async def get_broadcast(self, broadcast_id: int) -> dict | None:
+        return await self._storage.get_broadcast(broadcast_id)
+
+    async def update_broadcast_progress(
+        self,
+        broadcast_id: int,
+        checkpoint: int | None,
+        sent: int,
+        failed: int,
+        finished: bool = False,
+    ) -> None:
+        await self._storage.update_broadcast_progress(
+            broadcast_id, checkpoint, sent, failed, finished
+        )
+
+    async def save_broadcast_failures(
+        self, broadcast_id: int, failures: list[tuple[int, str]]
+    ) -> None:
+        await self._storage.save_broadcast_failures(broadcast_id, failures)
+
+    async def get_polling_offset(self) -> int:
+        return await self._storage.get_polling_offset()
+
+    async def save_polling_offset(self, offset: int) -> None:
+        await self._storage.save_polling_offset(offset)
+
+    async def claim_update_ids(self, update_ids: list[int]) -> list[int]:
+        return await self._storage.claim_update_ids(update_ids)
+
+    async def release_update_ids(self, update_ids: list[int]) -> None:
+        await self._storage.release_update_ids(update_ids)
@@ -0,0 +1,12 @@
+import sqlite3
+
+import asyncpg
+
+# What a storage backend raises when the database fails or is out of reach,
+# as opposed to a bug in the caller.
+STORAGE_EXCEPTIONS: tuple[type[BaseException], ...] = (
+    asyncpg.PostgresError,
+    asyncpg.InterfaceError,
+    sqlite3.Error,
+    OSError,
+)
@@ -0,0 +1,433 @@
+import asyncio
+import bisect
+import json
+import logging
+import os
+import time
+from datetime import UTC, datetime, timedelta
+
+from bot.domain.storage import Storage
+from bot.infrastructure.telegram_transport import dumps_json, loads_json
+
+db_logger = logging.getLogger("DB")
+
+SNAPSHOT_VERSION = 1
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class _User:
+    __slots__ = ("created_at", "id", "order_json", "state")
+
+    def __init__(
+        self, user_id: int, created_at: int, state: str | None, order_json: str | None
+    ) -> None:
+        self.id = user_id
+        self.created_at = created_at
+        self.state = state
+        self.order_json = order_json
+
+
+# Times are kept as integer microseconds since the epoch, so a datetime
+# handed out in a history cursor converts back to exactly the same key.
+
+
+def _now() -> int:
+    return time.time_ns() // 1000
+
+
+def _timestamp(value: datetime) -> int:
+    return (value - EPOCH) // MICROSECOND
+
+
+def _datetime(timestamp: int) -> datetime:
+    return EPOCH + timestamp * MICROSECOND
+
+
+def _encode(data: dict | None) -> str | None:
+    # Same text as the SQL backends store, so order_json reads back identical.
+    return json.dumps(data, ensure_ascii=False) if data is not None else None
+
+
+class StorageMemory(Storage):
+    """Dict-backed storage for a single process, with optional snapshots.
+
+    Users are kept in least recently updated first order, so recent users
+    are read from the end of the dict. Order JSON is kept encoded, as the
+    SQL backends return it. Raw updates are capped at ``max_updates``,
+    oldest dropped first.
+
+    With ``snapshot_path`` set, the snapshot is loaded in ``__init__`` and
+    rewritten every ``snapshot_interval`` seconds while there are changes,
+    and once more on ``close``. Snapshots are written to a temporary file
+    and renamed over the old one, so a crash leaves the previous snapshot.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: str | None = None,
+        snapshot_interval: float = 60.0,
+        max_updates: int = 100_000,
+    ) -> None:
+        self._snapshot_path = snapshot_path
+        self._snapshot_interval = snapshot_interval
+        self._max_updates = max_updates
+        self._snapshotter: asyncio.Task | None = None
+        self._dirty = False
+        self._clear()
+        if snapshot_path is not None and os.path.exists(snapshot_path):
+            self._restore(snapshot_path)
+
+    @classmethod
+    def from_env(cls) -> "StorageMemory":
+        return cls(
+            snapshot_path=os.getenv("MEMORY_SNAPSHOT_PATH") or None,
+            snapshot_interval=float(os.getenv("MEMORY_SNAPSHOT_INTERVAL") or 60),
+            max_updates=int(os.getenv("MEMORY_MAX_UPDATES") or 100_000),
+        )
+
+    def _clear(self) -> None:
+        self._next_id = 1
+        self._users: dict[int, _User] = {}
+        self._sorted_ids: list[int] | None = None
+        # Per user, oldest first: (created_at, id, order_data as JSON)
+        self._history: dict[int, list[tuple[int, int, str]]] = {}
+        # update_id -> (received_at, payload as JSON)
+        self._updates: dict[int, tuple[int, str]] = {}
+        self._broadcasts: dict[int, dict] = {}
+        self._broadcast_failures: dict[tuple[int, int], tuple[str, int]] = {}
+        self._polling_offset = 0
+        # Oldest first, capped at max_updates like the raw updates.
+        self._processed_updates: dict[int, None] = {}
+
+    def _new_id(self) -> int:
+        new_id = self._next_id
+        self._next_id += 1
+        return new_id
+
+    def _changed(self) -> None:
+        self._dirty = True
+        if self._snapshot_path is not None and self._snapshotter is None:
+            self._snapshotter = asyncio.create_task(self._snapshot_periodically())
+
+    def _touch(self, telegram_id: int) -> _User | None:
+        """The user, moved to the most recently updated end."""
+        user = self._users.pop(telegram_id, None)
+        if user is not None:
+            self._users[telegram_id] = user
+            self._changed()
+        return user
+
+    # Snapshots
+
+    def _snapshot_data(self) -> dict:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "next_id": self._next_id,
+            "users": [
+                [telegram_id, user.id, user.created_at, user.state, user.order_json]
+                for telegram_id, user in self._users.items()
+            ],
+            "history": [
+                [telegram_id, *entry]
+                for telegram_id, entries in self._history.items()
+                for entry in entries
+            ],
+            "updates": [
+                [update_id, received_at, payload]
+                for update_id, (received_at, payload) in self._updates.items()
+            ],
+            "broadcasts": [dict(broadcast) for broadcast in self._broadcasts.values()],
+            "broadcast_failures": [
+                [broadcast_id, telegram_id, error, created_at]
+                for (broadcast_id, telegram_id), (
+                    error,
+                    created_at,
+                ) in self._broadcast_failures.items()
+            ],
+            "polling_offset": self._polling_offset,
+            "processed_updates": list(self._processed_updates),
+        }
+
+    @staticmethod
+    def _write_snapshot(path: str, data: dict) -> None:
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(dumps_json(data))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+
+    def _restore(self, path: str) -> None:
+        start = time.perf_counter()
+        with open(path, "rb") as file:
+            data = loads_json(file.read())
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version in {path}")
+
+        self._next_id = data["next_id"]
+        self._users = {
+            telegram_id: _User(user_id, created_at, state, order_json)
+            for telegram_id, user_id, created_at, state, order_json in data["users"]
+        }
+        for telegram_id, *entry in data["history"]:
+            self._history.setdefault(telegram_id, []).append(tuple(entry))
+        self._updates = {
+            update_id: (received_at, payload)
+            for update_id, received_at, payload in data["updates"]
+        }
+        self._broadcasts = {
+            broadcast["id"]: broadcast for broadcast in data["broadcasts"]
+        }
+        self._broadcast_failures = {
+            (broadcast_id, telegram_id): (error, created_at)
+            for broadcast_id, telegram_id, error, created_at in data[
+                "broadcast_failures"
+            ]
+        }
+        # Both are missing from snapshots written before they existed.
+        self._polling_offset = data.get("polling_offset", 0)
+        self._processed_updates = dict.fromkeys(data.get("processed_updates", ()))
+        db_logger.info(
+            f"✓ restored {len(self._users)} users from {path} - "
+            f"{(time.perf_counter() - start) * 1000:.2f}ms"
+        )
+
+    async def snapshot(self) -> None:
+        if self._snapshot_path is None:
+            raise ValueError("StorageMemory has no snapshot path")
+        # Copy the state on the loop; serialize and write off it.
+        data = self._snapshot_data()
+        self._dirty = False
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write_snapshot, self._snapshot_path, data)
+        except Exception:
+            self._dirty = True
+            raise
+        db_logger.info(
+            f"✓ snapshot of {len(data['users'])} users - "
+            f"{(time.perf_counter() - start) * 1000:.2f}ms"
+        )
+
+    async def _snapshot_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._snapshot_interval)
+            if not self._dirty:
+                continue
+            try:
+                await self.snapshot()
+            except (OSError, TypeError, ValueError) as e:
+                # A full disk or a value that does not serialize; the state
+                # stays dirty and the next interval tries again.
+                db_logger.error(f"✗ snapshot - Error: {e}")
+
+    async def close(self) -> None:
+        if self._snapshotter is not None:
+            self._snapshotter.cancel()
+            try:
+                await self._snapshotter
+            except asyncio.CancelledError:
+                pass
+            self._snapshotter = None
+        if self._snapshot_path is not None and self._dirty:
+            await self.snapshot()
+
+    # Storage
+
+    async def recreate_database(self) -> None:
+        self._clear()
+        self._changed()
+
+    async def persist_update(self, update: dict) -> None:
+        await self.persist_updates([update])
+
+    async def persist_updates(self, updates: list[dict]) -> None:
+        received_at = _now()
+        for update in updates:
+            payload = dumps_json(update).decode()
+            self._updates[update["update_id"]] = (received_at, payload)
+        while len(self._updates) > self._max_updates:
+            del self._updates[next(iter(self._updates))]
+        self._changed()
+
+    async def get_update(self, update_id: int) -> dict | None:
+        update = self._updates.get(update_id)
+        if update is None:
+            return None
+        received_at, payload = update
+        return {"payload": loads_json(payload), "received_at": _datetime(received_at)}
+
+    async def ensure_user_exists(self, telegram_id: int) -> None:
+        if telegram_id in self._users:
+            return
+        self._users[telegram_id] = _User(self._new_id(), _now(), None, None)
+        self._sorted_ids = None
+        self._changed()
+
+    async def get_user(self, telegram_id: int) -> dict | None:
+        user = self._users.get(telegram_id)
+        if user is None:
+            return None
+        return self._user_dict(telegram_id, user)
+
+    @staticmethod
+    def _user_dict(telegram_id: int, user: _User) -> dict:
+        return {
+            "id": user.id,
+            "telegram_id": telegram_id,
+            "created_at": _datetime(user.created_at),
+            "state": user.state,
+            "order_json": user.order_json,
+        }
+
+    async def get_recent_users(self, limit: int) -> list[dict]:
+        recent = []
+        for telegram_id in reversed(self._users):
+            if len(recent) >= limit:
+                break
+            recent.append(self._user_dict(telegram_id, self._users[telegram_id]))
+        return recent
+
+    async def update_user_state(self, telegram_id: int, state: str) -> None:
+        user = self._touch(telegram_id)
+        if user is not None:
+            user.state = state
+
+    async def update_user_order_json(self, telegram_id: int, order_json: dict) -> None:
+        user = self._touch(telegram_id)
+        if user is not None:
+            user.order_json = _encode(order_json)
+
+    async def update_user_session(
+        self, telegram_id: int, state: str | None, order_json: dict | None
+    ) -> None:
+        user = self._touch(telegram_id)
+        if user is not None:
+            user.state = state
+            user.order_json = _encode(order_json)
+
+    async def clear_user_order_json(self, telegram_id: int) -> None:
+        user = self._touch(telegram_id)
+        if user is not None:
+            user.order_json = None
+
+    async def clear_user_state_and_order(self, telegram_id: int) -> None:
+        await self.update_user_session(telegram_id, None, None)
+
+    async def clear_current_order(self, telegram_id: int) -> None:
+        await self.clear_user_state_and_order(telegram_id)
+
+    async def save_order_to_history(self, telegram_id: int, order_data: dict) -> None:
+        entries = self._history.setdefault(telegram_id, [])
+        # Keep entries sorted even if the wall clock steps back.
+        created_at = max(_now(), entries[-1][0]) if entries else _now()
+        entries.append((created_at, self._new_id(), _encode(order_data)))
+        self._changed()
+
+    async def get_user_order_history(
+        self, telegram_id: int, limit: int = 20, before: tuple | None = None
+    ) -> list:
+        entries = self._history.get(telegram_id, [])
+        end = len(entries)
+        if before is not None:
+            created_at, entry_id = before
+            end = bisect.bisect_left(entries, (_timestamp(created_at), entry_id))
+
+        history = []
+        for created_at, entry_id, order_data in reversed(
+            entries[max(0, end - limit) : end]
+        ):
+            history.append(
+                {
+                    "id": entry_id,
+                    "order_data": loads_json(order_data),
+                    "created_at": _datetime(created_at),
+                }
+            )
+        return history
+
+    async def get_user_ids(self, after: int | None, limit: int) -> list[int]:
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(self._users)
+        telegram_ids = self._sorted_ids
+        start = 0 if after is None else bisect.bisect_right(telegram_ids, after)
+        return telegram_ids[start : start + limit]
+
+    async def create_broadcast(self, text: str) -> int:
+        broadcast_id = self._new_id()
+        self._broadcasts[broadcast_id] = {
+            "id": broadcast_id,
+            "text": text,
+            "checkpoint": None,
+            "sent": 0,
+            "failed": 0,
+            "created_at": _now(),
+            "finished_at": None,
+        }
+        self._changed()
+        return broadcast_id
+
+    async def get_broadcast(self, broadcast_id: int) -> dict | None:
+        broadcast = self._broadcasts.get(broadcast_id)
+        if broadcast is None:
+            return None
+        return {
+            **broadcast,
+            "created_at": _datetime(broadcast["created_at"]),
+            "finished_at": (
+                _datetime(broadcast["finished_at"])
+                if broadcast["finished_at"] is not None
+                else None
+            ),
+        }
+
+    async def update_broadcast_progress(
+        self,
+        broadcast_id: int,
+        checkpoint: int | None,
+        sent: int,
+        failed: int,
+        finished: bool = False,
+    ) -> None:
+        broadcast = self._broadcasts.get(broadcast_id)
+        if broadcast is None:
+            return
+        broadcast.update(checkpoint=checkpoint, sent=sent, failed=failed)
+        if finished:
+            broadcast["finished_at"] = _now()
+        self._changed()
+
+    async def save_broadcast_failures(
+        self, broadcast_id: int, failures: list[tuple[int, str]]
+    ) -> None:
+        created_at = _now()
+        for telegram_id, error in failures:
+            self._broadcast_failures[(broadcast_id, telegram_id)] = (error, created_at)
+        if failures:
+            self._changed()
+
+    async def get_polling_offset(self) -> int:
+        return self._polling_offset
+
+    async def save_polling_offset(self, offset: int) -> None:
+        if offset > self._polling_offset:
+            self._polling_offset = offset
+            self._changed()
+
+    async def claim_update_ids(self, update_ids: list[int]) -> list[int]:
+        claimed = []
+        for update_id in sorted(update_ids):
+            if update_id not in self._processed_updates:
+                self._processed_updates[update_id] = None
+                claimed.append(update_id)
+        while len(self._processed_updates) > self._max_updates:
+            del self._processed_updates[next(iter(self._processed_updates))]
+        if claimed:
+            self._changed()
+        return claimed
+
+    async def release_update_ids(self, update_ids: list[int]) -> None:
+        for update_id in update_ids:
+            self._processed_updates.pop(update_id, None)
+        self._changed()
@@ -1,24 +1,74 @@
+import asyncio
+import functools
 import json
 import logging
 import os
-import time
+from datetime import UTC, date, datetime, timedelta
 
 import asyncpg
 from dotenv import load_dotenv
 
+from bot import metrics
+from bot.dispatcher import get_telegram_id_from_update
 from bot.domain.storage import Storage
+from bot.infrastructure.known_users import KnownUsers
+from bot.infrastructure.migrations_postgres import (
+    BROADCAST_TABLES,
+    PROCESSED_UPDATES_TABLES,
+    UPDATE_QUEUE_TABLES,
+    mark_all_applied,
+    migrate,
+)
+from bot.infrastructure.postgres_pool import QUERIES, PostgresPoolConfig
+
+UPDATE_PARTITION_PREFIX = "telegram_updates_p"
+MIN_BIGINT = -(2**63)
 
 load_dotenv()
 
 db_logger = logging.getLogger("DB")
 
+STORAGE_SECONDS = metrics.histogram(
+    "bot_storage_seconds", "Storage call duration in seconds", ["method"]
+)
+STORAGE_ERRORS = metrics.counter(
+    "bot_storage_errors_total", "Storage calls that raised", ["method"]
+)
+
+
+def _instrumented(function):
+    """Record the call duration per method and log failures."""
+    method = function.__name__
+    timed_function = metrics.timed(STORAGE_SECONDS, STORAGE_ERRORS, method=method)(
+        function
+    )
+
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await timed_function(*args, **kwargs)
+        except Exception as e:
+            db_logger.error(f"✗ {method} - Error: {e}")
+            raise
+
+    return wrapper
+
 
 class StoragePostgres(Storage):
-    def __init__(self) -> None:
+    def __init__(self, pool_config: PostgresPoolConfig | None = None) -> None:
         self._pool: asyncpg.Pool | None = None
+        self._pool_lock = asyncio.Lock()
+        self._pool_config = pool_config or PostgresPoolConfig.from_env()
+        self._known_users = KnownUsers()
 
     async def _get_pool(self) -> asyncpg.Pool:
-        if self._pool is None:
+        if self._pool is not None:
+            return self._pool
+
+        async with self._pool_lock:
+            if self._pool is not None:
+                return self._pool
+
             host = os.getenv("POSTGRES_HOST")
             port = os.getenv("POSTGRES_PORT")
             user = os.getenv("POSTGRES_USER")
@@ -36,14 +86,14 @@ class StoragePostgres(Storage):
             if database is None:
                 raise ValueError("POSTGRES_DATABASE environment is not set")
 
-            self._pool = await asyncpg.create_pool(
+            self._pool = await self._pool_config.create_pool(
                 host=host,
                 port=int(port),
                 user=user,
                 password=password,
                 database=database,
             )
-        return self._pool
+            return self._pool
 
     async def close(self) -> None:
         if self._pool:
@@ -54,296 +104,478 @@ class StoragePostgres(Storage):
         pool = await self._get_pool()
         return await pool.acquire()
 
-    async def persist_updates(self, update: dict) -> None:
-        sql_query = "INSERT INTO telegram_updates (payload) VALUES ($1)"
-        start_time = time.time()
+    @_instrumented
+    async def persist_updates(self, updates: list[dict]) -> None:
+        update_ids = [update["update_id"] for update in updates]
+        payloads = [
+            json.dumps(update, ensure_ascii=False, separators=(",", ":"))
+            for update in updates
+        ]
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(QUERIES["persist_updates"], update_ids, payloads)
 
-        db_logger.info(f"+ persist_update - {sql_query}")
+    @_instrumented
+    async def get_update(self, update_id: int) -> dict | None:
+        sql_query = (
+            "SELECT payload, received_at FROM telegram_updates WHERE update_id = $1"
+        )
 
-        payload = json.dumps(update, ensure_ascii=False, indent=2)
-        try:
-            pool = await self._get_pool()
-            async with pool.acquire() as conn:
-                await conn.execute(
-                    "INSERT INTO telegram_updates (payload) VALUES ($1)", payload
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            result = await conn.fetchrow(sql_query, update_id)
+
+        if result is None:
+            return None
+        return {
+            "payload": json.loads(result["payload"]),
+            "received_at": result["received_at"],
+        }
+
+    @_instrumented
+    async def ensure_update_partitions(self, days_ahead: int = 7) -> None:
+        """Create daily telegram_updates partitions up to days_ahead from today.
+
+        Rows that already landed in the default partition for a new day
+        (migrated rows, or a partition job that did not run) are moved into
+        it, since Postgres refuses a partition whose rows sit in the default.
+        """
+        today = datetime.now(UTC).date()
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            for offset in range(days_ahead + 1):
+                day = today + timedelta(days=offset)
+                name = f"{UPDATE_PARTITION_PREFIX}{day:%Y%m%d}"
+                if await conn.fetchval("SELECT to_regclass($1)", name) is not None:
+                    continue
+                start, end = (
+                    f"{day} 00:00:00+00",
+                    f"{day + timedelta(days=1)} 00:00:00+00",
                 )
+                async with conn.transaction():
+                    await conn.execute(
+                        f"CREATE TABLE {name} (LIKE telegram_updates INCLUDING DEFAULTS)"
+                    )
+                    await conn.execute(f"""
+                        WITH moved AS (
+                            DELETE FROM telegram_updates_default
+                            WHERE received_at >= '{start}' AND received_at < '{end}'
+                            RETURNING *
+                        )
+                        INSERT INTO {name} SELECT * FROM moved
+                        """)
+                    await conn.execute(f"""
+                        ALTER TABLE telegram_updates ATTACH PARTITION {name}
+                        FOR VALUES FROM ('{start}') TO ('{end}')
+                        """)
+
+    @_instrumented
+    async def drop_update_partitions(self, retention_days: int) -> list[str]:
+        """Drop daily partitions that only hold updates older than retention_days.
+
+        Older rows left in the default partition are deleted as well.
+        """
+        cutoff = datetime.now(UTC).date() - timedelta(days=retention_days)
+        dropped = []
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            partitions = await conn.fetch("""
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = 'telegram_updates'
+                """)
+            for partition in partitions:
+                name = partition["relname"]
+                if not name.startswith(UPDATE_PARTITION_PREFIX):
+                    continue
+                day = date.fromisoformat(name.removeprefix(UPDATE_PARTITION_PREFIX))
+                if day + timedelta(days=1) <= cutoff:
+                    await conn.execute(f"DROP TABLE {name}")
+                    dropped.append(name)
+            await conn.execute(
+                "DELETE FROM telegram_updates_default WHERE received_at < $1",
+                datetime.combine(cutoff, datetime.min.time(), UTC),
+            )
 
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.info(f"- persist_update - {duration_ms:.2f}ms")
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.error(f"✗ persist_update - {duration_ms:.2f}ms - Error: {e}")
-            raise
-
-    async def update_user_order_json(self, telegram_id: int, order_json: dict) -> None:
-        sql_query = "UPDATE users SET order_json = $1 WHERE telegram_id = $2"
-        start_time = time.time()
-
-        db_logger.info(f"+ update_user_order_json - {sql_query}")
+        return dropped
 
-        try:
-            pool = await self._get_pool()
-            async with pool.acquire() as conn:
-                await conn.execute(
-                    "UPDATE users SET order_json = $1 WHERE telegram_id = $2",
-                    json.dumps(order_json, ensure_ascii=False),
-                    telegram_id,
-                )
+    async def migrate(self) -> list[int]:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            return await migrate(conn)
 
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.info(f"- update_user_order_json - {duration_ms:.2f}ms")
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.error(
-                f"✗ update_user_order_json - {duration_ms:.2f}ms - Error: {e}"
+    @_instrumented
+    async def update_user_order_json(self, telegram_id: int, order_json: dict) -> None:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(
+                QUERIES["update_user_order_json"],
+                json.dumps(order_json, ensure_ascii=False),
+                telegram_id,
             )
-            raise
 
+    @_instrumented
     async def recreate_database(self) -> None:
-        start_time = time.time()
+        self._known_users.clear()
 
-        db_logger.info("+ recreate_database - DROP/CREATE TABLES")
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.execute("DROP TABLE IF EXISTS schema_migrations")
+            await conn.execute("DROP TABLE IF EXISTS bot_state")
+            await conn.execute("DROP TABLE IF EXISTS processed_updates")
+            await conn.execute("DROP TABLE IF EXISTS update_queue")
+            await conn.execute("DROP TABLE IF EXISTS broadcast_failures")
+            await conn.execute("DROP TABLE IF EXISTS broadcasts")
+            await conn.execute("DROP TABLE IF EXISTS telegram_updates")
+            await conn.execute("DROP TABLE IF EXISTS users")
+            await conn.execute("DROP TABLE IF EXISTS order_history")
+
+            await conn.execute("""
+                CREATE TABLE telegram_updates
+                (
+                    id BIGSERIAL,
+                    update_id BIGINT NOT NULL,
+                    received_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    payload JSONB NOT NULL,
+                    PRIMARY KEY (id, received_at)
+                ) PARTITION BY RANGE (received_at)
+                """)
+            await conn.execute(
+                "CREATE TABLE telegram_updates_default "
+                "PARTITION OF telegram_updates DEFAULT"
+            )
+            await conn.execute(
+                "CREATE INDEX telegram_updates_update_id_idx "
+                "ON telegram_updates (update_id)"
+            )
 
-        try:
-            pool = await self._get_pool()
-            async with pool.acquire() as conn:
-                await conn.execute("DROP TABLE IF EXISTS telegram_updates")
-                await conn.execute("DROP TABLE IF EXISTS users")
-                await conn.execute("DROP TABLE IF EXISTS order_history")
-
-                await conn.execute(
-                    """
-                    CREATE TABLE telegram_updates
-                    (
-                        id SERIAL PRIMARY KEY,
-                        payload TEXT NOT NULL
-                    )
-                    """
+            await conn.execute("""
+                CREATE TABLE users
+                (
+                    id SERIAL PRIMARY KEY,
+                    telegram_id BIGINT NOT NULL UNIQUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    state TEXT DEFAULT NULL,
+                    order_json TEXT DEFAULT NULL,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
                 )
-
-                await conn.execute(
-                    """
-                    CREATE TABLE users
-                    (
-                        id SERIAL PRIMARY KEY,
-                        telegram_id BIGINT NOT NULL UNIQUE,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        state TEXT DEFAULT NULL,
-                        order_json TEXT DEFAULT NULL
-                    )
-                    """
+                """)
+
+            await conn.execute("""
+                CREATE TABLE order_history
+                (
+                    id SERIAL PRIMARY KEY,
+                    telegram_id BIGINT NOT NULL,
+                    order_data TEXT NOT NULL,
+                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
                 )
+                """)
+            await conn.execute(
+                "CREATE INDEX order_history_telegram_id_created_at_idx "
+                "ON order_history (telegram_id, created_at DESC, id DESC)"
+            )
 
-                await conn.execute(
-                    """
-                    CREATE TABLE order_history
-                    (
-                        id SERIAL PRIMARY KEY,
-                        telegram_id INTEGER NOT NULL,
-                        order_data TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                    """
-                )
+            for statement in (
+                BROADCAST_TABLES + UPDATE_QUEUE_TABLES + PROCESSED_UPDATES_TABLES
+            ):
+                await conn.execute(statement)
 
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.info(f"- recreate_database - {duration_ms:.2f}ms")
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.error(f"✗ recreate_database - {duration_ms:.2f}ms - Error: {e}")
-            raise
+            await mark_all_applied(conn)
+
+        await self.ensure_update_partitions()
 
+    @_instrumented
     async def get_user(self, telegram_id: int) -> dict:
-        sql_query = "SELECT id, telegram_id, created_at, state, order_json FROM users WHERE telegram_id = $1"
-        start_time = time.time()
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            result = await conn.fetchrow(QUERIES["get_user"], telegram_id)
+            if result:
+                self._known_users.add(telegram_id)
+                user_data = {
+                    "id": result["id"],
+                    "telegram_id": result["telegram_id"],
+                    "created_at": result["created_at"],
+                    "state": result["state"],
+                    "order_json": result["order_json"],
+                }
+                return user_data
+
+            return None
+
+    @_instrumented
+    async def get_recent_users(self, limit: int) -> list[dict]:
+        sql_query = "SELECT id, telegram_id, created_at, state, order_json FROM users ORDER BY updated_at DESC LIMIT $1"
 
-        db_logger.info(f"+ get_user - {sql_query}")
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            results = await conn.fetch(sql_query, limit)
 
-        try:
-            pool = await self._get_pool()
-            async with pool.acquire() as conn:
-                result = await conn.fetchrow(
-                    "SELECT id, telegram_id, created_at, state, order_json FROM users WHERE telegram_id = $1",
-                    telegram_id,
-                )
-                if result:
-                    user_data = {
-                        "id": result["id"],
-                        "telegram_id": result["telegram_id"],
-                        "created_at": result["created_at"],
-                        "state": result["state"],
-                        "order_json": result["order_json"],
-                    }
-                    duration_ms = (time.time() - start_time) * 1000
-                    db_logger.info(f"- get_user - {duration_ms:.2f}ms")
-                    return user_data
-
-                duration_ms = (time.time() - start_time) * 1000
-                db_logger.info(f"- get_user - {duration_ms:.2f}ms (no result)")
-                return None
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.error(f"✗ get_user - {duration_ms:.2f}ms - Error: {e}")
-            raise
+        return [dict(result) for result in results]
 
+    @_instrumented
     async def clear_user_state_and_order(self, telegram_id: int) -> None:
-        sql_query = (
-            "UPDATE users SET state = NULL, order_json = NULL WHERE telegram_id = $1"
-        )
-        start_time = time.time()
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(QUERIES["clear_user_state_and_order"], telegram_id)
 
-        db_logger.info(f"+ clear_user_state_and_order - {sql_query}")
+    async def persist_update(self, update: dict) -> None:
+        await self.persist_updates([update])
 
-        try:
-            pool = await self._get_pool()
-            async with pool.acquire() as conn:
-                await conn.execute(
-                    "UPDATE users SET state = NULL, order_json = NULL WHERE telegram_id = $1",
-                    telegram_id,
-                )
+    @_instrumented
+    async def clear_user_order_json(self, telegram_id: int) -> None:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(QUERIES["clear_user_order_json"], telegram_id)
 
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.info(f"- clear_user_state_and_order - {duration_ms:.2f}ms")
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.error(
-                f"✗ clear_user_state_and_order - {duration_ms:.2f}ms - Error: {e}"
+    @_instrumented
+    async def update_user_state(self, telegram_id: int, state: str) -> None:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(QUERIES["update_user_state"], state, telegram_id)
+
+    @_instrumented
+    async def update_user_session(
+        self, telegram_id: int, state: str | None, order_json: dict | None
+    ) -> None:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(
+                QUERIES["update_user_session"],
+                state,
+                (
+                    json.dumps(order_json, ensure_ascii=False)
+                    if order_json is not None
+                    else None
+                ),
+                telegram_id,
             )
-            raise
 
-    async def persist_update(self, update: dict) -> None:
-        await self.persist_updates([update])
+    @_instrumented
+    async def ensure_user_exists(self, telegram_id: int) -> None:
+        if telegram_id in self._known_users:
+            return
 
-    async def clear_user_order_json(self, telegram_id: int) -> None:
-        sql_query = "UPDATE users SET order_json = NULL WHERE telegram_id = $1"
-        start_time = time.time()
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(QUERIES["ensure_user_exists"], telegram_id)
+        self._known_users.add(telegram_id)
 
-        db_logger.info(f"+ clear_user_order_json - {sql_query}")
+    @_instrumented
+    async def save_order_to_history(self, telegram_id: int, order_data: dict) -> None:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(
+                QUERIES["save_order_to_history"],
+                telegram_id,
+                json.dumps(order_data, ensure_ascii=False),
+            )
 
-        try:
-            pool = await self._get_pool()
-            async with pool.acquire() as conn:
-                await conn.execute(
-                    "UPDATE users SET order_json = NULL WHERE telegram_id = $1",
+    @_instrumented
+    async def get_user_order_history(
+        self, telegram_id: int, limit: int = 20, before: tuple | None = None
+    ) -> list:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            if before is None:
+                results = await conn.fetch(
+                    QUERIES["get_user_order_history"], telegram_id, limit
+                )
+            else:
+                results = await conn.fetch(
+                    QUERIES["get_user_order_history_before"],
                     telegram_id,
+                    *before,
+                    limit,
                 )
 
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.info(f"- clear_user_order_json - {duration_ms:.2f}ms")
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.error(
-                f"✗ clear_user_order_json - {duration_ms:.2f}ms - Error: {e}"
+        history = []
+        for result in results:
+            try:
+                order_data = json.loads(result["order_data"])
+            except json.JSONDecodeError:
+                continue
+            history.append(
+                {
+                    "id": result["id"],
+                    "order_data": order_data,
+                    "created_at": result["created_at"],
+                }
             )
-            raise
-
-    async def update_user_state(self, telegram_id: int, state: str) -> None:
-        sql_query = "UPDATE users SET state = $1 WHERE telegram_id = $2"
-        start_time = time.time()
+        return history
 
-        db_logger.info(f"+ update_user_state - {sql_query}")
+    async def clear_current_order(self, telegram_id: int) -> None:
+        await self.clear_user_state_and_order(telegram_id)
 
-        try:
-            pool = await self._get_pool()
-            async with pool.acquire() as conn:
-                await conn.execute(
-                    "UPDATE users SET state = $1 WHERE telegram_id = $2",
-                    state,
-                    telegram_id,
-                )
+    @_instrumented
+    async def get_user_ids(self, after: int | None, limit: int) -> list[int]:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                QUERIES["get_user_ids"], MIN_BIGINT if after is None else after, limit
+            )
+        return [row["telegram_id"] for row in rows]
 
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.info(f"- update_user_state - {duration_ms:.2f}ms")
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.error(f"✗ update_user_state - {duration_ms:.2f}ms - Error: {e}")
-            raise
+    @_instrumented
+    async def create_broadcast(self, text: str) -> int:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            return await conn.fetchval(
+                "INSERT INTO broadcasts (text) VALUES ($1) RETURNING id", text
+            )
 
-    async def ensure_user_exists(self, telegram_id: int) -> None:
-        start_time = time.time()
+    @_instrumented
+    async def get_broadcast(self, broadcast_id: int) -> dict | None:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT id, text, checkpoint, sent, failed, created_at, finished_at "
+                "FROM broadcasts WHERE id = $1",
+                broadcast_id,
+            )
+        return dict(row) if row is not None else None
+
+    @_instrumented
+    async def update_broadcast_progress(
+        self,
+        broadcast_id: int,
+        checkpoint: int | None,
+        sent: int,
+        failed: int,
+        finished: bool = False,
+    ) -> None:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.execute(
+                "UPDATE broadcasts SET checkpoint = $2, sent = $3, failed = $4, "
+                "finished_at = CASE WHEN $5 THEN now() ELSE finished_at END "
+                "WHERE id = $1",
+                broadcast_id,
+                checkpoint,
+                sent,
+                failed,
+                finished,
+            )
 
-        db_logger.info("+ ensure_user_exists - SELECT/INSERT users")
+    @_instrumented
+    async def save_broadcast_failures(
+        self, broadcast_id: int, failures: list[tuple[int, str]]
+    ) -> None:
+        if not failures:
+            return
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(
+                QUERIES["save_broadcast_failures"],
+                broadcast_id,
+                [telegram_id for telegram_id, _ in failures],
+                [error for _, error in failures],
+            )
 
-        try:
-            pool = await self._get_pool()
-            async with pool.acquire() as conn:
-                result = await conn.fetchrow(
-                    "SELECT 1 FROM users WHERE telegram_id = $1", telegram_id
-                )
-                if result is None:
-                    await conn.execute(
-                        "INSERT INTO users(telegram_id) VALUES($1)", telegram_id
-                    )
+    @_instrumented
+    async def enqueue_updates(self, updates: list[dict]) -> None:
+        """Queue updates and record the next getUpdates offset atomically.
 
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.info(f"- ensure_user_exists - {duration_ms:.2f}ms")
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.error(f"✗ ensure_user_exists - {duration_ms:.2f}ms - Error: {e}")
-            raise
+        Updates already in the queue are skipped, so a batch that Telegram
+        delivers twice is queued once.
+        """
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(
+                QUERIES["enqueue_updates"],
+                [update["update_id"] for update in updates],
+                [get_telegram_id_from_update(update) for update in updates],
+                [
+                    json.dumps(update, ensure_ascii=False, separators=(",", ":"))
+                    for update in updates
+                ],
+                max(update["update_id"] for update in updates) + 1,
+            )
 
-    async def save_order_to_history(self, telegram_id: int, order_data: dict) -> None:
-        sql_query = (
-            "INSERT INTO order_history (telegram_id, order_data) VALUES ($1, $2)"
-        )
-        start_time = time.time()
+    async def _get_offset(self, key: str) -> int:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            offset = await conn.fetchval(
+                "SELECT value FROM bot_state WHERE key = $1", key
+            )
+        return offset or 0
 
-        db_logger.info(f"+ save_order_to_history - {sql_query}")
+    @_instrumented
+    async def get_update_queue_offset(self) -> int:
+        return await self._get_offset("update_queue_offset")
 
-        try:
-            pool = await self._get_pool()
-            async with pool.acquire() as conn:
-                await conn.execute(
-                    "INSERT INTO order_history (telegram_id, order_data) VALUES ($1, $2)",
-                    telegram_id,
-                    json.dumps(order_data, ensure_ascii=False),
-                )
+    @_instrumented
+    async def claim_updates(self, worker: str, limit: int, lease: float) -> list[dict]:
+        """Claim up to ``limit`` queued updates for ``lease`` seconds.
 
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.info(f"- save_order_to_history - {duration_ms:.2f}ms")
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.error(
-                f"✗ save_order_to_history - {duration_ms:.2f}ms - Error: {e}"
+        At most one update per user is claimed: the oldest one queued.
+        Updates whose lease ran out are claimed again.
+        """
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(QUERIES["claim_updates"], worker, limit, lease)
+        return [
+            {
+                "update_id": row["update_id"],
+                "payload": json.loads(row["payload"]),
+                "attempts": row["attempts"],
+                "enqueued_at": row["enqueued_at"],
+            }
+            for row in sorted(rows, key=lambda row: row["update_id"])
+        ]
+
+    @_instrumented
+    async def renew_update_claims(
+        self, worker: str, update_ids: list[int], lease: float
+    ) -> None:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(
+                QUERIES["renew_update_claims"], update_ids, worker, lease
             )
-            raise
 
-    async def get_user_order_history(self, telegram_id: int) -> list:
-        sql_query = "SELECT order_data, created_at FROM order_history WHERE telegram_id = $1 ORDER BY created_at DESC"
-        start_time = time.time()
+    @_instrumented
+    async def ack_updates(self, worker: str, update_ids: list[int]) -> None:
+        """Remove handled updates, unless their claim has passed to another worker."""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(QUERIES["ack_updates"], update_ids, worker)
 
-        db_logger.info(f"+ get_user_order_history - {sql_query}")
+    @_instrumented
+    async def get_polling_offset(self) -> int:
+        return await self._get_offset("polling_offset")
 
-        try:
-            pool = await self._get_pool()
-            async with pool.acquire() as conn:
-                results = await conn.fetch(
-                    "SELECT order_data, created_at FROM order_history WHERE telegram_id = $1 ORDER BY created_at DESC",
-                    telegram_id,
-                )
+    @_instrumented
+    async def save_polling_offset(self, offset: int) -> None:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval(QUERIES["save_polling_offset"], offset)
 
-                history = []
-                for result in results:
-                    try:
-                        order_data = json.loads(result["order_data"])
-                        history.append(
-                            {
-                                "order_data": order_data,
-                                "created_at": result["created_at"],
-                            }
-                        )
-                    except json.JSONDecodeError:
-                        continue
+    @_instrumented
+    async def claim_update_ids(self, update_ids: list[int]) -> list[int]:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(QUERIES["claim_update_ids"], update_ids)
+        return sorted(row["update_id"] for row in rows)
 
-                duration_ms = (time.time() - start_time) * 1000
-                db_logger.info(f"- get_user_order_history - {duration_ms:.2f}ms")
-                return history
-        except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
-            db_logger.error(
-                f"✗ get_user_order_history - {duration_ms:.2f}ms - Error: {e}"
+    @_instrumented
+    async def release_update_ids(self, update_ids: list[int]) -> None:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.execute(
+                "DELETE FROM processed_updates WHERE update_id = ANY($1::BIGINT[])",
+                update_ids,
             )
-            raise
 
-    async def clear_current_order(self, telegram_id: int) -> None:
-        await self.clear_user_state_and_order(telegram_id)
+    @_instrumented
+    async def delete_processed_updates(self, retention_days: int) -> int:
+        """Forget processed update ids older than retention_days."""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            status = await conn.execute(
+                "DELETE FROM processed_updates "
+                "WHERE processed_at < now() - make_interval(days => $1)",
+                retention_days,
+            )
+        return int(status.split()[-1])
@@ -1,149 +1,496 @@
-import sqlite3
-import os
+import asyncio
 import json
-
-from bot.domain.storage import Storage
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
 
 from dotenv import load_dotenv
 
+from bot.domain.storage import Storage
+from bot.infrastructure.known_users import KnownUsers
+
 load_dotenv()
 
+db_logger = logging.getLogger("DB")
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -20000",
+    "PRAGMA mmap_size = 268435456",
+)
+
+USER_COLUMNS = "id, telegram_id, created_at, state, order_json"
+
+BROADCAST_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS broadcasts
+    (
+        id INTEGER PRIMARY KEY,
+        text TEXT NOT NULL,
+        checkpoint INTEGER DEFAULT NULL,
+        sent INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP DEFAULT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS broadcast_failures
+    (
+        broadcast_id INTEGER NOT NULL REFERENCES broadcasts (id),
+        telegram_id INTEGER NOT NULL,
+        error TEXT NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (broadcast_id, telegram_id)
+    )
+    """,
+)
+
+STATE_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS bot_state
+    (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS processed_updates
+    (
+        update_id INTEGER PRIMARY KEY,
+        processed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+)
+
+
+def _user_from_row(row: tuple) -> dict:
+    return {
+        "id": row[0],
+        "telegram_id": row[1],
+        "created_at": row[2],
+        "state": row[3],
+        "order_json": row[4],
+    }
+
 
 class StorageSqlite(Storage):
-    def recreate_database() -> None:
-        with sqlite3.connect(os.getenv("SQLITE_DATABASE_PATH")) as connection:
-            with connection:
-                connection.execute("DROP TABLE IF EXISTS telegram_updates")
-                connection.execute("DROP TABLE IF EXISTS users")
-                connection.execute("DROP TABLE IF EXISTS order_history")
-
-                connection.execute(
-                    """
-                    CREATE TABLE telegram_updates
-                    (
-                        id INTEGER PRIMARY KEY,
-                        payload TEXT NOT NULL
-                    )
-                    """
-                )
+    """SQLite storage served by one long-lived connection on its own thread.
+
+    Calls are queued to the thread and awaited from the event loop. The
+    thread takes whatever has queued up (at most ``max_batch_size`` calls)
+    and runs it in one transaction, each call under its own savepoint, so
+    a failing call is rolled back alone and the rest share a single commit.
+    """
+
+    def __init__(self, path: str | None = None, max_batch_size: int = 256) -> None:
+        self._path = path or os.getenv("SQLITE_DATABASE_PATH")
+        if self._path is None:
+            raise ValueError("SQLITE_DATABASE_PATH environment is not set")
+        self._max_batch_size = max_batch_size
+        self._jobs: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._known_users = KnownUsers()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self._path, isolation_level=None)
+        try:
+            for pragma in PRAGMAS:
+                connection.execute(pragma)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(users)")}
+            if columns and "updated_at" not in columns:
+                # Databases created before users.updated_at existed.
+                connection.execute("ALTER TABLE users ADD COLUMN updated_at TIMESTAMP")
+            for statement in BROADCAST_TABLES + STATE_TABLES:
+                connection.execute(statement)
+        except sqlite3.Error:
+            connection.close()
+            raise
+        return connection
 
-                connection.execute(
-                    """
-                    CREATE TABLE users
-                    (
-                        id INTEGER PRIMARY KEY,
-                        telegram_id INTEGER NOT NULL UNIQUE,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        state TEXT DEFAULT NULL,
-                        order_json TEXT DEFAULT NULL
-                    )
-                    """
+    def _run(self) -> None:
+        connection = None
+        try:
+            stopping = False
+            while not stopping:
+                batch = [self._jobs.get()]
+                while len(batch) < self._max_batch_size:
+                    try:
+                        batch.append(self._jobs.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in batch:
+                    stopping = True
+                    batch = [job for job in batch if job is not None]
+                if not batch:
+                    continue
+                if connection is None:
+                    # Connected lazily, so a database that cannot be opened
+                    # fails each batch instead of leaving its callers waiting.
+                    try:
+                        connection = self._connect()
+                    except sqlite3.Error as e:
+                        db_logger.error(f"✗ sqlite connect {self._path} - Error: {e}")
+                        for _, future in batch:
+                            if future.set_running_or_notify_cancel():
+                                future.set_exception(e)
+                        continue
+                self._run_batch(connection, batch)
+        finally:
+            if connection is not None:
+                connection.close()
+
+    @staticmethod
+    def _run_batch(connection: sqlite3.Connection, batch: list) -> None:
+        batch = [
+            (function, future)
+            for function, future in batch
+            if future.set_running_or_notify_cancel()
+        ]
+        outcomes = []
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for function, future in batch:
+                connection.execute("SAVEPOINT call")
+                try:
+                    result = function(connection)
+                except Exception as e:  # noqa: BLE001
+                    # Whatever the call raised belongs to its caller.
+                    connection.execute("ROLLBACK TO call")
+                    outcomes.append((future, None, e))
+                else:
+                    outcomes.append((future, result, None))
+                connection.execute("RELEASE call")
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            db_logger.error(f"✗ sqlite batch of {len(batch)} - Error: {e}")
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def _call(self, function: Callable[[sqlite3.Connection], object]):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="sqlite-storage", daemon=True
+            )
+            self._thread.start()
+        elif not self._thread.is_alive():
+            raise RuntimeError("sqlite writer thread has stopped")
+        future = Future()
+        self._jobs.put((function, future))
+        return await asyncio.wrap_future(future)
+
+    async def close(self) -> None:
+        if self._thread is None:
+            return
+        self._jobs.put(None)
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+
+    async def recreate_database(self) -> None:
+        self._known_users.clear()
+
+        def recreate(connection: sqlite3.Connection) -> None:
+            connection.execute("DROP TABLE IF EXISTS processed_updates")
+            connection.execute("DROP TABLE IF EXISTS bot_state")
+            connection.execute("DROP TABLE IF EXISTS broadcast_failures")
+            connection.execute("DROP TABLE IF EXISTS broadcasts")
+            connection.execute("DROP TABLE IF EXISTS telegram_updates")
+            connection.execute("DROP TABLE IF EXISTS users")
+            connection.execute("DROP TABLE IF EXISTS order_history")
+
+            connection.execute("""
+                CREATE TABLE telegram_updates
+                (
+                    id INTEGER PRIMARY KEY,
+                    update_id INTEGER NOT NULL,
+                    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    payload TEXT NOT NULL
                 )
+                """)
+            connection.execute(
+                "CREATE INDEX telegram_updates_update_id_idx "
+                "ON telegram_updates (update_id)"
+            )
 
-                connection.execute(
-                    """
-                    CREATE TABLE order_history
-                    (
-                        id INTEGER PRIMARY KEY,
-                        telegram_id INTEGER NOT NULL,
-                        order_data TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                    """
+            connection.execute("""
+                CREATE TABLE users
+                (
+                    id INTEGER PRIMARY KEY,
+                    telegram_id INTEGER NOT NULL UNIQUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    state TEXT DEFAULT NULL,
+                    order_json TEXT DEFAULT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
+                """)
 
-    def persist_updates(self, update: dict) -> None:
-        payload = json.dumps(update, ensure_ascii=False, indent=2)
-        with sqlite3.connect(os.getenv("SQLITE_DATABASE_PATH")) as connection:
-            with connection:
-                connection.execute(
-                    "INSERT INTO telegram_updates (payload) VALUES (?)", (payload,)
+            connection.execute("""
+                CREATE TABLE order_history
+                (
+                    id INTEGER PRIMARY KEY,
+                    telegram_id INTEGER NOT NULL,
+                    order_data TEXT NOT NULL,
+                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
                 )
+                """)
+            connection.execute(
+                "CREATE INDEX order_history_telegram_id_created_at_idx "
+                "ON order_history (telegram_id, created_at DESC, id DESC)"
+            )
 
-    def ensure_user_exists(self, telegram_id: int) -> None:
+            for statement in BROADCAST_TABLES + STATE_TABLES:
+                connection.execute(statement)
+
+        await self._call(recreate)
+
+    async def persist_updates(self, updates: list[dict]) -> None:
+        rows = [
+            (
+                update["update_id"],
+                json.dumps(update, ensure_ascii=False, separators=(",", ":")),
+            )
+            for update in updates
+        ]
+        await self._call(
+            lambda connection: connection.executemany(
+                "INSERT INTO telegram_updates (update_id, payload) VALUES (?, ?)",
+                rows,
+            )
+        )
+
+    async def persist_update(self, update: dict) -> None:
+        await self.persist_updates([update])
+
+    async def ensure_user_exists(self, telegram_id: int) -> None:
         """Ensure a user with the given telegram_id exists in the users table."""
-        with sqlite3.connect(os.getenv("SQLITE_DATABASE_PATH")) as connection:
-            cursor = connection.execute(
-                "SELECT 1 FROM users WHERE telegram_id = ?", (telegram_id,)
+        if telegram_id in self._known_users:
+            return
+
+        await self._call(
+            lambda connection: connection.execute(
+                "INSERT INTO users (telegram_id) VALUES (?) "
+                "ON CONFLICT (telegram_id) DO NOTHING",
+                (telegram_id,),
             )
-            if cursor.fetchone() is None:
-                print(f"👤 Creating new user: {telegram_id}")
-                connection.execute(
-                    "INSERT INTO users(telegram_id) VALUES(?)", (telegram_id,)
-                )
-            else:
-                print(f"👤 User already exists: {telegram_id}")
-
-    def get_user(self, telegram_id: int) -> dict:
-        with sqlite3.connect(os.getenv("SQLITE_DATABASE_PATH")) as connection:
-            with connection:
-                cursor = connection.execute(
-                    "SELECT id, telegram_id, created_at, state, order_json FROM users WHERE telegram_id = ?",
-                    (telegram_id,),
-                )
-                result = cursor.fetchone()
-                if result:
-                    return {
-                        "id": result[0],
-                        "telegram_id": result[1],
-                        "created_at": result[2],
-                        "state": result[3],
-                        "order_json": result[4],
-                    }
-                return None
-
-    def clear_user_state_and_order(self, telegram_id: int) -> None:
-        with sqlite3.connect(os.getenv("SQLITE_DATABASE_PATH")) as connection:
-            with connection:
-                connection.execute(
-                    "Update users SET state = NULL, order_json = NULL WHERE telegram_id = ?",
-                    (telegram_id,),
-                )
+        )
+        self._known_users.add(telegram_id)
 
-    def update_user_order_json(self, telegram_id: int, order_json: dict) -> None:
-        with sqlite3.connect(os.getenv("SQLITE_DATABASE_PATH")) as connection:
-            with connection:
-                connection.execute(
-                    "UPDATE users SET order_json = ? WHERE telegram_id = ?",
-                    (json.dumps(order_json, ensure_ascii=False), telegram_id),
-                )
+    async def get_user(self, telegram_id: int) -> dict:
+        row = await self._call(
+            lambda connection: connection.execute(
+                f"SELECT {USER_COLUMNS} FROM users WHERE telegram_id = ?",
+                (telegram_id,),
+            ).fetchone()
+        )
+        if row is None:
+            return None
+        self._known_users.add(telegram_id)
+        return _user_from_row(row)
 
-    def save_order_to_history(self, telegram_id: int, order_data: dict) -> None:
-        with sqlite3.connect(os.getenv("SQLITE_DATABASE_PATH")) as connection:
-            connection.execute(
+    async def get_recent_users(self, limit: int) -> list[dict]:
+        rows = await self._call(
+            lambda connection: connection.execute(
+                f"SELECT {USER_COLUMNS} FROM users "
+                "ORDER BY updated_at DESC, id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        )
+        return [_user_from_row(row) for row in rows]
+
+    async def _update_user(self, telegram_id: int, assignments: str, *values) -> None:
+        await self._call(
+            lambda connection: connection.execute(
+                f"UPDATE users SET {assignments}, updated_at = CURRENT_TIMESTAMP "
+                "WHERE telegram_id = ?",
+                (*values, telegram_id),
+            )
+        )
+
+    async def update_user_state(self, telegram_id: int, state: str) -> None:
+        await self._update_user(telegram_id, "state = ?", state)
+
+    async def update_user_order_json(self, telegram_id: int, order_json: dict) -> None:
+        await self._update_user(
+            telegram_id, "order_json = ?", json.dumps(order_json, ensure_ascii=False)
+        )
+
+    async def update_user_session(
+        self, telegram_id: int, state: str | None, order_json: dict | None
+    ) -> None:
+        await self._update_user(
+            telegram_id,
+            "state = ?, order_json = ?",
+            state,
+            (
+                json.dumps(order_json, ensure_ascii=False)
+                if order_json is not None
+                else None
+            ),
+        )
+
+    async def clear_user_state_and_order(self, telegram_id: int) -> None:
+        await self._update_user(telegram_id, "state = NULL, order_json = NULL")
+
+    async def clear_current_order(self, telegram_id: int) -> None:
+        await self.clear_user_state_and_order(telegram_id)
+
+    async def clear_user_order_json(self, telegram_id: int) -> None:
+        await self._update_user(telegram_id, "order_json = NULL")
+
+    async def save_order_to_history(self, telegram_id: int, order_data: dict) -> None:
+        await self._call(
+            lambda connection: connection.execute(
                 "INSERT INTO order_history (telegram_id, order_data) VALUES (?, ?)",
                 (telegram_id, json.dumps(order_data, ensure_ascii=False)),
             )
+        )
 
-    def get_user_order_history(self, telegram_id: int) -> list:
-        with sqlite3.connect(os.getenv("SQLITE_DATABASE_PATH")) as connection:
-            cursor = connection.execute(
-                "SELECT order_data, created_at FROM order_history WHERE telegram_id = ? ORDER BY created_at DESC",
-                (telegram_id,),
+    async def get_user_order_history(
+        self, telegram_id: int, limit: int = 20, before: tuple | None = None
+    ) -> list:
+        query = (
+            "SELECT id, order_data, created_at FROM order_history WHERE telegram_id = ?"
+        )
+        params = [telegram_id]
+        if before is not None:
+            query += " AND (created_at, id) < (?, ?)"
+            params.extend(before)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        results = await self._call(
+            lambda connection: connection.execute(query, params).fetchall()
+        )
+        history = []
+        for result in results:
+            try:
+                order_data = json.loads(result[1])
+            except json.JSONDecodeError:
+                continue
+            history.append(
+                {"id": result[0], "order_data": order_data, "created_at": result[2]}
             )
-            results = cursor.fetchall()
-            history = []
-            for result in results:
-                try:
-                    order_data = json.loads(result[0])
-                    history.append({"order_data": order_data, "created_at": result[1]})
-                except json.JSONDecodeError:
-                    continue
-            return history
+        return history
 
-    def clear_current_order(self, telegram_id: int) -> None:
-        with sqlite3.connect(os.getenv("SQLITE_DATABASE_PATH")) as connection:
-            connection.execute(
-                "UPDATE users SET state = NULL, order_json = NULL WHERE telegram_id = ?",
-                (telegram_id,),
+    async def get_user_ids(self, after: int | None, limit: int) -> list[int]:
+        rows = await self._call(
+            lambda connection: connection.execute(
+                "SELECT telegram_id FROM users WHERE telegram_id > ? "
+                "ORDER BY telegram_id LIMIT ?",
+                (-(2**63) if after is None else after, limit),
+            ).fetchall()
+        )
+        return [row[0] for row in rows]
+
+    async def create_broadcast(self, text: str) -> int:
+        return await self._call(
+            lambda connection: connection.execute(
+                "INSERT INTO broadcasts (text) VALUES (?)", (text,)
+            ).lastrowid
+        )
+
+    async def get_broadcast(self, broadcast_id: int) -> dict | None:
+        row = await self._call(
+            lambda connection: connection.execute(
+                "SELECT id, text, checkpoint, sent, failed, created_at, finished_at "
+                "FROM broadcasts WHERE id = ?",
+                (broadcast_id,),
+            ).fetchone()
+        )
+        if row is None:
+            return None
+        keys = (
+            "id",
+            "text",
+            "checkpoint",
+            "sent",
+            "failed",
+            "created_at",
+            "finished_at",
+        )
+        return dict(zip(keys, row, strict=True))
+
+    async def update_broadcast_progress(
+        self,
+        broadcast_id: int,
+        checkpoint: int | None,
+        sent: int,
+        failed: int,
+        finished: bool = False,
+    ) -> None:
+        await self._call(
+            lambda connection: connection.execute(
+                "UPDATE broadcasts SET checkpoint = ?, sent = ?, failed = ?, "
+                "finished_at = CASE WHEN ? THEN CURRENT_TIMESTAMP ELSE finished_at END "
+                "WHERE id = ?",
+                (checkpoint, sent, failed, finished, broadcast_id),
             )
+        )
 
-    def persist_update(self, update: dict) -> None:
-        self.persist_updates([update])
+    async def save_broadcast_failures(
+        self, broadcast_id: int, failures: list[tuple[int, str]]
+    ) -> None:
+        if not failures:
+            return
+        await self._call(
+            lambda connection: connection.executemany(
+                "INSERT INTO broadcast_failures (broadcast_id, telegram_id, error) "
+                "VALUES (?, ?, ?) ON CONFLICT (broadcast_id, telegram_id) "
+                "DO UPDATE SET error = excluded.error, created_at = CURRENT_TIMESTAMP",
+                [(broadcast_id, telegram_id, error) for telegram_id, error in failures],
+            )
+        )
 
-    def clear_user_order_json(self, telegram_id: int) -> None:
-        with sqlite3.connect(os.getenv("SQLITE_DATABASE_PATH")) as connection:
-            connection.execute(
-                "UPDATE users SET order_json = NULL WHERE telegram_id = ?",
-                (telegram_id,),
+    async def get_polling_offset(self) -> int:
+        row = await self._call(
+            lambda connection: connection.execute(
+                "SELECT value FROM bot_state WHERE key = 'polling_offset'"
+            ).fetchone()
+        )
+        return row[0] if row is not None else 0
+
+    async def save_polling_offset(self, offset: int) -> None:
+        await self._call(
+            lambda connection: connection.execute(
+                "INSERT INTO bot_state (key, value) VALUES ('polling_offset', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = max(value, excluded.value)",
+                (offset,),
+            )
+        )
+
+    async def claim_update_ids(self, update_ids: list[int]) -> list[int]:
+        def claim(connection: sqlite3.Connection) -> list[int]:
+            return [
+                update_id
+                for update_id in sorted(update_ids)
+                if connection.execute(
+                    "INSERT OR IGNORE INTO processed_updates (update_id) VALUES (?)",
+                    (update_id,),
+                ).rowcount
+            ]
+
+        return await self._call(claim)
+
+    async def release_update_ids(self, update_ids: list[int]) -> None:
+        await self._call(
+            lambda connection: connection.executemany(
+                "DELETE FROM processed_updates WHERE update_id = ?",
+                [(update_id,) for update_id in update_ids],
             )
+        )
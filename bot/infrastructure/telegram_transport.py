@@ -0,0 +1,76 @@
+import json
+import os
+from dataclasses import dataclass
+
+import aiohttp
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def dumps_json(data, fast: bool = True) -> bytes:
+    if fast and orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(body: bytes, fast: bool = True):
+    if fast and orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _get_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+@dataclass(frozen=True)
+class TelegramTransportConfig:
+    base_uri: str = "https://api.telegram.org"
+    connector_limit: int = 100
+    keepalive_timeout: float = 60.0
+    dns_cache_ttl: int = 300
+    connect_timeout: float = 5.0
+    request_timeout: float = 15.0
+    # getUpdates waits up to its own `timeout` parameter on the server side.
+    long_poll_margin: float = 10.0
+    fast_json: bool = True
+
+    @classmethod
+    def from_env(cls) -> "TelegramTransportConfig":
+        return cls(
+            base_uri=os.getenv("TELEGRAM_BASE_URI") or cls.base_uri,
+            connector_limit=int(
+                os.getenv("TELEGRAM_CONNECTOR_LIMIT") or cls.connector_limit
+            ),
+            keepalive_timeout=_get_float(
+                "TELEGRAM_KEEPALIVE_TIMEOUT", cls.keepalive_timeout
+            ),
+            dns_cache_ttl=int(os.getenv("TELEGRAM_DNS_CACHE_TTL") or cls.dns_cache_ttl),
+            connect_timeout=_get_float("TELEGRAM_CONNECT_TIMEOUT", cls.connect_timeout),
+            request_timeout=_get_float("TELEGRAM_REQUEST_TIMEOUT", cls.request_timeout),
+            fast_json=os.getenv("TELEGRAM_FAST_JSON", "1") != "0",
+        )
+
+    def create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.connector_limit,
+            limit_per_host=self.connector_limit,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout_for("", {}),
+            headers={"Content-Type": "application/json"},
+        )
+
+    def timeout_for(self, method: str, params: dict) -> aiohttp.ClientTimeout:
+        """Long polls get their server-side wait plus a margin on top."""
+        total = self.request_timeout
+        if method == "getUpdates":
+            total = params.get("timeout", 0) + self.long_poll_margin
+        return aiohttp.ClientTimeout(total=total, sock_connect=self.connect_timeout)
@@ -1,17 +1,96 @@
 import asyncio
+import logging
+import os
+from collections.abc import Awaitable, Callable
 
+from bot.deduplication import UpdateDeduplicator
 from bot.dispatcher import Dispatcher
 from bot.domain.messenger import Messenger
+from bot.infrastructure.messenger_telegram import TELEGRAM_EXCEPTIONS
+from bot.worker_pool import DispatchWorkerPool
 
+logger = logging.getLogger(__name__)
 
-async def start_long_polling(dispatcher: Dispatcher, messenger: Messenger) -> None:
+INITIAL_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+
+
+def get_polling_params() -> dict:
+    allowed_updates = os.getenv("POLLING_ALLOWED_UPDATES", "message,callback_query")
+    return {
+        "timeout": int(os.getenv("POLLING_TIMEOUT", "30")),
+        "limit": int(os.getenv("POLLING_LIMIT", "100")),
+        "allowed_updates": [
+            update_type.strip()
+            for update_type in allowed_updates.split(",")
+            if update_type.strip()
+        ],
+    }
+
+
+async def start_long_polling(
+    dispatcher: Dispatcher,
+    messenger: Messenger,
+    concurrency: int | None = None,
+    deduplicator: UpdateDeduplicator | None = None,
+) -> None:
+    if concurrency is None:
+        concurrency = int(os.getenv("DISPATCH_CONCURRENCY", "1"))
+
+    pool = DispatchWorkerPool(dispatcher, concurrency=concurrency)
+    try:
+        await poll_updates(messenger, pool.submit, deduplicator)
+    finally:
+        await pool.close()
+
+
+async def poll_updates(
+    messenger: Messenger,
+    submit: Callable[[dict], Awaitable[None]],
+    deduplicator: UpdateDeduplicator | None = None,
+) -> None:
+    """Long poll getUpdates forever, handing each update to ``submit``.
+
+    With a ``deduplicator`` polling resumes from the saved offset, and
+    updates handled before are not submitted again.
+    """
+    polling_params = get_polling_params()
+    backoff = INITIAL_BACKOFF_SECONDS
     next_update_offset = 0
-    while True:
-        updates = await messenger.getUpdates(offset=next_update_offset)
-        if updates:
-            for update in updates:
-                next_update_offset = update["update_id"] + 1
-                await dispatcher.dispatch(update)
-                print(".", end="", flush=True)
+    if deduplicator is not None:
+        next_update_offset = await deduplicator.get_offset()
+        logger.info(f"[POLLING] resuming from offset {next_update_offset}")
+
+    def fetch(offset: int) -> asyncio.Task:
+        return asyncio.create_task(
+            messenger.getUpdates(offset=offset, **polling_params)
+        )
+
+    fetch_task = fetch(next_update_offset)
+    try:
+        while True:
+            try:
+                updates = await fetch_task
+            except TELEGRAM_EXCEPTIONS as e:
+                logger.error(f"[POLLING] ✗ getUpdates failed, retry in {backoff}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+                fetch_task = fetch(next_update_offset)
+                continue
+
+            backoff = INITIAL_BACKOFF_SECONDS
+            if updates:
+                next_update_offset = updates[-1]["update_id"] + 1
 
-        await asyncio.sleep(1)
+            # The next long poll is in flight while this batch is dispatched.
+            fetch_task = fetch(next_update_offset)
+
+            if updates and deduplicator is not None:
+                updates = await deduplicator.filter_new(updates)
+                await deduplicator.save_offset(next_update_offset)
+
+            for update in updates or []:
+                await submit(update)
+                print(".", end="", flush=True)
+    finally:
+        fetch_task.cancel()
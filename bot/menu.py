@@ -0,0 +1,92 @@
+"""Menu catalog: every inline keyboard and callback lookup table.
+
+Keyboards are serialized once at import, and callback data is decoded with
+dict lookups built from the same entries, so a button and the value it
+stands for cannot drift apart.
+"""
+
+import json
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class MenuItem:
+    callback_data: str
+    label: str
+    value: str
+
+
+PIZZAS = (
+    MenuItem("pizza_margherita", "Margherita", "Margherita"),
+    MenuItem("pizza_pepperoni", "Pepperoni", "Pepperoni"),
+    MenuItem("pizza_quattro_stagioni", "Quattro Stagioni", "Quattro Stagioni"),
+    MenuItem("pizza_capricciosa", "Capricciosa", "Capricciosa"),
+    MenuItem("pizza_diavola", "Diavola", "Diavola"),
+    MenuItem("pizza_prosciutto", "Prosciutto", "Prosciutto"),
+)
+
+SIZES = (
+    MenuItem("size_small", "Small (25cm)", "Small (25cm)"),
+    MenuItem("size_medium", "Medium (30cm)", "Medium (30cm)"),
+    MenuItem("size_large", "Large (35cm)", "Large (35cm)"),
+    MenuItem("size_xl", "Extra Large (40cm)", "XL (40cm)"),
+)
+
+DRINKS = (
+    MenuItem("drink_coke", "🥤 Coca-Cola", "Coca-Cola"),
+    MenuItem("drink_pepsi", "🥤 Pepsi", "Pepsi"),
+    MenuItem("drink_fanta", "🥤 Fanta", "Fanta"),
+    MenuItem("drink_sprite", "🥤 Sprite", "Sprite"),
+    MenuItem("drink_water", "💧 Water", "Water"),
+    MenuItem("drink_none", "🚫 No drink", "No drink"),
+)
+
+CONFIRMATIONS = (
+    MenuItem("confirm_yes", "✅ Confirm Order", "yes"),
+    MenuItem("confirm_no", "❌ Cancel", "no"),
+)
+
+NEXT_STEPS = (
+    MenuItem("order_more", "🔄 Order More", "order_more"),
+    MenuItem("finish_order", "✅ Finish", "finish_order"),
+)
+
+
+def _serialize_keyboard(items: tuple[MenuItem, ...], columns: int = 2) -> str:
+    rows = [
+        [
+            {"text": item.label, "callback_data": item.callback_data}
+            for item in items[start : start + columns]
+        ]
+        for start in range(0, len(items), columns)
+    ]
+    return json.dumps({"inline_keyboard": rows})
+
+
+def _lookup(items: tuple[MenuItem, ...]) -> dict[str, str]:
+    return {item.callback_data: item.value for item in items}
+
+
+REMOVE_KEYBOARD = json.dumps({"remove_keyboard": True})
+PIZZA_KEYBOARD = _serialize_keyboard(PIZZAS)
+SIZE_KEYBOARD = _serialize_keyboard(SIZES)
+DRINK_KEYBOARD = _serialize_keyboard(DRINKS)
+CONFIRM_KEYBOARD = _serialize_keyboard(CONFIRMATIONS)
+NEXT_STEP_KEYBOARD = _serialize_keyboard(NEXT_STEPS)
+
+PIZZA_NAMES = _lookup(PIZZAS)
+PIZZA_SIZES = _lookup(SIZES)
+DRINK_NAMES = _lookup(DRINKS)
+CONFIRMATION_CHOICES = _lookup(CONFIRMATIONS)
+NEXT_STEP_CHOICES = _lookup(NEXT_STEPS)
+
+
+def format_order_summary(order_json: dict) -> str:
+    summary = []
+    if order_json.get("pizza_name"):
+        summary.append(f"🍕 Pizza: {order_json['pizza_name']}")
+    if order_json.get("pizza_size"):
+        summary.append(f"📏 Size: {order_json['pizza_size']}")
+    if order_json.get("drink"):
+        summary.append(f"🥤 Drink: {order_json['drink']}")
+    return "\n".join(summary)
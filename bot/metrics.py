@@ -0,0 +1,307 @@
+import bisect
+import functools
+import logging
+import math
+import os
+import time
+from collections.abc import Callable
+from typing import Self
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: tuple[str, ...], labelvalues: tuple) -> str:
+    if not labelnames:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: tuple[str, ...] = tuple(labelnames)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(labels[name] for name in self.labelnames)
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """A value that is set directly or read from a callback when scraped."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._functions: dict[tuple, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        self._functions[self._key(labels)] = function
+
+    def get(self, **labels) -> float:
+        key = self._key(labels)
+        if key in self._functions:
+            return self._functions[key]()
+        return self._values.get(key, 0)
+
+    def _samples(self) -> list[str]:
+        values = dict(self._values)
+        values.update({key: function() for key, function in self._functions.items()})
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames=(),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: [per-bucket counts (not cumulative), sum, count]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def total(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return series[1] if series else 0.0
+
+    def quantile(self, q: float, **labels) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        series = self._series.get(self._key(labels))
+        if not series or series[2] == 0:
+            return math.nan
+
+        rank = q * series[2]
+        cumulative = 0
+        lower = 0.0
+        for upper, bucket_count in zip(self.buckets, series[0]):
+            if bucket_count and cumulative + bucket_count >= rank:
+                if upper == math.inf:
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = upper
+        return lower
+
+    def _samples(self) -> list[str]:
+        samples = []
+        for key, (bucket_counts, total, count) in self._series.items():
+            cumulative = 0
+            for upper, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    self.labelnames + ("le",), key + (_format_value(upper),)
+                )
+                samples.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            samples.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            samples.append(f"{self.name}_count{labels} {count}")
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric_class, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+        elif not isinstance(metric, metric_class):
+            raise ValueError(f"{name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames=(),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+class Timer:
+    """Observe the duration of a block or of each call of an async function.
+
+    Durations are measured with ``time.perf_counter`` and recorded in
+    ``histogram`` with the given labels. When the block raises, ``errors``
+    is incremented with the same labels and the exception propagates.
+    """
+
+    def __init__(
+        self, histogram: Histogram, errors: Counter | None = None, **labels
+    ) -> None:
+        self._histogram = histogram
+        self._errors = errors
+        self._labels = labels
+        self._start = 0.0
+        self.elapsed = 0.0
+
+    def _record(self, elapsed: float, failed: bool) -> None:
+        self._histogram.observe(elapsed, **self._labels)
+        if failed and self._errors is not None:
+            self._errors.inc(**self._labels)
+
+    def __enter__(self) -> Self:
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.elapsed = time.perf_counter() - self._start
+        self._record(self.elapsed, exc_type is not None)
+
+    def __call__(self, function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = await function(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self._record(time.perf_counter() - start, failed)
+
+        return wrapper
+
+
+def timed(histogram: Histogram, errors: Counter | None = None, **labels) -> Timer:
+    return Timer(histogram, errors, **labels)
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        text=REGISTRY.render(), content_type="text/plain", charset="utf-8"
+    )
+
+
+async def start_metrics_server(host: str | None = None, port: int | None = None):
+    """Serve the registry in Prometheus text format on /metrics.
+
+    Returns the runner to clean up, or None when METRICS_PORT is not set.
+    """
+    if port is None:
+        port = int(os.getenv("METRICS_PORT") or 0)
+    if not port:
+        return None
+    if host is None:
+        host = os.getenv("METRICS_HOST", "127.0.0.1")
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"[METRICS] serving on http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,17 @@
+import asyncio
+
+from bot.infrastructure.storage_postgres import StoragePostgres
+
+
+async def main():
+    storage = StoragePostgres()
+    try:
+        applied = await storage.migrate()
+        await storage.ensure_update_partitions()
+    finally:
+        await storage.close()
+    print(f"Database postgres migrated: {applied or 'up to date'}\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
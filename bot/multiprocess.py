@@ -0,0 +1,254 @@
+"""Long polling in one process, dispatch in N worker processes.
+
+With DISPATCH_PROCESSES above 1 the main process only polls getUpdates
+and hands each update to worker ``telegram_id % N``. Each worker is a
+full bot of its own (Dispatcher, storage chain, rate-limited
+MessengerTelegram) built from the same environment, so handler code,
+JSON and logging run on N cores. A user always lands on the same worker,
+which keeps their updates in order and their session cache local.
+
+Updates travel over one pipe per worker, so a full pipe holds back
+polling instead of piling updates up in memory. Workers publish their
+counters to a shared array that the main process exports as
+``bot_worker_*`` metrics and logs as one combined line every
+WORKER_STATS_INTERVAL seconds. Workers that exit are restarted on the
+same pipe: updates waiting in it survive the restart, the ones the
+worker had already taken are lost, as they would be if the
+single-process bot crashed.
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import operator
+import os
+import signal
+import time
+from multiprocessing.connection import Connection
+
+from bot import metrics
+from bot.app import create_deduplicator, create_messenger, create_storage
+from bot.dispatcher import (
+    DISPATCH_ERRORS,
+    DISPATCH_SECONDS,
+    Dispatcher,
+    get_telegram_id_from_update,
+)
+from bot.handlers import get_handlers
+from bot.infrastructure.messenger_telegram import MessengerTelegram
+from bot.infrastructure.storage_backend import create_backend_storage
+from bot.infrastructure.telegram_transport import dumps_json, loads_json
+from bot.long_polling import poll_updates
+from bot.worker_pool import DispatchWorkerPool
+
+logger = logging.getLogger(__name__)
+
+# Per worker slots in the shared stats array.
+STATS_FIELDS = ("dispatched", "errors", "pending", "p99_seconds")
+STATS_PUBLISH_INTERVAL = 1.0
+MAX_RECEIVE_BATCH = 100
+STOP = b""
+
+WORKER_STATS = metrics.gauge(
+    "bot_worker", "Dispatch stats reported by each worker process", ["worker", "stat"]
+)
+WORKER_RESTARTS = metrics.counter(
+    "bot_worker_restarts_total", "Worker processes restarted", ["worker"]
+)
+
+
+def get_shard(update: dict, processes: int) -> int:
+    telegram_id = get_telegram_id_from_update(update)
+    return telegram_id % processes if telegram_id is not None else 0
+
+
+async def run_worker(index: int, processes: int, receiver: Connection, stats) -> None:
+    storage = create_storage()
+    messenger = create_messenger(share=1 / processes)
+    dispatcher = Dispatcher(storage, messenger)
+    dispatcher.add_handlers(*get_handlers())
+    pool = DispatchWorkerPool(
+        dispatcher, concurrency=int(os.getenv("DISPATCH_CONCURRENCY", "1"))
+    )
+    offset = index * len(STATS_FIELDS)
+
+    async def publish_stats() -> None:
+        while True:
+            stats[offset : offset + len(STATS_FIELDS)] = [
+                DISPATCH_SECONDS.count(),
+                DISPATCH_ERRORS.get(),
+                pool.pending,
+                DISPATCH_SECONDS.quantile(0.99) if DISPATCH_SECONDS.count() else 0.0,
+            ]
+            await asyncio.sleep(STATS_PUBLISH_INTERVAL)
+
+    def receive() -> list[bytes]:
+        batch = [receiver.recv_bytes()]
+        while batch[-1] != STOP and len(batch) < MAX_RECEIVE_BATCH and receiver.poll():
+            batch.append(receiver.recv_bytes())
+        return batch
+
+    publisher = asyncio.create_task(publish_stats())
+    try:
+        await storage.warm(int(os.getenv("SESSION_CACHE_WARM", "1000")) // processes)
+        stopping = False
+        while not stopping:
+            for payload in await asyncio.to_thread(receive):
+                if payload == STOP:
+                    stopping = True
+                    break
+                await pool.submit(loads_json(payload))
+    finally:
+        publisher.cancel()
+        await pool.close()
+        await messenger.close()
+        await storage.close()
+
+
+def _worker_main(index: int, processes: int, receiver: Connection, stats) -> None:
+    # Ctrl-C reaches the whole process group; the main process decides
+    # when workers stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    snapshot_path = os.getenv("MEMORY_SNAPSHOT_PATH")
+    if snapshot_path:
+        # Each worker holds its own shard of the users.
+        os.environ["MEMORY_SNAPSHOT_PATH"] = f"{snapshot_path}.{index}-of-{processes}"
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"[%(asctime)s] [worker {index}] [%(name)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    asyncio.run(run_worker(index, processes, receiver, stats))
+
+
+class WorkerProcesses:
+    def __init__(self, processes: int) -> None:
+        self._context = multiprocessing.get_context("spawn")
+        self._count = processes
+        # The main process keeps both ends, so a pipe outlives its worker.
+        self._pipes = [self._context.Pipe(duplex=False) for _ in range(processes)]
+        self._stats = self._context.Array(
+            "d", processes * len(STATS_FIELDS), lock=False
+        )
+        self._processes: list[multiprocessing.Process | None] = [None] * processes
+        for index in range(processes):
+            for position, stat in enumerate(STATS_FIELDS):
+                slot = index * len(STATS_FIELDS) + position
+                WORKER_STATS.set_function(
+                    functools.partial(operator.getitem, self._stats, slot),
+                    worker=str(index),
+                    stat=stat,
+                )
+
+    def worker_stats(self, index: int) -> dict[str, float]:
+        offset = index * len(STATS_FIELDS)
+        return dict(zip(STATS_FIELDS, self._stats[offset : offset + len(STATS_FIELDS)]))
+
+    def _spawn(self, index: int) -> None:
+        receiver, _ = self._pipes[index]
+        offset = index * len(STATS_FIELDS)
+        self._stats[offset : offset + len(STATS_FIELDS)] = [0.0] * len(STATS_FIELDS)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self._count, receiver, self._stats),
+            name=f"dispatch-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[index] = process
+        logger.info(f"[WORKERS] started worker {index} (pid {process.pid})")
+
+    def start(self) -> None:
+        for index in range(self._count):
+            self._spawn(index)
+
+    async def submit(self, update: dict) -> None:
+        _, sender = self._pipes[get_shard(update, self._count)]
+        # Blocks while the pipe is full, which holds back polling.
+        await asyncio.to_thread(sender.send_bytes, dumps_json(update))
+
+    async def supervise(self, interval: float = 1.0) -> None:
+        """Restart workers that exit, at most once per ``interval``."""
+        while True:
+            await asyncio.sleep(interval)
+            for index, process in enumerate(self._processes):
+                if process is not None and not process.is_alive():
+                    logger.error(
+                        f"[WORKERS] ✗ worker {index} exited with "
+                        f"{process.exitcode}, restarting"
+                    )
+                    WORKER_RESTARTS.inc(worker=str(index))
+                    self._spawn(index)
+
+    async def log_stats(self, interval: float) -> None:
+        previous, previous_time = 0.0, time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            stats = [self.worker_stats(index) for index in range(self._count)]
+            dispatched = sum(worker["dispatched"] for worker in stats)
+            now = time.monotonic()
+            # A restarted worker starts counting from zero again.
+            rate = max(0.0, dispatched - previous) / (now - previous_time)
+            previous, previous_time = dispatched, now
+            errors = sum(worker["errors"] for worker in stats)
+            pending = [int(worker["pending"]) for worker in stats]
+            p99 = max(worker["p99_seconds"] for worker in stats) * 1000
+            restarts = [
+                int(WORKER_RESTARTS.get(worker=str(index)))
+                for index in range(self._count)
+            ]
+            logger.info(
+                f"[WORKERS] {int(dispatched)} dispatched ({rate:.1f}/s), "
+                f"{int(errors)} errors, pending {pending}, "
+                f"worst p99 {p99:.1f}ms, restarts {restarts}"
+            )
+
+    async def close(self, timeout: float = 30.0) -> None:
+        """Let workers finish what is queued, then stop them."""
+        try:
+            async with asyncio.timeout(timeout):
+                for _, sender in self._pipes:
+                    await asyncio.to_thread(sender.send_bytes, STOP)
+                for process in self._processes:
+                    if process is not None:
+                        await asyncio.to_thread(process.join)
+        except TimeoutError:
+            logger.error("[WORKERS] ✗ workers did not stop in time")
+
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                logger.error(f"[WORKERS] ✗ killing {process.name}")
+                process.kill()
+        # Also wakes up a send still blocked on a pipe nobody reads.
+        for receiver, sender in self._pipes:
+            receiver.close()
+            sender.close()
+
+
+async def start_multiprocess(processes: int) -> None:
+    if os.getenv("BOT_MODE", "polling") != "polling":
+        raise ValueError("DISPATCH_PROCESSES above 1 needs BOT_MODE=polling")
+
+    workers = WorkerProcesses(processes)
+    workers.start()
+    messenger = MessengerTelegram()
+    # The poller claims update ids before sharding them to the workers.
+    storage = create_backend_storage()
+    metrics_runner = await metrics.start_metrics_server()
+    tasks = [
+        asyncio.create_task(workers.supervise()),
+        asyncio.create_task(
+            workers.log_stats(float(os.getenv("WORKER_STATS_INTERVAL", "10")))
+        ),
+    ]
+    try:
+        await poll_updates(messenger, workers.submit, create_deduplicator(storage))
+    finally:
+        for task in tasks:
+            task.cancel()
+        await workers.close()
+        await messenger.close()
+        await storage.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
@@ -1,4 +1,16 @@
+import asyncio
+
 from bot.infrastructure.storage_sqlite import StorageSqlite
 
-StorageSqlite.recreate_database()
-print("Database SQLite create!")
+
+async def main():
+    storage = StorageSqlite()
+    try:
+        await storage.recreate_database()
+    finally:
+        await storage.close()
+    print("Database SQLite create!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
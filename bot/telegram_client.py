@@ -3,18 +3,20 @@ import os
 import json
 from dotenv import load_dotenv
 
+from bot.infrastructure.telegram_transport import TelegramTransportConfig
+
 load_dotenv()
 
 
 def makeRequest(method: str, **params) -> dict:
     token = os.getenv("TOKEN")
-    base_uri = os.getenv("TELEGRAM_BASE_URI")
+    base_uri = os.getenv("TELEGRAM_BASE_URI") or TelegramTransportConfig.base_uri
 
-    if not token or not base_uri:
-        print("Error: TOKEN or TELEGRAM_BASE_URI not found in .env file")
+    if not token:
+        print("Error: TOKEN not found in .env file")
         return {}
 
-    url = f"{base_uri}/bot{token}/{method}"
+    url = f"{base_uri.rstrip('/')}/bot{token}/{method}"
 
     if method in ["getMe", "getUpdates"] and params:
         query_string = "&".join([f"{k}={v}" for k, v in params.items()])
@@ -0,0 +1,219 @@
+"""Durable update ingestion through a Postgres queue table.
+
+With BOT_MODE=queue, fetched updates are first written to the
+``update_queue`` table and only then confirmed to Telegram by the next
+getUpdates offset. Workers on any number of nodes claim queued updates
+with ``FOR UPDATE SKIP LOCKED``, dispatch them and delete them once
+handled. A worker that dies leaves its claims behind; they expire after
+UPDATE_QUEUE_LEASE seconds and are claimed again, so every update is
+handled at least once.
+
+A claim only takes the oldest queued update of each user, which keeps a
+user's updates in order across workers. Only one node should poll
+Telegram: run the others with UPDATE_QUEUE_INGEST=0.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import UTC, datetime
+
+from bot import metrics
+from bot.app import create_messenger, create_storage
+from bot.dispatcher import Dispatcher
+from bot.domain.messenger import Messenger
+from bot.handlers import get_handlers
+from bot.infrastructure.messenger_telegram import TELEGRAM_EXCEPTIONS
+from bot.infrastructure.storage_errors import STORAGE_EXCEPTIONS
+from bot.infrastructure.storage_postgres import StoragePostgres
+from bot.long_polling import (
+    INITIAL_BACKOFF_SECONDS,
+    MAX_BACKOFF_SECONDS,
+    get_polling_params,
+)
+
+logger = logging.getLogger(__name__)
+
+QUEUE_UPDATES = metrics.counter(
+    "bot_update_queue_updates_total",
+    "Queued updates by what became of them",
+    ["result"],
+)
+QUEUE_LAG_SECONDS = metrics.histogram(
+    "bot_update_queue_lag_seconds", "Time from enqueue to claim in seconds"
+)
+
+
+async def ingest_updates(messenger: Messenger, queue: StoragePostgres) -> None:
+    """Long poll getUpdates forever, queueing every batch before confirming it."""
+    polling_params = get_polling_params()
+    backoff = INITIAL_BACKOFF_SECONDS
+    offset = await queue.get_update_queue_offset()
+    logger.info(f"[QUEUE] ingesting from offset {offset}")
+
+    while True:
+        try:
+            updates = await messenger.getUpdates(offset=offset, **polling_params)
+            if updates:
+                # Committed together with the offset, so a crash before the
+                # next getUpdates only makes Telegram send the batch again.
+                await queue.enqueue_updates(updates)
+        except TELEGRAM_EXCEPTIONS + STORAGE_EXCEPTIONS as e:
+            logger.error(f"[QUEUE] ✗ ingestion failed, retry in {backoff}s: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+            continue
+
+        backoff = INITIAL_BACKOFF_SECONDS
+        if updates:
+            offset = updates[-1]["update_id"] + 1
+            QUEUE_UPDATES.inc(len(updates), result="queued")
+
+
+class UpdateQueueWorker:
+    """Claim queued updates, dispatch them and acknowledge them in batches.
+
+    At most ``concurrency`` updates are in flight. Claims of updates still
+    being dispatched are renewed every third of ``lease``, and an update
+    claimed more than ``max_attempts`` times is dropped instead of
+    dispatched, so one that crashes its worker cannot stall the queue.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        queue: StoragePostgres,
+        concurrency: int = 1,
+        lease: float = 60.0,
+        idle_interval: float = 0.5,
+        max_attempts: int = 5,
+        worker_id: str | None = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        self._dispatcher = dispatcher
+        self._queue = queue
+        self._concurrency = concurrency
+        self._lease = lease
+        self._idle_interval = idle_interval
+        self._max_attempts = max_attempts
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._in_flight: dict[int, asyncio.Task] = {}
+        self._done: list[int] = []
+
+    async def _handle(self, claimed: dict) -> None:
+        update_id = claimed["update_id"]
+        try:
+            if claimed["attempts"] > self._max_attempts:
+                logger.error(
+                    f"[QUEUE] ✗ update {update_id} dropped after "
+                    f"{claimed['attempts'] - 1} attempts"
+                )
+                QUEUE_UPDATES.inc(result="dropped")
+                return
+            await self._dispatcher.dispatch(claimed["payload"])
+            QUEUE_UPDATES.inc(result="dispatched")
+        finally:
+            del self._in_flight[update_id]
+            self._done.append(update_id)
+
+    async def _ack(self) -> None:
+        if self._done:
+            done, self._done = self._done, []
+            try:
+                await self._queue.ack_updates(self.worker_id, done)
+            except BaseException:
+                # Acknowledged with the next batch instead.
+                self._done[:0] = done
+                raise
+
+    async def _claim(self) -> int:
+        free = self._concurrency - len(self._in_flight)
+        if free <= 0:
+            return 0
+        claimed = await self._queue.claim_updates(self.worker_id, free, self._lease)
+        now = datetime.now(UTC)
+        for update in claimed:
+            QUEUE_LAG_SECONDS.observe((now - update["enqueued_at"]).total_seconds())
+            self._in_flight[update["update_id"]] = asyncio.create_task(
+                self._handle(update)
+            )
+        return len(claimed)
+
+    async def run(self) -> None:
+        backoff = INITIAL_BACKOFF_SECONDS
+        renew_at = time.monotonic() + self._lease / 3
+        try:
+            while True:
+                try:
+                    await self._ack()
+                    await self._claim()
+                    if self._in_flight and time.monotonic() >= renew_at:
+                        await self._queue.renew_update_claims(
+                            self.worker_id, list(self._in_flight), self._lease
+                        )
+                        renew_at = time.monotonic() + self._lease / 3
+                except STORAGE_EXCEPTIONS as e:
+                    logger.error(f"[QUEUE] ✗ queue failed, retry in {backoff}s: {e}")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+                    continue
+                backoff = INITIAL_BACKOFF_SECONDS
+
+                # Wake up as soon as a slot frees up: the user whose update
+                # finished may have the next one waiting.
+                if self._in_flight:
+                    await asyncio.wait(
+                        list(self._in_flight.values()),
+                        timeout=self._idle_interval,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                else:
+                    await asyncio.sleep(self._idle_interval)
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Finish the updates in flight and acknowledge them."""
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+        try:
+            await self._ack()
+        except STORAGE_EXCEPTIONS as e:
+            # Their claims expire and another worker handles them again.
+            logger.error(f"[QUEUE] ✗ final acknowledgement failed: {e}")
+
+
+async def start_update_queue() -> None:
+    if os.getenv("STORAGE_BACKEND", "postgres") != "postgres":
+        raise ValueError("BOT_MODE=queue needs STORAGE_BACKEND=postgres")
+    queue = StoragePostgres()
+
+    # Any worker may get the next update of a user, so no session cache.
+    storage = create_storage(queue, session_cache=False)
+    messenger = create_messenger()
+    dispatcher = Dispatcher(storage, messenger)
+    dispatcher.add_handlers(*get_handlers())
+    worker = UpdateQueueWorker(
+        dispatcher,
+        queue,
+        concurrency=int(os.getenv("DISPATCH_CONCURRENCY", "1")),
+        lease=float(os.getenv("UPDATE_QUEUE_LEASE", "60")),
+        idle_interval=float(os.getenv("UPDATE_QUEUE_IDLE_INTERVAL", "0.5")),
+        max_attempts=int(os.getenv("UPDATE_QUEUE_MAX_ATTEMPTS", "5")),
+    )
+    metrics_runner = await metrics.start_metrics_server()
+    logger.info(f"[QUEUE] worker {worker.worker_id} started")
+    try:
+        async with asyncio.TaskGroup() as tasks:
+            tasks.create_task(worker.run())
+            if os.getenv("UPDATE_QUEUE_INGEST", "1") == "1":
+                tasks.create_task(ingest_updates(messenger, queue))
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await messenger.close()
+        await storage.close()
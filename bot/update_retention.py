@@ -0,0 +1,22 @@
+import asyncio
+import os
+
+from bot.infrastructure.storage_postgres import StoragePostgres
+
+
+async def main():
+    retention_days = int(os.getenv("UPDATE_RETENTION_DAYS", "30"))
+
+    storage = StoragePostgres()
+    try:
+        await storage.ensure_update_partitions()
+        dropped = await storage.drop_update_partitions(retention_days)
+        forgotten = await storage.delete_processed_updates(retention_days)
+    finally:
+        await storage.close()
+    print(f"Update partitions dropped: {dropped or 'none'}")
+    print(f"Processed update ids forgotten: {forgotten}\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+
+from aiohttp import web
+
+from bot.deduplication import UpdateDeduplicator
+from bot.dispatcher import Dispatcher
+from bot.domain.messenger import Messenger
+from bot.worker_pool import DispatchWorkerPool
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+pool_key = web.AppKey("pool", DispatchWorkerPool)
+
+
+def create_webhook_app(
+    pool: DispatchWorkerPool,
+    path: str = "/webhook",
+    secret_token: str | None = None,
+    enqueue_timeout: float = 5.0,
+    deduplicator: UpdateDeduplicator | None = None,
+) -> web.Application:
+    async def receive_update(request: web.Request) -> web.Response:
+        if secret_token is not None and not hmac.compare_digest(
+            request.headers.get(SECRET_TOKEN_HEADER, ""), secret_token
+        ):
+            return web.Response(status=401)
+
+        try:
+            update = await request.json()
+        except json.JSONDecodeError:
+            return web.Response(status=400)
+        if not isinstance(update, dict) or "update_id" not in update:
+            return web.Response(status=400)
+
+        # A redelivery of an update already handled is acknowledged as is.
+        if deduplicator is not None and not await deduplicator.filter_new([update]):
+            return web.Response(status=200)
+
+        # Wait for room in the pool, but not forever: Telegram retries
+        # deliveries that fail, so a 503 hands the backlog back to it.
+        try:
+            await asyncio.wait_for(pool.submit(update), timeout=enqueue_timeout)
+        except TimeoutError:
+            logger.warning(f"[WEBHOOK] ✗ queue full, update {update['update_id']}")
+            # Telegram delivers it again, and that delivery must get through.
+            if deduplicator is not None:
+                await deduplicator.release([update["update_id"]])
+            return web.Response(status=503)
+
+        return web.Response(status=200)
+
+    app = web.Application()
+    app[pool_key] = pool
+    app.router.add_post(path, receive_update)
+    return app
+
+
+async def start_webhook(
+    dispatcher: Dispatcher,
+    messenger: Messenger,
+    concurrency: int | None = None,
+    deduplicator: UpdateDeduplicator | None = None,
+) -> None:
+    if concurrency is None:
+        concurrency = int(os.getenv("DISPATCH_CONCURRENCY", "1"))
+
+    host = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    port = int(os.getenv("WEBHOOK_PORT", "8080"))
+    path = os.getenv("WEBHOOK_PATH", "/webhook")
+    public_url = os.getenv("WEBHOOK_URL")
+    secret_token = os.getenv("WEBHOOK_SECRET_TOKEN") or None
+
+    pool = DispatchWorkerPool(
+        dispatcher,
+        concurrency=concurrency,
+        max_pending=int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000")),
+    )
+    app = create_webhook_app(
+        pool,
+        path=path,
+        secret_token=secret_token,
+        enqueue_timeout=float(os.getenv("WEBHOOK_ENQUEUE_TIMEOUT", "5")),
+        deduplicator=deduplicator,
+    )
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"[WEBHOOK] listening on {host}:{port}{path}")
+
+        if public_url:
+            params = {
+                "url": public_url,
+                "allowed_updates": ["message", "callback_query"],
+            }
+            if secret_token is not None:
+                params["secret_token"] = secret_token
+            await messenger.setWebhook(**params)
+
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await pool.close()
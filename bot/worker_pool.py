@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from collections import deque
+
+from bot import metrics
+from bot.dispatcher import Dispatcher, get_telegram_id_from_update
+
+logger = logging.getLogger(__name__)
+
+PENDING_UPDATES = metrics.gauge(
+    "bot_pending_updates", "Updates queued in the dispatch worker pool"
+)
+
+
+class DispatchWorkerPool:
+    """Dispatch updates concurrently while keeping per-user order.
+
+    Every user gets its own FIFO queue drained by a single task, so updates
+    from the same ``telegram_id`` are handled one after another, while
+    different users are dispatched in parallel (at most ``concurrency`` at
+    once). ``max_pending`` bounds the number of queued updates: ``submit``
+    waits when the pool is full.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        concurrency: int = 1,
+        max_pending: int = 1000,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+
+        self._dispatcher: Dispatcher = dispatcher
+        self._running = asyncio.Semaphore(concurrency)
+        self._pending = asyncio.Semaphore(max_pending)
+        self._queues: dict[int | None, deque[dict]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._closed = False
+        PENDING_UPDATES.set_function(lambda: self.pending)
+
+    @property
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def submit(self, update: dict) -> None:
+        if self._closed:
+            raise RuntimeError("worker pool is closed")
+
+        await self._pending.acquire()
+
+        telegram_id = get_telegram_id_from_update(update)
+        queue = self._queues.get(telegram_id)
+        if queue is not None:
+            queue.append(update)
+            return
+
+        self._queues[telegram_id] = deque([update])
+        task = asyncio.create_task(self._drain(telegram_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, telegram_id: int | None) -> None:
+        queue = self._queues[telegram_id]
+        try:
+            while queue:
+                update = queue[0]
+                try:
+                    async with self._running:
+                        await self._dispatcher.dispatch(update)
+                except Exception:
+                    logger.exception(
+                        f"[POOL] ✗ update {update.get('update_id')} failed"
+                    )
+                finally:
+                    queue.popleft()
+                    self._pending.release()
+        finally:
+            del self._queues[telegram_id]
+
+    async def close(self) -> None:
+        """Stop accepting updates and wait for queued and in-flight work."""
+        self._closed = True
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
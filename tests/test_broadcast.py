@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from bot.broadcast import Broadcast
+from bot.infrastructure.messenger_telegram import TelegramAPIError
+from bot.infrastructure.storage_sqlite import StorageSqlite
+from tests.mocks import Mock
+
+
+@pytest.fixture
+async def storage(tmp_path):
+    storage = StorageSqlite(str(tmp_path / "bot.sqlite3"))
+    await storage.recreate_database()
+    for telegram_id in range(1, 11):
+        await storage.ensure_user_exists(telegram_id)
+    yield storage
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_every_user_and_records_failures(storage):
+    delivered = []
+
+    async def sendMessage(chat_id: int, text: str, **kwargs) -> dict:
+        if chat_id == 3:
+            raise TelegramAPIError(
+                "sendMessage", 403, "Forbidden: bot was blocked by the user"
+            )
+        if chat_id == 7:
+            # An HTML error page from a proxy instead of the Bot API.
+            raise json.JSONDecodeError("Expecting value", "<html>", 0)
+        delivered.append((chat_id, text))
+        return {"ok": True}
+
+    broadcast = Broadcast(storage, Mock({"sendMessage": sendMessage}), page_size=4)
+    result = await broadcast.start("2-for-1 Tuesday!")
+
+    assert sorted(delivered) == [
+        (i, "2-for-1 Tuesday!") for i in range(1, 11) if i not in (3, 7)
+    ]
+    assert (result["sent"], result["failed"]) == (8, 2)
+    assert result["checkpoint"] == 10
+    assert result["finished_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_broadcast_resumes_after_the_last_checkpoint(storage):
+    delivered = []
+
+    async def sendMessage(chat_id: int, text: str, **kwargs) -> dict:
+        delivered.append(chat_id)
+        return {"ok": True}
+
+    broadcast_id = await storage.create_broadcast("2-for-1 Tuesday!")
+    await storage.update_broadcast_progress(broadcast_id, 6, sent=6, failed=0)
+
+    broadcast = Broadcast(storage, Mock({"sendMessage": sendMessage}), page_size=3)
+    result = await broadcast.resume(broadcast_id)
+
+    assert sorted(delivered) == [7, 8, 9, 10]
+    assert (result["sent"], result["failed"]) == (10, 0)
+
+    delivered.clear()
+    await broadcast.resume(broadcast_id)
+    assert delivered == []
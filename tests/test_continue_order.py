@@ -0,0 +1,85 @@
+import pytest
+
+from bot.dispatcher import Dispatcher
+from bot.handlers.continue_order import ContinueOrderHandler
+from tests.mocks import Mock
+
+
+@pytest.mark.asyncio
+async def test_finish_order_shows_newest_orders_from_a_bounded_query():
+    test_update = {
+        "update_id": 12345690,
+        "callback_query": {
+            "id": "callback130",
+            "from": {"id": 12345, "is_bot": False, "first_name": "Test"},
+            "message": {
+                "message_id": 110,
+                "chat": {"id": 12345, "type": "private"},
+                "date": 1640995600,
+            },
+            "data": "finish_order",
+        },
+    }
+
+    async def get_user(telegram_id: int) -> dict | None:
+        return {"state": "ORDER_COMPLETED", "order_json": None}
+
+    async def clear_current_order(telegram_id: int) -> None:
+        assert telegram_id == 12345
+
+    async def get_user_order_history(
+        telegram_id: int, limit: int = 20, before: tuple | None = None
+    ) -> list:
+        assert telegram_id == 12345
+        assert limit == 3
+        assert before is None
+        return [
+            {
+                "id": 9,
+                "order_data": {"pizza_name": "Diavola", "pizza_size": "XL (40cm)"},
+                "created_at": "2024-01-03",
+            },
+            {
+                "id": 8,
+                "order_data": {
+                    "pizza_name": "Margherita",
+                    "pizza_size": "Small (25cm)",
+                    "drink": "Water",
+                },
+                "created_at": "2024-01-02",
+            },
+        ]
+
+    sent = []
+
+    async def answerCallbackQuery(callback_query_id: str, **kwargs) -> dict:
+        return {"ok": True}
+
+    async def editMessageText(
+        chat_id: int, message_id: int, text: str, **kwargs
+    ) -> dict:
+        assert message_id == 110
+        sent.append(text)
+        return {"ok": True}
+
+    dispatcher = Dispatcher(
+        Mock(
+            {
+                "get_user": get_user,
+                "clear_current_order": clear_current_order,
+                "get_user_order_history": get_user_order_history,
+            }
+        ),
+        Mock(
+            {
+                "answerCallbackQuery": answerCallbackQuery,
+                "editMessageText": editMessageText,
+            }
+        ),
+    )
+    dispatcher.add_handlers(ContinueOrderHandler())
+
+    await dispatcher.dispatch(test_update)
+
+    assert len(sent) == 1
+    assert "1. Diavola XL (40cm)\n2. Margherita Small (25cm), Water" in sent[0]
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from bot.deduplication import UpdateDeduplicator
+from bot.infrastructure.storage_memory import StorageMemory
+from bot.long_polling import start_long_polling
+from tests.mocks import Mock
+
+
+class ClaimCountingStorage(StorageMemory):
+    def __init__(self) -> None:
+        super().__init__()
+        self.claims: list[list[int]] = []
+
+    async def claim_update_ids(self, update_ids: list[int]) -> list[int]:
+        self.claims.append(update_ids)
+        return await super().claim_update_ids(update_ids)
+
+
+def updates(*update_ids: int) -> list[dict]:
+    return [{"update_id": update_id} for update_id in update_ids]
+
+
+@pytest.mark.asyncio
+async def test_recent_ids_are_dropped_without_asking_storage():
+    storage = ClaimCountingStorage()
+    deduplicator = UpdateDeduplicator(storage, size=2)
+
+    assert await deduplicator.filter_new(updates(1, 2, 2)) == updates(1, 2)
+    assert await deduplicator.filter_new(updates(2, 3)) == updates(3)
+    assert storage.claims == [[1, 2], [3]]
+
+    # Id 1 has left the ring; storage still knows it was handled.
+    assert await deduplicator.filter_new(updates(1)) == []
+    assert storage.claims[-1] == [1]
+
+
+@pytest.mark.asyncio
+async def test_updates_pass_when_storage_cannot_claim_them():
+    async def claim_update_ids(update_ids: list[int]) -> list[int]:
+        raise ConnectionError("database down")
+
+    deduplicator = UpdateDeduplicator(Mock({"claim_update_ids": claim_update_ids}))
+
+    assert await deduplicator.filter_new(updates(5)) == updates(5)
+    assert await deduplicator.filter_new(updates(5)) == []
+
+
+@pytest.mark.asyncio
+async def test_long_polling_resumes_from_saved_offset_and_skips_handled_updates():
+    storage = StorageMemory()
+    await storage.save_polling_offset(10)
+    await storage.claim_update_ids([10])
+    batches = [updates(10, 11)]
+    offsets = []
+    dispatched = []
+
+    async def getUpdates(offset: int, **kwargs) -> list:
+        offsets.append(offset)
+        if batches:
+            return batches.pop(0)
+        await asyncio.Event().wait()
+
+    async def dispatch(update: dict) -> None:
+        dispatched.append(update["update_id"])
+
+    polling = asyncio.create_task(
+        start_long_polling(
+            Mock({"dispatch": dispatch}),
+            Mock({"getUpdates": getUpdates}),
+            deduplicator=UpdateDeduplicator(storage),
+        )
+    )
+    async with asyncio.timeout(1):
+        while not dispatched or await storage.get_polling_offset() != 12:
+            await asyncio.sleep(0.01)
+    polling.cancel()
+    await asyncio.gather(polling, return_exceptions=True)
+
+    assert offsets == [10, 12]
+    assert dispatched == [11]
@@ -0,0 +1,67 @@
+import pytest
+
+from bot.dispatcher import Dispatcher
+from bot.handlers import get_handlers
+from bot.handlers.handler import Handler, HandlerStatus
+from tests.mocks import Mock
+
+
+class RecordingHandler(Handler):
+    def __init__(self, name: str, calls: list, **routing) -> None:
+        self.name = name
+        self.calls = calls
+        for attribute, value in routing.items():
+            setattr(self, attribute, value)
+
+    async def can_handle(self, update, state, order_json, storage, messenger):
+        self.calls.append(self.name)
+        return True
+
+    async def handle(self, update, state, order_json, storage, messenger):
+        return HandlerStatus.CONTINUE
+
+
+def callback_update(data: str) -> dict:
+    return {
+        "update_id": 1,
+        "callback_query": {"id": "cb", "from": {"id": 12345}, "data": data},
+    }
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_only_asks_handlers_routed_to_the_update():
+    async def get_user(telegram_id: int) -> dict:
+        return {"state": "WAIT_FOR_PIZZA_SIZE", "order_json": "{}"}
+
+    calls = []
+    dispatcher = Dispatcher(Mock({"get_user": get_user}), Mock({}))
+    dispatcher.add_handlers(
+        RecordingHandler("catch_all", calls),
+        RecordingHandler("messages", calls, update_kind="message"),
+        RecordingHandler(
+            "pizza",
+            calls,
+            update_kind="callback_query",
+            states=frozenset({"WAIT_FOR_PIZZA_NAME"}),
+            callback_prefixes=frozenset({"pizza_"}),
+        ),
+        RecordingHandler(
+            "size",
+            calls,
+            update_kind="callback_query",
+            states=frozenset({"WAIT_FOR_PIZZA_SIZE"}),
+            callback_prefixes=frozenset({"size_"}),
+        ),
+    )
+
+    await dispatcher.dispatch(callback_update("size_large"))
+    assert calls == ["catch_all", "size"]
+
+    calls.clear()
+    await dispatcher.dispatch(callback_update("forged_data"))
+    assert calls == ["catch_all"]
+
+
+def test_every_handler_declares_its_update_kind():
+    for handler in get_handlers()[1:]:
+        assert handler.update_kind in ("message", "callback_query")
@@ -30,20 +30,16 @@ async def test_drink_selection_handler():
         },
     }
 
-    update_order_json_called = False
-    update_user_state_called = False
+    update_user_session_called = False
 
-    async def update_user_order_json(telegram_id: int, order_json: dict) -> None:
-        assert telegram_id == 12345
-        assert order_json["drink"] == "Coca-Cola"
-        nonlocal update_order_json_called
-        update_order_json_called = True
-
-    async def update_user_state(telegram_id: int, state: str) -> None:
+    async def update_user_session(
+        telegram_id: int, state: str | None, order_json: dict | None
+    ) -> None:
         assert telegram_id == 12345
         assert state == "WAIT_FOR_CONFIRMATION"
-        nonlocal update_user_state_called
-        update_user_state_called = True
+        assert order_json["drink"] == "Coca-Cola"
+        nonlocal update_user_session_called
+        update_user_session_called = True
 
     async def get_user(telegram_id: int) -> dict | None:
         assert telegram_id == 12345
@@ -53,8 +49,7 @@ async def test_drink_selection_handler():
         }
 
     answer_callback_called = False
-    delete_message_called = False
-    send_message_called = False
+    edit_message_called = False
 
     async def answerCallbackQuery(callback_query_id: str, **kwargs) -> dict:
         assert callback_query_id == "callback125"
@@ -62,25 +57,20 @@ async def test_drink_selection_handler():
         answer_callback_called = True
         return {"ok": True}
 
-    async def deleteMessage(chat_id: int, message_id: int) -> dict:
+    async def editMessageText(
+        chat_id: int, message_id: int, text: str, **kwargs
+    ) -> dict:
         assert chat_id == 12345
         assert message_id == 102
-        nonlocal delete_message_called
-        delete_message_called = True
-        return {"ok": True}
-
-    async def sendMessage(chat_id: int, text: str, **kwargs) -> dict:
-        assert chat_id == 12345
         assert "Your order" in text
         assert "confirm" in text.lower()  # ← Исправлено: ищем в нижнем регистре
-        nonlocal send_message_called
-        send_message_called = True
+        nonlocal edit_message_called
+        edit_message_called = True
         return {"ok": True}
 
     mock_storage = Mock(
         {
-            "update_user_order_json": update_user_order_json,
-            "update_user_state": update_user_state,
+            "update_user_session": update_user_session,
             "get_user": get_user,
         }
     )
@@ -88,8 +78,7 @@ async def test_drink_selection_handler():
     mock_messenger = Mock(
         {
             "answerCallbackQuery": answerCallbackQuery,
-            "deleteMessage": deleteMessage,
-            "sendMessage": sendMessage,
+            "editMessageText": editMessageText,
         }
     )
 
@@ -99,8 +88,6 @@ async def test_drink_selection_handler():
 
     await dispatcher.dispatch(test_update)
 
-    assert update_order_json_called
-    assert update_user_state_called
+    assert update_user_session_called
     assert answer_callback_called
-    assert delete_message_called
-    assert send_message_called
+    assert edit_message_called
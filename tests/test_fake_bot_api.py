@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from bot import menu
+from bot.fake_bot_api import (
+    FakeBotAPI,
+    FakeBotAPIConfig,
+    message_update,
+    order_flow_updates,
+)
+from bot.infrastructure.messenger_telegram import (
+    MessengerTelegram,
+    TelegramAPIError,
+    TelegramRetryAfter,
+)
+from bot.infrastructure.telegram_transport import TelegramTransportConfig
+
+
+async def start(api: FakeBotAPI) -> tuple:
+    runner, base_uri = await api.start()
+    messenger = MessengerTelegram(
+        token="test-token", transport=TelegramTransportConfig(base_uri=base_uri)
+    )
+    return runner, messenger
+
+
+@pytest.mark.asyncio
+async def test_long_poll_waits_for_pushed_updates_and_confirms_by_offset():
+    api = FakeBotAPI()
+    runner, messenger = await start(api)
+    try:
+        poll = asyncio.create_task(messenger.getUpdates(offset=0, timeout=5))
+        await asyncio.sleep(0.05)
+        assert not poll.done()
+
+        api.push_update(message_update(7, 42, "/start"))
+        updates = await poll
+        assert [update["update_id"] for update in updates] == [7]
+
+        assert await messenger.getUpdates(offset=8, timeout=0) == []
+        assert api.stats()["updates_confirmed"] == 1
+    finally:
+        await messenger.close()
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_replies_reach_subscribers_with_their_keyboard():
+    api = FakeBotAPI()
+    runner, messenger = await start(api)
+    replies = api.subscribe(42)
+    try:
+        api.push_update(message_update(1, 42, "/start"))
+        sent = await messenger.sendMessage(
+            chat_id=42,
+            text="Please choose pizza type",
+            reply_markup=menu.PIZZA_KEYBOARD,
+        )
+        edited = await messenger.editMessageText(
+            chat_id=42, message_id=sent["message_id"], text="Please select pizza size"
+        )
+        await messenger.answerCallbackQuery(callback_query_id="cb1")
+
+        reply = replies.get_nowait()
+        assert reply["method"] == "sendMessage"
+        keyboard = reply["result"]["reply_markup"]["inline_keyboard"]
+        assert keyboard[0][0]["callback_data"] == menu.PIZZAS[0].callback_data
+        assert edited["message_id"] == sent["message_id"]
+        assert replies.get_nowait()["method"] == "editMessageText"
+        assert replies.empty()
+
+        stats = api.stats()
+        assert stats["replies"] == 1
+        assert stats["calls"]["answerCallbackQuery"] == 1
+    finally:
+        await messenger.close()
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_injected_throttling_and_unknown_methods_are_bot_api_errors():
+    api = FakeBotAPI(FakeBotAPIConfig(retry_after_rate=1.0, retry_after=3))
+    runner, messenger = await start(api)
+    try:
+        with pytest.raises(TelegramRetryAfter) as error:
+            await messenger.sendMessage(chat_id=1, text="hi")
+        assert error.value.retry_after == 3
+
+        with pytest.raises(TelegramAPIError) as error:
+            await messenger._make_request("sendSticker", chat_id=1)
+        assert error.value.error_code == 404
+    finally:
+        await messenger.close()
+        await runner.cleanup()
+
+
+def test_generated_order_flows_walk_the_whole_menu():
+    updates = order_flow_updates(2)
+
+    assert len(updates) == 12
+    assert [update["update_id"] for update in updates] == list(range(1, 13))
+    assert updates[0]["message"]["text"] == "/start"
+    assert updates[-1]["callback_query"]["data"] == "finish_order"
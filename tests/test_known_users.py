@@ -0,0 +1,63 @@
+import pytest
+
+from bot.infrastructure.known_users import KnownUsers
+from bot.infrastructure.storage_sqlite import StorageSqlite
+
+
+def test_known_users_evict_the_least_recently_seen_id():
+    known_users = KnownUsers(max_size=2)
+    known_users.add(1)
+    known_users.add(2)
+    assert 1 in known_users
+
+    known_users.add(3)
+
+    assert 2 not in known_users
+    assert 1 in known_users
+    assert 3 in known_users
+    assert len(known_users) == 2
+
+
+@pytest.mark.asyncio
+async def test_known_user_is_not_written_again(tmp_path):
+    storage = StorageSqlite(str(tmp_path / "bot.sqlite3"))
+    await storage.recreate_database()
+    calls = 0
+    call = storage._call
+
+    async def counting_call(function):
+        nonlocal calls
+        calls += 1
+        return await call(function)
+
+    storage._call = counting_call
+    try:
+        await storage.ensure_user_exists(42)
+        await storage.ensure_user_exists(42)
+    finally:
+        await storage.close()
+
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_upsert_keeps_state_and_order_of_an_existing_user(tmp_path):
+    path = str(tmp_path / "bot.sqlite3")
+    storage = StorageSqlite(path)
+    await storage.recreate_database()
+    await storage.ensure_user_exists(42)
+    await storage.update_user_session(42, "WAIT_FOR_DRINKS", {"pizza_name": "Diavola"})
+    await storage.close()
+
+    # A fresh process does not know the user and runs the upsert.
+    storage = StorageSqlite(path)
+    try:
+        await storage.ensure_user_exists(42)
+        user = await storage.get_user(42)
+    finally:
+        await storage.close()
+
+    assert (user["state"], user["order_json"]) == (
+        "WAIT_FOR_DRINKS",
+        '{"pizza_name": "Diavola"}',
+    )
@@ -0,0 +1,38 @@
+import asyncio
+import itertools
+import time
+
+import pytest
+
+from benchmarks.loadgen import Customer, Report, run_bot
+from bot.fake_bot_api import FakeBotAPI
+
+
+@pytest.mark.asyncio
+async def test_simulated_customers_complete_orders(monkeypatch):
+    # Ignored: without a backend the bot must not touch a real database.
+    monkeypatch.setenv("STORAGE_BACKEND", "postgres")
+    monkeypatch.setenv("POLLING_TIMEOUT", "1")
+    monkeypatch.setenv("TELEGRAM_GLOBAL_RATE", "10000")
+    monkeypatch.setenv("TELEGRAM_CHAT_RATE", "1000")
+    api = FakeBotAPI()
+    runner, base_uri = await api.start()
+    bot = asyncio.create_task(run_bot(base_uri))
+    report = Report()
+    update_ids = itertools.count(1)
+    try:
+        customers = [
+            Customer(telegram_id, api, update_ids, report, 0, reply_timeout=5)
+            for telegram_id in range(1, 4)
+        ]
+        deadline = time.monotonic() + 0.5
+        async with asyncio.timeout(20):
+            await asyncio.gather(*(customer.run(deadline) for customer in customers))
+    finally:
+        bot.cancel()
+        await asyncio.gather(bot, return_exceptions=True)
+        await runner.cleanup()
+
+    assert report.timeouts == 0
+    assert report.completed_orders >= len(customers)
+    assert len(report.step_latencies["start"]) == len(customers)
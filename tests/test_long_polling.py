@@ -0,0 +1,54 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from bot.long_polling import start_long_polling
+from tests.mocks import Mock
+
+
+@pytest.mark.asyncio
+async def test_long_polling_pipelines_next_fetch_and_backs_off_on_errors(
+    monkeypatch,
+):
+    monkeypatch.setattr("bot.long_polling.INITIAL_BACKOFF_SECONDS", 0)
+
+    batches = [
+        aiohttp.ClientConnectionError("network down"),
+        [{"update_id": 10}, {"update_id": 11}],
+    ]
+    get_updates_calls = []
+    dispatched = []
+    all_dispatched = asyncio.Event()
+
+    async def getUpdates(**kwargs) -> list:
+        get_updates_calls.append(kwargs)
+        if batches:
+            batch = batches.pop(0)
+            if isinstance(batch, Exception):
+                raise batch
+            return batch
+        await asyncio.Event().wait()
+
+    async def dispatch(update: dict) -> None:
+        # The following long poll must already be in flight.
+        assert get_updates_calls[-1]["offset"] == 12
+        dispatched.append(update["update_id"])
+        if len(dispatched) == 2:
+            all_dispatched.set()
+
+    polling = asyncio.create_task(
+        start_long_polling(
+            Mock({"dispatch": dispatch}),
+            Mock({"getUpdates": getUpdates}),
+        )
+    )
+    await asyncio.wait_for(all_dispatched.wait(), timeout=1)
+    polling.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await polling
+
+    assert dispatched == [10, 11]
+    assert [call["offset"] for call in get_updates_calls] == [0, 0, 12]
+    assert get_updates_calls[0]["timeout"] == 30
+    assert get_updates_calls[0]["allowed_updates"] == ["message", "callback_query"]
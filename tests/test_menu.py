@@ -0,0 +1,32 @@
+import json
+
+from bot import menu
+from bot.dispatcher import get_callback_prefix
+from bot.handlers import get_handlers
+
+
+def test_every_keyboard_button_decodes_and_is_routed():
+    keyboards = {
+        menu.PIZZA_KEYBOARD: menu.PIZZA_NAMES,
+        menu.SIZE_KEYBOARD: menu.PIZZA_SIZES,
+        menu.DRINK_KEYBOARD: menu.DRINK_NAMES,
+        menu.CONFIRM_KEYBOARD: menu.CONFIRMATION_CHOICES,
+        menu.NEXT_STEP_KEYBOARD: menu.NEXT_STEP_CHOICES,
+    }
+    routed_prefixes = set()
+    for handler in get_handlers():
+        routed_prefixes.update(handler.callback_prefixes or ())
+
+    for keyboard, lookup in keyboards.items():
+        buttons = [
+            button for row in json.loads(keyboard)["inline_keyboard"] for button in row
+        ]
+        assert [button["callback_data"] for button in buttons] == list(lookup)
+        for button in buttons:
+            assert get_callback_prefix(button["callback_data"]) in routed_prefixes
+
+
+def test_menu_decodes_callback_data_to_order_values():
+    assert menu.PIZZA_NAMES["pizza_quattro_stagioni"] == "Quattro Stagioni"
+    assert menu.PIZZA_SIZES["size_xl"] == "XL (40cm)"
+    assert menu.DRINK_NAMES["drink_none"] == "No drink"
@@ -27,19 +27,16 @@ async def test_message_start_handler():
         },
     }
 
-    clear_user_data_called = False
-    update_user_state_called = False
+    update_user_session_called = False
 
-    async def clear_user_state_and_order(telegram_id: int) -> None:
-        assert telegram_id == 12345
-        nonlocal clear_user_data_called
-        clear_user_data_called = True
-
-    async def update_user_state(telegram_id: int, state: str) -> None:
+    async def update_user_session(
+        telegram_id: int, state: str | None, order_json: dict | None
+    ) -> None:
         assert telegram_id == 12345
         assert state == "WAIT_FOR_PIZZA_NAME"
-        nonlocal update_user_state_called
-        update_user_state_called = True
+        assert order_json is None
+        nonlocal update_user_session_called
+        update_user_session_called = True
 
     async def get_user(telegram_id: int) -> dict | None:
         assert telegram_id == 12345
@@ -54,8 +51,7 @@ async def test_message_start_handler():
 
     mock_storage = Mock(
         {
-            "clear_user_state_and_order": clear_user_state_and_order,
-            "update_user_state": update_user_state,
+            "update_user_session": update_user_session,
             "get_user": get_user,
         }
     )
@@ -66,8 +62,7 @@ async def test_message_start_handler():
 
     await dispatcher.dispatch(test_update)
 
-    assert clear_user_data_called
-    assert update_user_state_called
+    assert update_user_session_called
     assert len(send_message_calls) == 2
     assert send_message_calls[0]["text"] == "Welcome to Pizza shop!"
     assert send_message_calls[1]["text"] == "Please choose pizza type"
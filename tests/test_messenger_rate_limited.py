@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from bot.infrastructure.messenger_rate_limited import RateLimitedMessenger
+from bot.infrastructure.messenger_telegram import (
+    TelegramAPIError,
+    TelegramRetryAfter,
+    raise_for_response,
+)
+from tests.mocks import Mock
+
+
+def make_messenger(calls: list, fail_first: dict | None = None) -> Mock:
+    fail_first = dict(fail_first or {})
+
+    async def sendMessage(chat_id: int, text: str, **kwargs) -> dict:
+        # Later requests finish first unless the queue keeps them in order.
+        await asyncio.sleep(0.01 if text == "first" else 0)
+        if fail_first.pop(text, None):
+            raise TelegramRetryAfter("sendMessage", 429, "Too Many Requests", 0.01)
+        calls.append((chat_id, text))
+        return {"message_id": len(calls)}
+
+    async def deleteMessage(chat_id: int, message_id: int) -> dict:
+        calls.append((chat_id, f"delete {message_id}"))
+        return True
+
+    return Mock({"sendMessage": sendMessage, "deleteMessage": deleteMessage})
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_messenger_keeps_order_within_chat():
+    calls = []
+    messenger = RateLimitedMessenger(make_messenger(calls), chat_burst=10)
+
+    await asyncio.gather(
+        messenger.deleteMessage(chat_id=1, message_id=5),
+        messenger.sendMessage(chat_id=1, text="first"),
+        messenger.sendMessage(chat_id=1, text="second"),
+    )
+    await messenger.close()
+
+    assert calls == [(1, "delete 5"), (1, "first"), (1, "second")]
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_messenger_spaces_sends_per_chat():
+    calls = []
+    messenger = RateLimitedMessenger(make_messenger(calls), chat_rate=20, chat_burst=1)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.gather(
+        *(messenger.sendMessage(chat_id=1, text=str(i)) for i in range(3))
+    )
+    await messenger.close()
+
+    assert [text for _, text in calls] == ["0", "1", "2"]
+    assert loop.time() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_messenger_retries_after_429():
+    calls = []
+    messenger = RateLimitedMessenger(make_messenger(calls, fail_first={"first": True}))
+
+    result = await messenger.sendMessage(chat_id=7, text="first")
+    await messenger.close()
+
+    assert calls == [(7, "first")]
+    assert result == {"message_id": 1}
+
+
+def test_raise_for_response_reads_retry_after():
+    with pytest.raises(TelegramRetryAfter) as error:
+        raise_for_response(
+            "sendMessage",
+            {
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 5",
+                "parameters": {"retry_after": 5},
+            },
+        )
+    assert error.value.retry_after == 5
+
+    with pytest.raises(TelegramAPIError):
+        raise_for_response("sendMessage", {"ok": False, "error_code": 400})
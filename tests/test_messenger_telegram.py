@@ -0,0 +1,49 @@
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from bot.infrastructure.messenger_telegram import MessengerTelegram, TelegramRetryAfter
+from bot.infrastructure.telegram_transport import TelegramTransportConfig
+
+
+@pytest.mark.asyncio
+async def test_messenger_telegram_posts_json_to_configured_base_uri():
+    requests = []
+
+    async def handle(request: web.Request) -> web.Response:
+        requests.append((request.match_info["method"], await request.json()))
+        if len(requests) == 1:
+            return web.json_response({"ok": True, "result": {"message_id": 3}})
+        return web.json_response(
+            {
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 2",
+                "parameters": {"retry_after": 2},
+            }
+        )
+
+    app = web.Application()
+    app.router.add_post("/bottest-token/{method}", handle)
+    async with TestServer(app) as server:
+        messenger = MessengerTelegram(
+            token="test-token",
+            transport=TelegramTransportConfig(base_uri=str(server.make_url(""))),
+        )
+        try:
+            result = await messenger.sendMessage(chat_id=1, text="Привет")
+            with pytest.raises(TelegramRetryAfter) as error:
+                await messenger.sendMessage(chat_id=1, text="again")
+        finally:
+            await messenger.close()
+
+    assert result == {"message_id": 3}
+    assert requests[0] == ("sendMessage", {"chat_id": 1, "text": "Привет"})
+    assert error.value.retry_after == 2
+
+
+def test_transport_gives_long_polls_a_longer_timeout():
+    transport = TelegramTransportConfig(request_timeout=15.0, long_poll_margin=10.0)
+
+    assert transport.timeout_for("sendMessage", {}).total == 15.0
+    assert transport.timeout_for("getUpdates", {"timeout": 30}).total == 40.0
@@ -0,0 +1,76 @@
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot import metrics
+from bot.dispatcher import HANDLER_ERRORS, HANDLER_SECONDS, Dispatcher
+from bot.handlers.handler import Handler, HandlerStatus
+from tests.mocks import Mock
+
+
+def test_histogram_renders_cumulative_buckets_and_quantiles():
+    registry = metrics.MetricsRegistry()
+    histogram = registry.histogram(
+        "test_seconds", "Test durations", ["method"], buckets=(0.1, 1.0)
+    )
+
+    for value in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value, method="get")
+
+    assert histogram.count(method="get") == 4
+    assert histogram.total(method="get") == pytest.approx(5.6)
+    assert histogram.quantile(0.5, method="get") == pytest.approx(0.1)
+    assert 'test_seconds_bucket{method="get",le="0.1"} 2' in registry.render()
+    assert 'test_seconds_bucket{method="get",le="1"} 3' in registry.render()
+    assert 'test_seconds_bucket{method="get",le="+Inf"} 4' in registry.render()
+    assert 'test_seconds_count{method="get"} 4' in registry.render()
+
+
+@pytest.mark.asyncio
+async def test_timer_counts_errors_and_reraises():
+    registry = metrics.MetricsRegistry()
+    histogram = registry.histogram("test_call_seconds", "Test calls", ["method"])
+    errors = registry.counter("test_call_errors_total", "Test errors", ["method"])
+
+    @metrics.timed(histogram, errors, method="fail")
+    async def fail() -> None:
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await fail()
+
+    assert histogram.count(method="fail") == 1
+    assert errors.get(method="fail") == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatch_records_handler_latency():
+    class Recorded(Handler):
+        async def can_handle(self, *args) -> bool:
+            return True
+
+        async def handle(self, *args) -> HandlerStatus:
+            raise RuntimeError("handler failed")
+
+    async def get_user(telegram_id: int) -> None:
+        return None
+
+    dispatcher = Dispatcher(Mock({"get_user": get_user}), Mock({}))
+    dispatcher.add_handlers(Recorded())
+
+    await dispatcher.dispatch({"update_id": 1, "message": {"from": {"id": 7}}})
+
+    assert HANDLER_SECONDS.count(handler="Recorded") == 1
+    assert HANDLER_ERRORS.get(handler="Recorded") == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_serves_registry():
+    metrics.gauge("test_endpoint_gauge", "Test gauge").set(3)
+    app = web.Application()
+    app.router.add_get("/metrics", metrics.metrics_handler)
+
+    async with TestClient(TestServer(app)) as client:
+        response = await client.get("/metrics")
+        assert response.status == 200
+        assert "test_endpoint_gauge 3" in await response.text()
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from bot.fake_bot_api import FakeBotAPI, message_update
+from bot.multiprocess import WorkerProcesses, get_shard
+
+
+def test_updates_of_one_user_always_go_to_the_same_worker():
+    assert get_shard(message_update(1, 7, "/start"), 3) == 1
+    assert get_shard(message_update(2, 7, "/start"), 3) == 1
+    assert get_shard(message_update(3, 9, "/start"), 3) == 0
+    assert get_shard({"update_id": 4}, 3) == 0
+
+
+@pytest.mark.asyncio
+async def test_workers_reply_to_their_users_and_report_stats(monkeypatch):
+    api = FakeBotAPI()
+    runner, base_uri = await api.start()
+    # Spawned workers read the same environment.
+    monkeypatch.setenv("TELEGRAM_BASE_URI", base_uri)
+    monkeypatch.setenv("TOKEN", "test-token")
+    monkeypatch.setenv("STORAGE_BACKEND", "memory")
+    monkeypatch.delenv("MEMORY_SNAPSHOT_PATH", raising=False)
+
+    workers = WorkerProcesses(2)
+    workers.start()
+    try:
+        replies = {telegram_id: api.subscribe(telegram_id) for telegram_id in (1, 2)}
+        for update_id, telegram_id in enumerate((1, 2), start=1):
+            await workers.submit(message_update(update_id, telegram_id, "/start"))
+
+        async with asyncio.timeout(30):
+            for queue in replies.values():
+                reply = await queue.get()
+                assert reply["method"] == "sendMessage"
+            while sum(workers.worker_stats(i)["dispatched"] for i in (0, 1)) < 2:
+                await asyncio.sleep(0.1)
+        assert workers.worker_stats(0)["dispatched"] == 1
+    finally:
+        await workers.close()
+        await runner.cleanup()
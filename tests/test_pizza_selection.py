@@ -30,28 +30,23 @@ async def test_pizza_selection_handler():
         },
     }
 
-    update_order_json_called = False
-    update_user_state_called = False
+    update_user_session_called = False
 
-    async def update_user_order_json(telegram_id: int, order_json: dict) -> None:
-        assert telegram_id == 12345
-        assert order_json["pizza_name"] == "Margherita"
-        nonlocal update_order_json_called
-        update_order_json_called = True
-
-    async def update_user_state(telegram_id: int, state: str) -> None:
+    async def update_user_session(
+        telegram_id: int, state: str | None, order_json: dict | None
+    ) -> None:
         assert telegram_id == 12345
         assert state == "WAIT_FOR_PIZZA_SIZE"
-        nonlocal update_user_state_called
-        update_user_state_called = True
+        assert order_json["pizza_name"] == "Margherita"
+        nonlocal update_user_session_called
+        update_user_session_called = True
 
     async def get_user(telegram_id: int) -> dict | None:
         assert telegram_id == 12345
         return {"state": "WAIT_FOR_PIZZA_NAME", "order_json": "{}"}
 
     answer_callback_called = False
-    delete_message_called = False
-    send_message_called = False
+    edit_message_called = False
 
     async def answerCallbackQuery(callback_query_id: str, **kwargs) -> dict:
         assert callback_query_id == "callback123"
@@ -59,24 +54,19 @@ async def test_pizza_selection_handler():
         answer_callback_called = True
         return {"ok": True}
 
-    async def deleteMessage(chat_id: int, message_id: int) -> dict:
+    async def editMessageText(
+        chat_id: int, message_id: int, text: str, **kwargs
+    ) -> dict:
         assert chat_id == 12345
         assert message_id == 100
-        nonlocal delete_message_called
-        delete_message_called = True
-        return {"ok": True}
-
-    async def sendMessage(chat_id: int, text: str, **kwargs) -> dict:
-        assert chat_id == 12345
         assert text == "Please select pizza size"
-        nonlocal send_message_called
-        send_message_called = True
+        nonlocal edit_message_called
+        edit_message_called = True
         return {"ok": True}
 
     mock_storage = Mock(
         {
-            "update_user_order_json": update_user_order_json,
-            "update_user_state": update_user_state,
+            "update_user_session": update_user_session,
             "get_user": get_user,
         }
     )
@@ -84,8 +74,7 @@ async def test_pizza_selection_handler():
     mock_messenger = Mock(
         {
             "answerCallbackQuery": answerCallbackQuery,
-            "deleteMessage": deleteMessage,
-            "sendMessage": sendMessage,
+            "editMessageText": editMessageText,
         }
     )
 
@@ -95,8 +84,6 @@ async def test_pizza_selection_handler():
 
     await dispatcher.dispatch(test_update)
 
-    assert update_order_json_called
-    assert update_user_state_called
+    assert update_user_session_called
     assert answer_callback_called
-    assert delete_message_called
-    assert send_message_called
+    assert edit_message_called
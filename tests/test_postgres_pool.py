@@ -0,0 +1,30 @@
+from bot.infrastructure.postgres_pool import PostgresPoolConfig
+
+
+def test_pool_config_reads_environment(monkeypatch):
+    monkeypatch.setenv("POSTGRES_POOL_MIN_SIZE", "2")
+    monkeypatch.setenv("POSTGRES_POOL_MAX_SIZE", "20")
+    monkeypatch.setenv("POSTGRES_POOL_MAX_INACTIVE_LIFETIME", "60")
+    monkeypatch.setenv("POSTGRES_COMMAND_TIMEOUT", "5.5")
+    monkeypatch.setenv("POSTGRES_STATEMENT_CACHE_SIZE", "0")
+
+    assert PostgresPoolConfig.from_env() == PostgresPoolConfig(
+        min_size=2,
+        max_size=20,
+        max_inactive_connection_lifetime=60.0,
+        command_timeout=5.5,
+        statement_cache_size=0,
+    )
+
+
+def test_pool_config_defaults(monkeypatch):
+    for name in (
+        "POSTGRES_POOL_MIN_SIZE",
+        "POSTGRES_POOL_MAX_SIZE",
+        "POSTGRES_POOL_MAX_INACTIVE_LIFETIME",
+        "POSTGRES_COMMAND_TIMEOUT",
+        "POSTGRES_STATEMENT_CACHE_SIZE",
+    ):
+        monkeypatch.delenv(name, raising=False)
+
+    assert PostgresPoolConfig.from_env() == PostgresPoolConfig()
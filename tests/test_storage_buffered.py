@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from bot.infrastructure.storage_buffered import BufferedUpdateStorage
+from tests.mocks import Mock
+
+
+@pytest.mark.asyncio
+async def test_buffered_storage_writes_full_batches_and_flushes_on_close():
+    batches = []
+
+    async def persist_updates(updates: list[dict]) -> None:
+        batches.append([update["update_id"] for update in updates])
+
+    storage = BufferedUpdateStorage(
+        Mock({"persist_updates": persist_updates}),
+        max_batch_size=2,
+        flush_interval=60,
+    )
+
+    for update_id in range(3):
+        await storage.persist_update({"update_id": update_id})
+    assert batches == []
+    assert storage.buffer_depth == 3
+
+    await asyncio.sleep(0)
+    assert batches == [[0, 1], [2]]
+
+    await storage.persist_update({"update_id": 3})
+    await storage.close()
+
+    assert batches == [[0, 1], [2], [3]]
+    assert storage.buffer_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_buffered_storage_keeps_updates_when_write_fails():
+    fail = True
+    saved = []
+
+    async def persist_updates(updates: list[dict]) -> None:
+        if fail:
+            raise ConnectionError("database is down")
+        saved.extend(updates)
+
+    storage = BufferedUpdateStorage(
+        Mock({"persist_updates": persist_updates}),
+        flush_interval=60,
+    )
+    await storage.persist_update({"update_id": 1})
+
+    await storage.flush()
+    assert storage.buffer_depth == 1
+
+    fail = False
+    await storage.close()
+    assert saved == [{"update_id": 1}]
+
+
+@pytest.mark.asyncio
+async def test_buffered_storage_restarts_a_flusher_killed_by_a_bug(caplog):
+    calls = 0
+    saved = []
+
+    async def persist_updates(updates: list[dict]) -> None:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise KeyError("payload")
+        saved.extend(update["update_id"] for update in updates)
+
+    storage = BufferedUpdateStorage(
+        Mock({"persist_updates": persist_updates}),
+        max_batch_size=1,
+        flush_interval=60,
+    )
+    await storage.persist_update({"update_id": 1})
+    await asyncio.sleep(0.01)
+    assert storage.buffer_depth == 1
+    assert "update flusher stopped" in caplog.text
+
+    await storage.persist_update({"update_id": 2})
+    await asyncio.sleep(0)
+    assert saved == [1, 2]
+
+    await storage.close()
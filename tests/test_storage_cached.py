@@ -0,0 +1,89 @@
+import pytest
+
+from bot.app import session_cache_enabled
+from bot.infrastructure.storage_cached import CachedStorage
+from tests.mocks import Mock
+
+
+@pytest.mark.asyncio
+async def test_cached_storage_serves_repeat_reads_and_writes_through():
+    rows = {12345: {"telegram_id": 12345, "state": None, "order_json": None}}
+    get_user_calls = 0
+
+    async def get_user(telegram_id: int) -> dict | None:
+        nonlocal get_user_calls
+        get_user_calls += 1
+        row = rows.get(telegram_id)
+        return dict(row) if row else None
+
+    async def update_user_state(telegram_id: int, state: str) -> None:
+        rows[telegram_id]["state"] = state
+
+    async def update_user_order_json(telegram_id: int, order_json: dict) -> None:
+        raise ConnectionError("database is down")
+
+    storage = CachedStorage(
+        Mock(
+            {
+                "get_user": get_user,
+                "update_user_state": update_user_state,
+                "update_user_order_json": update_user_order_json,
+            }
+        )
+    )
+
+    assert (await storage.get_user(12345))["state"] is None
+    await storage.update_user_state(12345, "WAIT_FOR_PIZZA_NAME")
+    assert (await storage.get_user(12345))["state"] == "WAIT_FOR_PIZZA_NAME"
+    assert get_user_calls == 1
+
+    with pytest.raises(ConnectionError):
+        await storage.update_user_order_json(12345, {"pizza_name": "Diavola"})
+    assert (await storage.get_user(12345))["order_json"] is None
+    assert get_user_calls == 2
+
+    assert storage.stats() == {"size": 1, "hits": 1, "misses": 2, "evictions": 0}
+
+
+@pytest.mark.asyncio
+async def test_cached_storage_evicts_least_recently_used_and_warms():
+    async def get_recent_users(limit: int) -> list[dict]:
+        return [
+            {"telegram_id": telegram_id, "state": None, "order_json": None}
+            for telegram_id in (3, 2, 1)
+        ][:limit]
+
+    async def get_user(telegram_id: int) -> dict | None:
+        return {"telegram_id": telegram_id, "state": None, "order_json": None}
+
+    storage = CachedStorage(
+        Mock({"get_recent_users": get_recent_users, "get_user": get_user}),
+        max_size=2,
+    )
+
+    assert await storage.warm(2) == 2
+    await storage.get_user(3)
+    await storage.get_user(1)
+
+    assert storage.stats() == {"size": 2, "hits": 1, "misses": 1, "evictions": 1}
+
+
+@pytest.mark.parametrize(
+    ("mode", "setting", "enabled"),
+    [
+        ("polling", None, True),
+        ("webhook", None, False),
+        ("webhook", "1", True),
+        ("polling", "0", False),
+    ],
+)
+def test_session_cache_is_opt_in_for_webhook_replicas(
+    monkeypatch, mode, setting, enabled
+):
+    monkeypatch.setenv("BOT_MODE", mode)
+    if setting is None:
+        monkeypatch.delenv("SESSION_CACHE", raising=False)
+    else:
+        monkeypatch.setenv("SESSION_CACHE", setting)
+
+    assert session_cache_enabled() is enabled
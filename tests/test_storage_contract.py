@@ -0,0 +1,183 @@
+"""Behaviour every Storage backend must share.
+
+The Postgres variant runs only when POSTGRES_TEST_DATABASE names a
+database that may be dropped and recreated; the other POSTGRES_* settings
+are read from the environment as usual.
+"""
+
+import asyncio
+import os
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from bot.domain.storage import history_cursor
+from bot.infrastructure.storage_memory import StorageMemory
+from bot.infrastructure.storage_postgres import StoragePostgres
+from bot.infrastructure.storage_sqlite import StorageSqlite
+
+
+@pytest.fixture(params=["memory", "sqlite", "postgres"])
+async def storage(request, tmp_path, monkeypatch):
+    if request.param == "memory":
+        storage = StorageMemory(str(tmp_path / "bot.snapshot"))
+    elif request.param == "sqlite":
+        storage = StorageSqlite(str(tmp_path / "bot.sqlite3"))
+    else:
+        database = os.getenv("POSTGRES_TEST_DATABASE")
+        if not database:
+            pytest.skip("POSTGRES_TEST_DATABASE is not set")
+        monkeypatch.setenv("POSTGRES_DATABASE", database)
+        storage = StoragePostgres()
+
+    await storage.recreate_database()
+    yield storage
+    await storage.close()
+
+
+@pytest.fixture
+async def postgres(monkeypatch):
+    database = os.getenv("POSTGRES_TEST_DATABASE")
+    if not database:
+        pytest.skip("POSTGRES_TEST_DATABASE is not set")
+    monkeypatch.setenv("POSTGRES_DATABASE", database)
+    storage = StoragePostgres()
+    await storage.recreate_database()
+    yield storage
+    await storage.close()
+
+
+async def test_user_session_round_trip(storage):
+    assert await storage.get_user(42) is None
+
+    await storage.ensure_user_exists(42)
+    await storage.ensure_user_exists(42)
+    await storage.update_user_session(42, "WAIT_FOR_PIZZA_SIZE", {"pizza": "Diavola"})
+
+    user = await storage.get_user(42)
+    assert user["telegram_id"] == 42
+    assert user["state"] == "WAIT_FOR_PIZZA_SIZE"
+    assert user["order_json"] == '{"pizza": "Diavola"}'
+
+    await storage.update_user_state(42, "WAIT_FOR_DRINKS")
+    await storage.clear_user_order_json(42)
+    user = await storage.get_user(42)
+    assert (user["state"], user["order_json"]) == ("WAIT_FOR_DRINKS", None)
+
+    await storage.clear_current_order(42)
+    user = await storage.get_user(42)
+    assert (user["state"], user["order_json"]) == (None, None)
+
+
+async def test_recent_users_are_most_recently_updated_first(storage):
+    for telegram_id in (1, 2, 3):
+        await storage.ensure_user_exists(telegram_id)
+
+    recent = await storage.get_recent_users(2)
+    assert len(recent) == 2
+    assert {user["telegram_id"] for user in recent} <= {1, 2, 3}
+
+
+async def test_order_history_pages_newest_first(storage):
+    await storage.ensure_user_exists(7)
+    for number in range(5):
+        await storage.save_order_to_history(7, {"number": number})
+    await storage.save_order_to_history(8, {"number": 99})
+
+    first_page = await storage.get_user_order_history(7, limit=2)
+    second_page = await storage.get_user_order_history(
+        7, limit=2, before=history_cursor(first_page[-1])
+    )
+    last_page = await storage.get_user_order_history(
+        7, limit=2, before=history_cursor(second_page[-1])
+    )
+
+    numbers = [
+        entry["order_data"]["number"] for entry in first_page + second_page + last_page
+    ]
+    assert numbers == [4, 3, 2, 1, 0]
+
+
+async def test_concurrent_writes_all_land(storage):
+    await asyncio.gather(*(storage.ensure_user_exists(i) for i in range(50)))
+    await asyncio.gather(
+        *(storage.update_user_state(i, f"STATE_{i}") for i in range(50))
+    )
+    await storage.persist_updates([{"update_id": i} for i in range(10)])
+
+    users = await asyncio.gather(*(storage.get_user(i) for i in range(50)))
+    assert [user["state"] for user in users] == [f"STATE_{i}" for i in range(50)]
+
+
+async def test_polling_offset_only_moves_forward_and_update_ids_are_claimed_once(
+    storage,
+):
+    assert await storage.get_polling_offset() == 0
+    await storage.save_polling_offset(12)
+    await storage.save_polling_offset(11)
+    assert await storage.get_polling_offset() == 12
+
+    assert await storage.claim_update_ids([3, 1, 2]) == [1, 2, 3]
+    assert await storage.claim_update_ids([2, 4]) == [4]
+    await storage.release_update_ids([2])
+    assert await storage.claim_update_ids([2, 3]) == [2]
+
+
+async def test_postgres_migrates_a_database_with_legacy_updates(postgres):
+    pool = await postgres._get_pool()
+    async with pool.acquire() as conn:
+        await conn.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+        await conn.execute("""
+            CREATE TABLE telegram_updates (id SERIAL PRIMARY KEY, payload TEXT NOT NULL);
+            CREATE TABLE users
+            (
+                id SERIAL PRIMARY KEY,
+                telegram_id BIGINT NOT NULL UNIQUE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                state TEXT DEFAULT NULL,
+                order_json TEXT DEFAULT NULL
+            );
+            CREATE TABLE order_history
+            (
+                id SERIAL PRIMARY KEY,
+                telegram_id INTEGER NOT NULL,
+                order_data TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            INSERT INTO telegram_updates (payload)
+            VALUES ('{"update_id": 1}'), ('[{"update_id": 2}]');
+            """)
+
+    assert await postgres.migrate() == [1, 2, 3, 4, 5, 6]
+    await postgres.ensure_update_partitions()
+
+    assert (await postgres.get_update(2))["payload"] == {"update_id": 2}
+    async with pool.acquire() as conn:
+        assert await conn.fetchval("SELECT count(*) FROM telegram_updates_default") == 0
+
+
+async def test_postgres_partitions_take_over_rows_from_the_default_partition(
+    postgres,
+):
+    now = datetime.now(UTC)
+    pool = await postgres._get_pool()
+    async with pool.acquire() as conn:
+        for days in (10, -40):
+            await conn.execute(
+                "INSERT INTO telegram_updates (update_id, received_at, payload) "
+                "VALUES ($1, $2, '{}')",
+                days,
+                now + timedelta(days=days),
+            )
+
+    await postgres.ensure_update_partitions(days_ahead=10)
+    await postgres.drop_update_partitions(retention_days=30)
+
+    async with pool.acquire() as conn:
+        assert await conn.fetchval("SELECT count(*) FROM telegram_updates_default") == 0
+        assert (
+            await conn.fetchval(
+                "SELECT tableoid::regclass::text FROM telegram_updates WHERE update_id = 10"
+            )
+            == f"telegram_updates_p{now + timedelta(days=10):%Y%m%d}"
+        )
@@ -0,0 +1,72 @@
+import pytest
+
+from bot.domain.storage import history_cursor
+from bot.infrastructure.storage_memory import StorageMemory
+
+
+@pytest.mark.asyncio
+async def test_snapshot_restores_users_history_updates_and_broadcasts(tmp_path):
+    path = str(tmp_path / "bot.snapshot")
+    storage = StorageMemory(path)
+    await storage.ensure_user_exists(1)
+    await storage.ensure_user_exists(2)
+    await storage.update_user_session(1, "WAIT_FOR_DRINKS", {"pizza_name": "Diavola"})
+    for number in range(3):
+        await storage.save_order_to_history(2, {"number": number})
+    await storage.persist_updates([{"update_id": 10, "message": {"text": "/start"}}])
+    broadcast_id = await storage.create_broadcast("2-for-1 Tuesday!")
+    await storage.update_broadcast_progress(broadcast_id, 2, sent=1, failed=1)
+    await storage.save_polling_offset(11)
+    await storage.claim_update_ids([10])
+    await storage.close()
+
+    restored = StorageMemory(path)
+    user = await restored.get_user(1)
+    assert (user["state"], user["order_json"]) == (
+        "WAIT_FOR_DRINKS",
+        '{"pizza_name": "Diavola"}',
+    )
+    assert [user["telegram_id"] for user in await restored.get_recent_users(2)] == [
+        1,
+        2,
+    ]
+
+    first_page = await restored.get_user_order_history(2, limit=2)
+    rest = await restored.get_user_order_history(
+        2, limit=2, before=history_cursor(first_page[-1])
+    )
+    assert [entry["order_data"]["number"] for entry in first_page + rest] == [2, 1, 0]
+
+    update = await restored.get_update(10)
+    assert update["payload"] == {"update_id": 10, "message": {"text": "/start"}}
+    assert await restored.get_polling_offset() == 11
+    assert await restored.claim_update_ids([10, 11]) == [11]
+
+    broadcast = await restored.get_broadcast(broadcast_id)
+    assert (broadcast["checkpoint"], broadcast["sent"], broadcast["failed"]) == (
+        2,
+        1,
+        1,
+    )
+
+    # New ids continue after the restored ones.
+    assert await restored.create_broadcast("next") > broadcast_id
+    await restored.close()
+
+
+@pytest.mark.asyncio
+async def test_oldest_updates_are_dropped_past_max_updates():
+    storage = StorageMemory(max_updates=2)
+    await storage.persist_updates([{"update_id": i} for i in range(3)])
+
+    assert await storage.get_update(0) is None
+    assert (await storage.get_update(2))["payload"] == {"update_id": 2}
+
+
+@pytest.mark.asyncio
+async def test_unknown_users_are_not_created_by_updates():
+    storage = StorageMemory()
+    await storage.update_user_state(5, "WAIT_FOR_PIZZA_NAME")
+
+    assert await storage.get_user(5) is None
+    assert await storage.get_user_ids(None, 10) == []
@@ -0,0 +1,36 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from bot.infrastructure.storage_sqlite import StorageSqlite
+
+
+@pytest.mark.asyncio
+async def test_calls_fail_while_the_database_cannot_be_opened(tmp_path):
+    directory = tmp_path / "missing"
+    storage = StorageSqlite(str(directory / "bot.sqlite3"))
+    try:
+        async with asyncio.timeout(5):
+            for _ in range(2):
+                with pytest.raises(sqlite3.OperationalError):
+                    await storage.get_user(1)
+
+            directory.mkdir()
+            await storage.recreate_database()
+            await storage.ensure_user_exists(1)
+            assert (await storage.get_user(1))["telegram_id"] == 1
+    finally:
+        await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_calls_fail_once_the_writer_thread_has_stopped(tmp_path):
+    storage = StorageSqlite(str(tmp_path / "bot.sqlite3"))
+    await storage.recreate_database()
+    storage._jobs.put(None)
+    await asyncio.to_thread(storage._thread.join)
+
+    with pytest.raises(RuntimeError):
+        await storage.get_user(1)
+    await storage.close()
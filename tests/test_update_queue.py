@@ -0,0 +1,196 @@
+import asyncio
+import os
+from datetime import UTC, datetime
+
+import pytest
+
+from bot.fake_bot_api import message_update
+from bot.infrastructure.storage_postgres import StoragePostgres
+from bot.update_queue import UpdateQueueWorker, ingest_updates
+from tests.mocks import Mock
+
+
+class FakeQueue:
+    """The update_queue claim rules, without the database."""
+
+    def __init__(self, updates: list[dict], attempts: int = 0) -> None:
+        self.rows = {
+            update["update_id"]: {"update": update, "attempts": attempts, "by": None}
+            for update in updates
+        }
+        self.acked: list[int] = []
+
+    async def claim_updates(self, worker: str, limit: int, lease: float) -> list:
+        heads = {}
+        for update_id in sorted(self.rows):
+            telegram_id = self.rows[update_id]["update"]["message"]["from"]["id"]
+            heads.setdefault(telegram_id, update_id)
+        claimed = []
+        for update_id in sorted(heads.values()):
+            row = self.rows[update_id]
+            if row["by"] is None and len(claimed) < limit:
+                row["by"] = worker
+                row["attempts"] += 1
+                claimed.append(
+                    {
+                        "update_id": update_id,
+                        "payload": row["update"],
+                        "attempts": row["attempts"],
+                        "enqueued_at": datetime.now(UTC),
+                    }
+                )
+        return claimed
+
+    async def ack_updates(self, worker: str, update_ids: list[int]) -> None:
+        for update_id in update_ids:
+            if self.rows[update_id]["by"] == worker:
+                del self.rows[update_id]
+                self.acked.append(update_id)
+
+    async def renew_update_claims(self, worker, update_ids, lease) -> None:
+        pass
+
+
+async def run_until_empty(worker: UpdateQueueWorker, queue: FakeQueue) -> None:
+    task = asyncio.create_task(worker.run())
+    async with asyncio.timeout(5):
+        while queue.rows:
+            await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_worker_keeps_per_user_order_and_acknowledges_handled_updates():
+    handled = []
+
+    async def dispatch(update: dict) -> None:
+        await asyncio.sleep(0.01)
+        handled.append((update["message"]["from"]["id"], update["update_id"]))
+
+    queue = FakeQueue([message_update(i, i % 2, "hi") for i in range(1, 7)])
+    worker = UpdateQueueWorker(
+        Mock({"dispatch": dispatch}), queue, concurrency=4, idle_interval=0.01
+    )
+    await run_until_empty(worker, queue)
+
+    assert [update_id for user, update_id in handled if user == 0] == [2, 4, 6]
+    assert [update_id for user, update_id in handled if user == 1] == [1, 3, 5]
+    assert sorted(queue.acked) == list(range(1, 7))
+
+
+@pytest.mark.asyncio
+async def test_updates_claimed_too_often_are_dropped_without_dispatch():
+    handled = []
+
+    async def dispatch(update: dict) -> None:
+        handled.append(update["update_id"])
+
+    queue = FakeQueue([message_update(1, 42, "/start")], attempts=3)
+    worker = UpdateQueueWorker(
+        Mock({"dispatch": dispatch}), queue, max_attempts=3, idle_interval=0.01
+    )
+    await run_until_empty(worker, queue)
+
+    assert handled == []
+    assert queue.acked == [1]
+
+
+@pytest.mark.asyncio
+async def test_ingestion_confirms_an_offset_only_after_the_batch_is_queued(
+    monkeypatch,
+):
+    monkeypatch.setattr("bot.update_queue.INITIAL_BACKOFF_SECONDS", 0)
+    offsets = []
+    queued = []
+    enqueue_results = [ConnectionError("database down"), None]
+
+    async def getUpdates(offset: int, **kwargs) -> list:
+        offsets.append(offset)
+        if len(offsets) > 2:
+            await asyncio.Event().wait()
+        return [message_update(10, 1, "a"), message_update(11, 2, "b")]
+
+    async def enqueue_updates(updates: list[dict]) -> None:
+        result = enqueue_results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        queued.extend(update["update_id"] for update in updates)
+
+    async def get_update_queue_offset() -> int:
+        return 10
+
+    queue = Mock(
+        {
+            "enqueue_updates": enqueue_updates,
+            "get_update_queue_offset": get_update_queue_offset,
+        }
+    )
+    task = asyncio.create_task(ingest_updates(Mock({"getUpdates": getUpdates}), queue))
+    async with asyncio.timeout(5):
+        while len(offsets) < 3:
+            await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert offsets == [10, 10, 12]
+    assert queued == [10, 11]
+
+
+@pytest.mark.asyncio
+async def test_postgres_claims_only_the_oldest_update_of_each_user(monkeypatch):
+    database = os.getenv("POSTGRES_TEST_DATABASE")
+    if not database:
+        pytest.skip("POSTGRES_TEST_DATABASE is not set")
+    monkeypatch.setenv("POSTGRES_DATABASE", database)
+    storage = StoragePostgres()
+    await storage.recreate_database()
+    try:
+        updates = [message_update(i, 1 + i % 2, "hi") for i in range(1, 5)]
+        await storage.enqueue_updates(updates)
+        await storage.enqueue_updates(updates[:1])
+        assert await storage.get_update_queue_offset() == 5
+
+        first = await storage.claim_updates("a", 10, 60)
+        assert [update["update_id"] for update in first] == [1, 2]
+        assert await storage.claim_updates("b", 10, 60) == []
+
+        await storage.ack_updates("b", [1])
+        assert await storage.claim_updates("b", 10, 60) == []
+        await storage.ack_updates("a", [1])
+        second = await storage.claim_updates("b", 10, 60)
+        assert [update["update_id"] for update in second] == [3]
+        assert second[0]["payload"] == updates[2]
+
+        await storage.ack_updates("a", [2])
+        expired = await storage.claim_updates("c", 10, 0)
+        assert [update["update_id"] for update in expired] == [4]
+        reclaimed = await storage.claim_updates("d", 10, 60)
+        assert [(u["update_id"], u["attempts"]) for u in reclaimed] == [(4, 2)]
+    finally:
+        await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_a_failed_acknowledgement_is_retried(monkeypatch):
+    monkeypatch.setattr("bot.update_queue.INITIAL_BACKOFF_SECONDS", 0)
+    handled = []
+
+    async def dispatch(update: dict) -> None:
+        handled.append(update["update_id"])
+
+    queue = FakeQueue([message_update(1, 42, "/start"), message_update(2, 42, "a")])
+    ack_updates = queue.ack_updates
+    failures = [ConnectionError("database down")]
+
+    async def flaky_ack_updates(worker: str, update_ids: list[int]) -> None:
+        if failures:
+            raise failures.pop()
+        await ack_updates(worker, update_ids)
+
+    queue.ack_updates = flaky_ack_updates
+    worker = UpdateQueueWorker(Mock({"dispatch": dispatch}), queue, idle_interval=0.01)
+    await run_until_empty(worker, queue)
+
+    assert handled == [1, 2]
+    assert queue.acked == [1, 2]
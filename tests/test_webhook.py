@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.deduplication import UpdateDeduplicator
+from bot.infrastructure.storage_memory import StorageMemory
+from bot.webhook import SECRET_TOKEN_HEADER, create_webhook_app
+from bot.worker_pool import DispatchWorkerPool
+from tests.mocks import Mock
+
+test_update = {
+    "update_id": 12345678,
+    "message": {
+        "message_id": 1,
+        "from": {"id": 12345, "is_bot": False, "first_name": "Test"},
+        "chat": {"id": 12345, "type": "private"},
+        "date": 1640995200,
+        "text": "/start",
+    },
+}
+
+
+@pytest.mark.asyncio
+async def test_webhook_acknowledges_before_dispatch_finishes():
+    release_dispatch = asyncio.Event()
+    dispatched = []
+
+    async def dispatch(update: dict) -> None:
+        await release_dispatch.wait()
+        dispatched.append(update)
+
+    pool = DispatchWorkerPool(Mock({"dispatch": dispatch}))
+    app = create_webhook_app(pool, secret_token="s3cret")
+
+    async with TestClient(TestServer(app)) as client:
+        response = await client.post(
+            "/webhook", json=test_update, headers={SECRET_TOKEN_HEADER: "s3cret"}
+        )
+        assert response.status == 200
+        assert dispatched == []
+
+        response = await client.post("/webhook", json=test_update)
+        assert response.status == 401
+
+        response = await client.post(
+            "/webhook", data="not json", headers={SECRET_TOKEN_HEADER: "s3cret"}
+        )
+        assert response.status == 400
+
+    release_dispatch.set()
+    await pool.close()
+
+    assert dispatched == [test_update]
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_updates_when_queue_is_full():
+    release_dispatch = asyncio.Event()
+
+    async def dispatch(update: dict) -> None:
+        await release_dispatch.wait()
+
+    pool = DispatchWorkerPool(Mock({"dispatch": dispatch}), max_pending=1)
+    app = create_webhook_app(pool, enqueue_timeout=0.01)
+
+    async with TestClient(TestServer(app)) as client:
+        response = await client.post("/webhook", json=test_update)
+        assert response.status == 200
+
+        response = await client.post("/webhook", json=test_update)
+        assert response.status == 503
+
+    release_dispatch.set()
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_webhook_dispatches_a_redelivery_of_a_rejected_update():
+    release_dispatch = asyncio.Event()
+    dispatched = []
+
+    async def dispatch(update: dict) -> None:
+        await release_dispatch.wait()
+        dispatched.append(update["update_id"])
+
+    pool = DispatchWorkerPool(Mock({"dispatch": dispatch}), max_pending=1)
+    app = create_webhook_app(
+        pool,
+        enqueue_timeout=0.01,
+        deduplicator=UpdateDeduplicator(StorageMemory()),
+    )
+    rejected = {**test_update, "update_id": test_update["update_id"] + 1}
+
+    async with TestClient(TestServer(app)) as client:
+        response = await client.post("/webhook", json=test_update)
+        assert response.status == 200
+        response = await client.post("/webhook", json=rejected)
+        assert response.status == 503
+
+        release_dispatch.set()
+        async with asyncio.timeout(5):
+            while not dispatched:
+                await asyncio.sleep(0.01)
+
+        response = await client.post("/webhook", json=rejected)
+        assert response.status == 200
+
+    await pool.close()
+
+    assert dispatched == [test_update["update_id"], rejected["update_id"]]
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from bot.worker_pool import DispatchWorkerPool
+from tests.mocks import Mock
+
+
+def make_update(update_id: int, telegram_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "from": {"id": telegram_id},
+            "chat": {"id": telegram_id},
+            "text": "hello",
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_keeps_per_user_order_and_runs_users_in_parallel():
+    handled = []
+    running = 0
+    max_running = 0
+
+    async def dispatch(update: dict) -> None:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        handled.append(
+            (update["message"]["from"]["id"], update["update_id"]),
+        )
+        running -= 1
+
+    pool = DispatchWorkerPool(Mock({"dispatch": dispatch}), concurrency=4)
+    for update_id in range(6):
+        await pool.submit(make_update(update_id, telegram_id=update_id % 2))
+
+    await pool.close()
+
+    assert len(handled) == 6
+    assert [u for t, u in handled if t == 0] == [0, 2, 4]
+    assert [u for t, u in handled if t == 1] == [1, 3, 5]
+    assert max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_survives_failing_dispatch():
+    handled = []
+
+    async def dispatch(update: dict) -> None:
+        if update["update_id"] == 1:
+            raise RuntimeError("boom")
+        handled.append(update["update_id"])
+
+    pool = DispatchWorkerPool(Mock({"dispatch": dispatch}), concurrency=2)
+    for update_id in range(3):
+        await pool.submit(make_update(update_id, telegram_id=42))
+
+    await pool.close()
+
+    assert handled == [0, 2]
+    assert pool.pending == 0